@@ -0,0 +1,157 @@
+"""Transcript backfill jobs.
+
+PostToolUse hooks only fire in the parent session, so a subagent's own
+tool calls are recovered from its transcript when it stops. Reading a large
+transcript takes far longer than a hook should hold up Claude Code, so the
+SubagentStop hook only queues a job (see job_from_hook) and returns. The
+dashboard server's backfill pool (server/backfill.py) picks it up; when no
+server is running the hook starts scripts/backfill.py detached instead.
+
+A job reads the transcript from its import watermark in chunks of
+CHUNK_BYTES, storing each chunk and recording its progress before reading
+the next. A failed job is retried with exponential backoff up to
+MAX_ATTEMPTS times.
+"""
+
+import os
+import sys
+
+from core.db import (
+    claim_backfill_jobs, finish_backfill_job, get_transcript_offset, insert_events, update_backfill_progress,
+)
+from core.event_parser import subagent_name
+from core.timeutil import now_epoch_us
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get('TEAM_MONITOR_DATA_DIR') or os.path.join(PLUGIN_ROOT, 'data')
+PID_FILE = os.path.join(DATA_DIR, 'server.pid')
+
+
+def _env_int(name, default):
+    try:
+        return max(1, int(os.environ.get(name, '') or default))
+    except ValueError:
+        return default
+
+
+# Jobs running at once, across every process sharing the database
+MAX_RUNNING = _env_int('TEAM_MONITOR_BACKFILL_WORKERS', 2)
+CHUNK_BYTES = 4 * 1024 * 1024
+MAX_ATTEMPTS = 5
+RETRY_BASE_S = 2
+# A running job that reports no progress for this long is handed to another worker
+LEASE_S = 300
+
+
+def job_from_hook(hook_data):
+    """The backfill job fields for a SubagentStop payload, or None without a readable transcript."""
+    tool_input = hook_data.get('tool_input') or {}
+    transcript_path = (hook_data.get('agent_transcript_path') or tool_input.get('agent_transcript_path')
+                       or hook_data.get('transcript_path'))
+    if not transcript_path or not os.path.exists(transcript_path):
+        return None
+
+    # Attribute to the subagent's own name, matching its node in the agent tree
+    agent_name = subagent_name(hook_data) or hook_data.get('agent_name', '')
+    if not agent_name and tool_input.get('description'):
+        agent_name = tool_input['description'].split()[0]
+    return {
+        'transcript_path': transcript_path,
+        'agent_name': agent_name or 'unknown',
+        'session_id': hook_data.get('session_id', ''),
+        'team_name': hook_data.get('team_name', '') or tool_input.get('team_name', ''),
+    }
+
+
+def worker_id():
+    import socket
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker=None, max_running=MAX_RUNNING):
+    """Claim due jobs for this worker, up to the concurrency limit."""
+    return claim_backfill_jobs(worker or worker_id(), max_running, lease_s=LEASE_S)
+
+
+def run_job(job):
+    """Read a job's transcript from its watermark to the end. Returns events stored.
+
+    Raises on failure; the caller decides whether to retry (see finish).
+    """
+    # Imported here so the SubagentStop hook, which only queues jobs, skips it
+    from core.transcript_parser import parse_transcript_from
+    path = job['transcript_path']
+    total = os.path.getsize(path)
+    offset = get_transcript_offset(path)
+    if total < offset:
+        # The file was truncated or rewritten; start over
+        offset = 0
+    stored = 0
+    while offset < total:
+        result = parse_transcript_from(path, offset, agent_name=job['agent_name'], session_id=job['session_id'],
+                                       team_name=job['team_name'], max_bytes=CHUNK_BYTES)
+        if not result['bytes_read']:
+            break
+        for event in result['events']:
+            # Keep the transcript's own timestamp; ties sort by event id
+            if not event.get('timestamp'):
+                event['timestamp'] = job['fallback_ts']
+        # The server's event bus picks the new rows up from the database
+        stored += insert_events(result['events'], source_path=path, source_offset=result['offset'],
+                                usage_records=result['usage'])
+        offset = result['offset']
+        update_backfill_progress(job['id'], offset, total, job['events'] + stored)
+    return stored
+
+
+def finish(job, error=None):
+    """Record a job's outcome: done, retried after a backoff, or failed after MAX_ATTEMPTS."""
+    if error is None:
+        finish_backfill_job(job['id'])
+        return 'done'
+    if job['attempts'] < MAX_ATTEMPTS:
+        delay_s = RETRY_BASE_S * 2 ** (job['attempts'] - 1)
+        finish_backfill_job(job['id'], error, retry_at_us=now_epoch_us() + int(delay_s * 1e6))
+        return 'retry'
+    finish_backfill_job(job['id'], error)
+    return 'failed'
+
+
+def run_and_finish(job):
+    """Run a claimed job and record its outcome. Returns the outcome."""
+    try:
+        run_job(job)
+    except Exception as exc:
+        return finish(job, f'{type(exc).__name__}: {exc}')
+    return finish(job)
+
+
+def server_running():
+    """Whether a dashboard server started by scripts/start_server.py is up to run queued jobs."""
+    try:
+        with open(PID_FILE, 'r') as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return False
+    if sys.platform == 'win32':
+        # No cheap liveness check; stop_server.py removes the file
+        return True
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def spawn_runner():
+    """Start scripts/backfill.py detached to drain the queue, for when no server is running."""
+    import subprocess
+    cmd = [sys.executable, os.path.join(PLUGIN_ROOT, 'scripts', 'backfill.py'), 'run']
+    kwargs = dict(stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True)
+    if sys.platform == 'win32':
+        CREATE_NEW_PROCESS_GROUP = 0x00000200
+        DETACHED_PROCESS = 0x00000008
+        kwargs['creationflags'] = CREATE_NEW_PROCESS_GROUP | DETACHED_PROCESS
+    else:
+        kwargs['start_new_session'] = True
+    subprocess.Popen(cmd, **kwargs)
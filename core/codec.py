@@ -0,0 +1,160 @@
+"""JSON codec for team-monitor plugin.
+
+Every hot path (hook stdin, transcript lines, stored payloads, API
+responses, SSE messages) goes through ``loads``/``dumps`` here. A faster
+backend is used when importable, in order of preference: orjson, msgspec,
+ujson. Otherwise the stdlib ``json`` module is used.
+
+All backends emit the same bytes: compact separators, UTF-8 output without
+ASCII escaping, ``null`` for NaN and infinities (as orjson and msgspec
+write them; JSON has no literal for them), and ``str()`` for values JSON
+can't represent. Anything a
+fast backend rejects (huge ints, lone surrogates) is re-encoded by the
+stdlib encoder, so output never depends on which backend is installed.
+The one exception is float exponent notation (``1e100`` vs ``1e+100``),
+which parses back to the same value either way.
+
+Set ``TEAM_MONITOR_JSON_BACKEND`` to force a backend (e.g. ``stdlib``).
+"""
+
+import json
+import math
+import os
+
+JSONDecodeError = json.JSONDecodeError
+
+_stdlib_encoder = json.JSONEncoder(
+    ensure_ascii=False,
+    separators=(',', ':'),
+    default=str,
+    allow_nan=False,
+)
+
+
+def _stdlib_dumps(obj):
+    try:
+        return _stdlib_encoder.encode(obj)
+    except ValueError:
+        # A NaN or infinity; rare enough to pay for a second pass
+        return _stdlib_encoder.encode(_finite(obj))
+
+
+def _finite(obj):
+    """Copy of obj with non-finite floats replaced as orjson writes them."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {'null' if isinstance(k, float) and not math.isfinite(k) else k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def _stdlib_loads(data):
+    return json.loads(data)
+
+
+def _load_orjson():
+    import orjson
+
+    option = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+    encode = orjson.dumps
+
+    def dumps(obj):
+        try:
+            return encode(obj, default=str, option=option).decode('utf-8')
+        except TypeError:
+            return _stdlib_dumps(obj)
+
+    return dumps, orjson.loads
+
+
+def _load_msgspec():
+    import msgspec
+
+    encoder = msgspec.json.Encoder(enc_hook=str)
+    decode = msgspec.json.decode
+
+    def dumps(obj):
+        try:
+            return encoder.encode(obj).decode('utf-8')
+        except (TypeError, OverflowError, UnicodeEncodeError, msgspec.EncodeError):
+            return _stdlib_dumps(obj)
+
+    def loads(data):
+        try:
+            return decode(data)
+        except msgspec.DecodeError as exc:
+            raise JSONDecodeError(str(exc), data if isinstance(data, str) else '', 0) from None
+
+    return dumps, loads
+
+
+def _load_ujson():
+    import ujson
+
+    encode = ujson.dumps
+    decode = ujson.loads
+
+    def dumps(obj):
+        try:
+            return encode(obj, ensure_ascii=False, escape_forward_slashes=False, default=str)
+        except (TypeError, OverflowError, UnicodeEncodeError):
+            return _stdlib_dumps(obj)
+
+    def loads(data):
+        try:
+            return decode(data)
+        except ValueError as exc:
+            raise JSONDecodeError(str(exc), data if isinstance(data, str) else '', 0) from None
+
+    return dumps, loads
+
+
+_BACKENDS = {
+    'orjson': _load_orjson,
+    'msgspec': _load_msgspec,
+    'ujson': _load_ujson,
+}
+
+
+def load_backend(name):
+    """Return (dumps, loads) for a backend name. Raises ImportError if unavailable."""
+    if name == 'stdlib':
+        return _stdlib_dumps, _stdlib_loads
+    if name not in _BACKENDS:
+        raise ImportError(f'unknown JSON backend: {name}')
+    return _BACKENDS[name]()
+
+
+def available_backends():
+    """Return the names of all importable backends, stdlib last."""
+    names = []
+    for name in _BACKENDS:
+        try:
+            load_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    names.append('stdlib')
+    return names
+
+
+def _select_backend():
+    forced = os.environ.get('TEAM_MONITOR_JSON_BACKEND', '').strip().lower()
+    candidates = [forced] if forced else list(_BACKENDS)
+    for name in candidates:
+        try:
+            return (name,) + tuple(load_backend(name))
+        except ImportError:
+            continue
+    return 'stdlib', _stdlib_dumps, _stdlib_loads
+
+
+# dumps(obj) -> str; loads(str | bytes) -> object, raising JSONDecodeError.
+# Bound directly to the backend functions to keep call overhead minimal.
+BACKEND, dumps, loads = _select_backend()
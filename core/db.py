@@ -2,15 +2,30 @@
 
 import os
 import sqlite3
+import time
 import json
 from datetime import datetime, timezone
 
+from core import codec, latency, usage
+from core.event_parser import add_derived_fields, subagent_name
+from core.metrics import timed_db
+from core.policy import POLICY, lower_level
+from core.snapshots import DashboardState
+from core.timeutil import format_timestamp, now_epoch_us, now_timestamp, to_epoch_us
+
 PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get('TEAM_MONITOR_DATA_DIR') or os.path.join(PLUGIN_ROOT, 'data')
+
+# Two different agents writing the same file within this many seconds raises a conflict alert
+try:
+    CONFLICT_WINDOW_S = float(os.environ.get('TEAM_MONITOR_CONFLICT_WINDOW_S', '') or 120)
+except ValueError:
+    CONFLICT_WINDOW_S = 120.0
 
 
 def get_db_path():
     """Return absolute path to the SQLite database file."""
-    return os.path.join(PLUGIN_ROOT, 'data', 'team_monitor.db')
+    return os.path.join(DATA_DIR, 'team_monitor.db')
 
 
 def _get_connection():
@@ -23,10 +38,17 @@ def _get_connection():
     return conn
 
 
+@timed_db
 def init_db():
-    """Create tables and indexes if they don't exist."""
+    """Create tables and indexes if they don't exist, then apply migrations.
+
+    The schema version is kept in PRAGMA user_version, so on an up-to-date
+    database (every hook call after the first) this is a single cheap read.
+    """
     conn = _get_connection()
     try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
         conn.executescript("""
             CREATE TABLE IF NOT EXISTS events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -62,23 +84,560 @@ def init_db():
                 ended_at TEXT,
                 event_count INTEGER DEFAULT 0
             );
+
+            CREATE TABLE IF NOT EXISTS transcript_imports (
+                path TEXT PRIMARY KEY,
+                byte_offset INTEGER NOT NULL DEFAULT 0,
+                event_count INTEGER DEFAULT 0,
+                imported_at TEXT
+            );
         """)
+
+        # Serialize concurrent migrators (several hooks may start at once)
+        conn.execute("BEGIN IMMEDIATE")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, migrate in _MIGRATIONS:
+            if version < target:
+                migrate(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
     finally:
         conn.close()
 
 
+def _column_names(conn, table):
+    return {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _migrate_epoch_column(conn):
+    """Add the integer epoch-microsecond ordering column and its indexes."""
+    if 'ts_us' not in _column_names(conn, 'events'):
+        conn.execute("ALTER TABLE events ADD COLUMN ts_us INTEGER")
+    # julianday() is only exact to a few microseconds; stored timestamps are ms
+    conn.execute(
+        """UPDATE events SET ts_us =
+             CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000.0) AS INTEGER) * 1000
+           WHERE ts_us IS NULL"""
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_events_timestamp")
+    conn.execute("DROP INDEX IF EXISTS idx_events_agent_name")
+    conn.execute("DROP INDEX IF EXISTS idx_events_event_category")
+    conn.execute("DROP INDEX IF EXISTS idx_events_tool_name")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts_us, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_agent_ts ON events(agent_name, ts_us, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_category_ts ON events(event_category, ts_us, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_tool_ts ON events(tool_name, ts_us, id)")
+
+
+def _migrate_tool_latency(conn):
+    """Add per-event durations and per-agent/per-tool latency histograms."""
+    if 'duration_ms' not in _column_names(conn, 'events'):
+        conn.execute("ALTER TABLE events ADD COLUMN duration_ms REAL")
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS tool_latency (
+               agent_name TEXT NOT NULL,
+               tool_name TEXT NOT NULL,
+               bucket INTEGER NOT NULL,
+               count INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (agent_name, tool_name, bucket)
+           ) WITHOUT ROWID"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS tool_latency_totals (
+               agent_name TEXT NOT NULL,
+               tool_name TEXT NOT NULL,
+               count INTEGER NOT NULL DEFAULT 0,
+               total_ms REAL NOT NULL DEFAULT 0,
+               max_ms REAL NOT NULL DEFAULT 0,
+               PRIMARY KEY (agent_name, tool_name)
+           ) WITHOUT ROWID"""
+    )
+
+
+def _migrate_comm_graph(conn):
+    """Add the agent communication edge table and build it from existing messages."""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS comm_edges (
+               team_name TEXT NOT NULL,
+               sender TEXT NOT NULL,
+               recipient TEXT NOT NULL,
+               msg_type TEXT NOT NULL,
+               count INTEGER NOT NULL DEFAULT 0,
+               bytes INTEGER NOT NULL DEFAULT 0,
+               first_at TEXT,
+               last_at TEXT,
+               PRIMARY KEY (team_name, sender, recipient, msg_type)
+           ) WITHOUT ROWID"""
+    )
+    conn.execute("DELETE FROM comm_edges")
+    _replay_derived(conn, "tool_name = 'SendMessage'")
+
+
+def _migrate_task_board(conn):
+    """Add the materialized task board and its transition log, built from existing task events."""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS tasks (
+               team_name TEXT NOT NULL,
+               task_id TEXT NOT NULL,
+               subject TEXT,
+               status TEXT,
+               owner TEXT,
+               created_at TEXT,
+               updated_at TEXT,
+               PRIMARY KEY (team_name, task_id)
+           ) WITHOUT ROWID"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS task_transitions (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               team_name TEXT NOT NULL,
+               task_id TEXT NOT NULL,
+               field TEXT NOT NULL,
+               old_value TEXT,
+               new_value TEXT,
+               agent_name TEXT,
+               timestamp TEXT,
+               ts_us INTEGER
+           )"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_task_transitions_task ON task_transitions(team_name, task_id, ts_us)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_task_transitions_status ON task_transitions(field, new_value, ts_us)")
+    conn.execute("DELETE FROM tasks")
+    conn.execute("DELETE FROM task_transitions")
+    _replay_derived(conn, "tool_name IN ('TaskCreate', 'TaskUpdate')")
+
+
+def _migrate_file_touches(conn):
+    """Add the file-touch index and the alerts table, indexing existing file events."""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS file_touches (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               file_path TEXT NOT NULL,
+               agent_name TEXT,
+               team_name TEXT,
+               op TEXT NOT NULL,
+               timestamp TEXT,
+               ts_us INTEGER
+           )"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_file_touches_path ON file_touches(file_path, ts_us)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_file_touches_ts ON file_touches(ts_us)")
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS alerts (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               timestamp TEXT NOT NULL,
+               ts_us INTEGER NOT NULL,
+               kind TEXT NOT NULL,
+               severity TEXT NOT NULL DEFAULT 'warning',
+               team_name TEXT,
+               agent_name TEXT,
+               subject TEXT,
+               summary TEXT,
+               detail_json TEXT
+           )"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_kind ON alerts(kind, subject, ts_us)")
+    conn.execute("DELETE FROM file_touches")
+    _replay_derived(conn, "tool_name IN ('Read', 'Edit', 'MultiEdit', 'Write', 'NotebookEdit')")
+
+
+def _migrate_error_flag(conn):
+    """Add the is_error flag the anomaly detector watches.
+
+    Older events stay 0: the detector only looks at live activity.
+    """
+    if 'is_error' not in _column_names(conn, 'events'):
+        conn.execute("ALTER TABLE events ADD COLUMN is_error INTEGER NOT NULL DEFAULT 0")
+
+
+def _migrate_token_usage(conn):
+    """Add per-message token usage and its agent/session/team rollups.
+
+    Usage isn't kept in stored events, so it accumulates from transcripts
+    read after the upgrade.
+    """
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS token_usage_messages (
+               message_id TEXT PRIMARY KEY,
+               agent_name TEXT,
+               session_id TEXT,
+               team_name TEXT,
+               model TEXT,
+               timestamp TEXT,
+               input_tokens INTEGER NOT NULL DEFAULT 0,
+               output_tokens INTEGER NOT NULL DEFAULT 0,
+               cache_creation_tokens INTEGER NOT NULL DEFAULT 0,
+               cache_read_tokens INTEGER NOT NULL DEFAULT 0
+           ) WITHOUT ROWID"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS token_usage (
+               scope TEXT NOT NULL,
+               key TEXT NOT NULL,
+               model TEXT NOT NULL,
+               messages INTEGER NOT NULL DEFAULT 0,
+               input_tokens INTEGER NOT NULL DEFAULT 0,
+               output_tokens INTEGER NOT NULL DEFAULT 0,
+               cache_creation_tokens INTEGER NOT NULL DEFAULT 0,
+               cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+               last_at TEXT,
+               PRIMARY KEY (scope, key, model)
+           ) WITHOUT ROWID"""
+    )
+
+
+def _migrate_event_key(conn):
+    """Add the event identity column and its unique index.
+
+    Live tool calls already stored get their tool_use id as key; everything
+    else stays NULL, which the partial index ignores.
+    """
+    if 'event_key' not in _column_names(conn, 'events'):
+        conn.execute("ALTER TABLE events ADD COLUMN event_key TEXT")
+    seen = set(row[0] for row in conn.execute("SELECT event_key FROM events WHERE event_key IS NOT NULL"))
+    updates = []
+    rows = conn.execute(
+        "SELECT id, payload_json FROM events "
+        "WHERE event_key IS NULL AND payload_json LIKE '%\"tool_use_id\"%' ORDER BY id"
+    ).fetchall()
+    for row in rows:
+        try:
+            tool_use_id = codec.loads(row['payload_json']).get('tool_use_id')
+        except (codec.JSONDecodeError, AttributeError):
+            continue
+        key = f'tu:{tool_use_id}' if tool_use_id else None
+        if key and key not in seen:
+            seen.add(key)
+            updates.append((key, row['id']))
+    conn.executemany("UPDATE events SET event_key = ? WHERE id = ?", updates)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_events_key ON events(event_key) WHERE event_key IS NOT NULL")
+
+
+def _migrate_ingest_policy(conn):
+    """Track stored payload bytes per session and count ingest policy outcomes."""
+    if 'stored_bytes' not in _column_names(conn, 'sessions'):
+        conn.execute("ALTER TABLE sessions ADD COLUMN stored_bytes INTEGER NOT NULL DEFAULT 0")
+        conn.execute(
+            """UPDATE sessions SET stored_bytes = COALESCE(
+                   (SELECT SUM(LENGTH(payload_json)) FROM events WHERE events.session_id = sessions.session_id), 0)"""
+        )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS ingest_counters (
+               tool_name TEXT NOT NULL,
+               outcome TEXT NOT NULL,
+               count INTEGER NOT NULL DEFAULT 0,
+               bytes INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (tool_name, outcome)
+           ) WITHOUT ROWID"""
+    )
+
+
+def _migrate_state_snapshots(conn):
+    """Add periodic snapshots of the dashboard state, for time travel."""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS state_snapshots (
+               cut_us INTEGER PRIMARY KEY,
+               timestamp TEXT,
+               event_count INTEGER NOT NULL,
+               state_json TEXT NOT NULL
+           )"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_task_transitions_ts ON task_transitions(ts_us)")
+
+
+def _migrate_event_node(conn):
+    """Record which federated node an event was shipped from (NULL for local events)."""
+    if 'node' not in _column_names(conn, 'events'):
+        conn.execute("ALTER TABLE events ADD COLUMN node TEXT")
+
+
+def _migrate_team_scope(conn):
+    """Scope agents and latency by team, and add per-team counts, the subagent tree and team/session indexes.
+
+    Agents were keyed by name alone, so same-named agents of different teams
+    shared one record; both tables are rebuilt from the stored events.
+    """
+    conn.execute("UPDATE events SET team_name = 'unknown' WHERE team_name IS NULL OR team_name = ''")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_team_ts ON events(team_name, ts_us, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_session_ts ON events(session_id, ts_us, id)")
+    conn.execute("DROP INDEX IF EXISTS idx_events_session_id")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_team ON sessions(team_name, ended_at)")
+
+    if not any(row['pk'] for row in conn.execute("PRAGMA table_info(agents)")):
+        conn.execute(
+            """CREATE TABLE agents_scoped (
+                   team_name TEXT NOT NULL,
+                   agent_name TEXT NOT NULL,
+                   first_seen TEXT,
+                   last_seen TEXT,
+                   event_count INTEGER DEFAULT 0,
+                   PRIMARY KEY (team_name, agent_name)
+               ) WITHOUT ROWID"""
+        )
+        conn.execute("DROP TABLE agents")
+        conn.execute("ALTER TABLE agents_scoped RENAME TO agents")
+
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS team_counts (
+               team_name TEXT NOT NULL,
+               event_category TEXT NOT NULL,
+               count INTEGER NOT NULL DEFAULT 0,
+               first_at TEXT,
+               last_at TEXT,
+               PRIMARY KEY (team_name, event_category)
+           ) WITHOUT ROWID"""
+    )
+
+    if 'team_name' not in _column_names(conn, 'tool_latency'):
+        conn.execute("DROP TABLE tool_latency")
+        conn.execute("DROP TABLE tool_latency_totals")
+        conn.execute(
+            """CREATE TABLE tool_latency (
+                   team_name TEXT NOT NULL,
+                   agent_name TEXT NOT NULL,
+                   tool_name TEXT NOT NULL,
+                   bucket INTEGER NOT NULL,
+                   count INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (team_name, agent_name, tool_name, bucket)
+               ) WITHOUT ROWID"""
+        )
+        conn.execute(
+            """CREATE TABLE tool_latency_totals (
+                   team_name TEXT NOT NULL,
+                   agent_name TEXT NOT NULL,
+                   tool_name TEXT NOT NULL,
+                   count INTEGER NOT NULL DEFAULT 0,
+                   total_ms REAL NOT NULL DEFAULT 0,
+                   max_ms REAL NOT NULL DEFAULT 0,
+                   PRIMARY KEY (team_name, agent_name, tool_name)
+               ) WITHOUT ROWID"""
+        )
+    _rebuild_team_rollups(conn)
+
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS subagents (
+               team_name TEXT NOT NULL,
+               agent_name TEXT NOT NULL,
+               parent_name TEXT,
+               agent_id TEXT,
+               agent_type TEXT,
+               session_id TEXT,
+               started_at TEXT,
+               stopped_at TEXT,
+               PRIMARY KEY (team_name, agent_name)
+           ) WITHOUT ROWID"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_subagents_session ON subagents(session_id)")
+    conn.execute("DELETE FROM subagents")
+    _replay_derived(conn, "hook_event IN ('SubagentStart', 'SubagentStop')")
+    # Snapshots hold agents keyed by name alone; they are rebuilt by the maintenance thread
+    conn.execute("DELETE FROM state_snapshots")
+
+
+def _rebuild_team_rollups(conn):
+    """Rebuild the per-team agent, category and latency rollups from the stored events."""
+    conn.execute("DELETE FROM agents")
+    conn.execute(
+        """INSERT INTO agents (team_name, agent_name, first_seen, last_seen, event_count)
+           SELECT team_name, agent_name, MIN(timestamp), MAX(timestamp), COUNT(*) FROM events
+           WHERE agent_name IS NOT NULL AND agent_name != '' GROUP BY team_name, agent_name"""
+    )
+    conn.execute("DELETE FROM team_counts")
+    conn.execute(
+        """INSERT INTO team_counts (team_name, event_category, count, first_at, last_at)
+           SELECT team_name, COALESCE(event_category, 'unknown'), COUNT(*), MIN(timestamp), MAX(timestamp)
+           FROM events GROUP BY team_name, COALESCE(event_category, 'unknown')"""
+    )
+    conn.execute("DELETE FROM tool_latency")
+    conn.execute("DELETE FROM tool_latency_totals")
+    timed = "FROM events WHERE duration_ms IS NOT NULL AND tool_name IS NOT NULL AND tool_name != ''"
+    conn.create_function('latency_bucket', 1, latency.bucket_index, deterministic=True)
+    conn.execute(
+        f"""INSERT INTO tool_latency (team_name, agent_name, tool_name, bucket, count)
+            SELECT team_name, COALESCE(agent_name, 'unknown'), tool_name, latency_bucket(duration_ms), COUNT(*)
+            {timed} GROUP BY 1, 2, 3, 4"""
+    )
+    conn.execute(
+        f"""INSERT INTO tool_latency_totals (team_name, agent_name, tool_name, count, total_ms, max_ms)
+            SELECT team_name, COALESCE(agent_name, 'unknown'), tool_name, COUNT(*), SUM(duration_ms),
+                   MAX(duration_ms)
+            {timed} GROUP BY 1, 2, 3"""
+    )
+
+
+def _migrate_session_teams(conn):
+    """Give events stored without a team their session's team, as ingest now does.
+
+    Before this, one agent's calls without a team_name of their own were
+    filed under 'unknown' and split its card from its team's. Revisions
+    gain the team an event was moved from.
+    """
+    if 'team_from' not in _column_names(conn, 'event_revisions'):
+        conn.execute("ALTER TABLE event_revisions ADD COLUMN team_from TEXT")
+    conn.execute(
+        """UPDATE events SET team_name = (
+               SELECT s.team_name FROM sessions s WHERE s.session_id = events.session_id)
+           WHERE team_name = 'unknown' AND session_id IN (
+               SELECT session_id FROM sessions WHERE team_name IS NOT NULL AND team_name NOT IN ('', 'unknown'))"""
+    )
+    _rebuild_team_rollups(conn)
+    conn.execute("DELETE FROM subagents")
+    _replay_derived(conn, "hook_event IN ('SubagentStart', 'SubagentStop')")
+    conn.execute("DELETE FROM state_snapshots")
+
+
+def _migrate_usage_teams(conn):
+    """Key agent token usage by team and name, as agents are.
+
+    Same-named agents of different teams shared one usage entry, so each
+    team's cards showed the other's spend. Messages recorded without a team
+    take their session's, and the rollups are rebuilt from the messages.
+    """
+    conn.execute(
+        """UPDATE token_usage_messages SET team_name = (
+               SELECT s.team_name FROM sessions s WHERE s.session_id = token_usage_messages.session_id)
+           WHERE COALESCE(team_name, 'unknown') = 'unknown' AND session_id IN (
+               SELECT session_id FROM sessions WHERE team_name IS NOT NULL AND team_name NOT IN ('', 'unknown'))"""
+    )
+    conn.execute("DROP TABLE IF EXISTS token_usage")
+    conn.execute(
+        """CREATE TABLE token_usage (
+               scope TEXT NOT NULL,
+               team_name TEXT NOT NULL DEFAULT '',
+               key TEXT NOT NULL,
+               model TEXT NOT NULL,
+               messages INTEGER NOT NULL DEFAULT 0,
+               input_tokens INTEGER NOT NULL DEFAULT 0,
+               output_tokens INTEGER NOT NULL DEFAULT 0,
+               cache_creation_tokens INTEGER NOT NULL DEFAULT 0,
+               cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+               last_at TEXT,
+               PRIMARY KEY (scope, team_name, key, model)
+           ) WITHOUT ROWID"""
+    )
+    # Only agent rows carry a team; a session's or team's key already names it
+    for scope, team, key in (('agent', "COALESCE(team_name, 'unknown')", 'agent_name'),
+                             ('session', "''", 'session_id'), ('team', "''", 'team_name')):
+        conn.execute(
+            f"""INSERT INTO token_usage
+                (scope, team_name, key, model, messages, input_tokens, output_tokens,
+                 cache_creation_tokens, cache_read_tokens, last_at)
+                SELECT ?, {team}, {key}, model, COUNT(*), SUM(input_tokens), SUM(output_tokens),
+                       SUM(cache_creation_tokens), SUM(cache_read_tokens), MAX(timestamp)
+                FROM token_usage_messages WHERE {key} IS NOT NULL AND {key} != ''
+                GROUP BY {team}, {key}, model""",
+            (scope,)
+        )
+
+
+def _migrate_backfill_jobs(conn):
+    """Add the queue of transcript backfill jobs enqueued by SubagentStop."""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS backfill_jobs (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               transcript_path TEXT NOT NULL,
+               agent_name TEXT,
+               session_id TEXT,
+               team_name TEXT,
+               fallback_ts TEXT,
+               status TEXT NOT NULL DEFAULT 'pending',
+               attempts INTEGER NOT NULL DEFAULT 0,
+               run_after_us INTEGER NOT NULL DEFAULT 0,
+               bytes_done INTEGER NOT NULL DEFAULT 0,
+               bytes_total INTEGER,
+               events INTEGER NOT NULL DEFAULT 0,
+               worker TEXT,
+               error TEXT,
+               created_at TEXT,
+               updated_us INTEGER
+           )"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_backfill_jobs_status ON backfill_jobs(status, run_after_us)")
+
+
+def _migrate_event_revisions(conn):
+    """Add the log of stored events changed after insert, for readers that cache rows."""
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS event_revisions (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               event_id INTEGER NOT NULL
+           )"""
+    )
+
+
+def _replay_derived(conn, condition):
+    """Rebuild derived-table entries for stored events matching an SQL condition.
+
+    Used by migrations that introduce a new derived table, so history
+    ingested before the upgrade is reflected too.
+    """
+    rows = conn.execute(
+        f"SELECT id, timestamp, session_id, team_name, agent_name, hook_event, tool_name, payload_json "
+        f"FROM events WHERE {condition} ORDER BY id"
+    )
+    for row in rows.fetchall():
+        try:
+            payload = codec.loads(row['payload_json'] or '{}')
+        except codec.JSONDecodeError:
+            continue
+        if not isinstance(payload, dict):
+            continue
+        event = dict(row)
+        tool_input = payload.get('tool_input')
+        add_derived_fields(event, row['tool_name'], tool_input if isinstance(tool_input, dict) else {},
+                           payload.get('tool_response') or payload.get('tool_result'), payload)
+        _apply_derived(conn, event)
+
+
+# (schema version, migration) pairs, applied in order to older databases.
+# Migrations must be idempotent: a fresh database runs all of them.
+_MIGRATIONS = [
+    (1, _migrate_epoch_column),
+    (2, _migrate_tool_latency),
+    (3, _migrate_comm_graph),
+    (4, _migrate_task_board),
+    (5, _migrate_file_touches),
+    (6, _migrate_error_flag),
+    (7, _migrate_token_usage),
+    (8, _migrate_event_key),
+    (9, _migrate_ingest_policy),
+    (10, _migrate_state_snapshots),
+    (11, _migrate_event_node),
+    (12, _migrate_team_scope),
+    (13, _migrate_backfill_jobs),
+    (14, _migrate_event_revisions),
+    (15, _migrate_session_teams),
+    (16, _migrate_usage_teams),
+]
+SCHEMA_VERSION = _MIGRATIONS[-1][0]
+
+
+@timed_db
 def insert_event(event_dict):
-    """Insert an event row and upsert agent/session records. Returns event id."""
+    """Insert an event row and upsert agent/session records. Returns event id.
+
+    If an event with the same event_key is already stored, nothing is
+    inserted and the stored event's id is returned (filling in its duration
+    if only this copy has one). Returns None if the ingest policy samples
+    the event out.
+    """
     conn = _get_connection()
     try:
+        _resolve_teams(conn, [event_dict])
+        admitted, counts = _admit(conn, [event_dict])
+        if not admitted:
+            _write_counters(conn, counts)
+            conn.commit()
+            return None
+
         cursor = conn.execute(
-            """INSERT INTO events
-               (timestamp, session_id, team_name, agent_name, hook_event,
-                tool_name, event_category, summary, payload_json)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            """INSERT OR IGNORE INTO events
+               (timestamp, ts_us, session_id, team_name, agent_name, hook_event,
+                tool_name, event_category, summary, payload_json, duration_ms, is_error, event_key)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             (
                 event_dict.get('timestamp'),
+                to_epoch_us(event_dict.get('timestamp')),
                 event_dict.get('session_id'),
                 event_dict.get('team_name'),
                 event_dict.get('agent_name'),
@@ -87,140 +646,2090 @@ def insert_event(event_dict):
                 event_dict.get('event_category'),
                 event_dict.get('summary'),
                 event_dict.get('payload_json'),
+                event_dict.get('duration_ms'),
+                event_dict.get('is_error', 0),
+                event_dict.get('event_key'),
             )
         )
+        if not cursor.rowcount:
+            event_id = _merge_duplicate(conn, event_dict)
+            conn.commit()
+            return event_id
         event_id = cursor.lastrowid
         ts = event_dict.get('timestamp')
+        _write_counters(conn, counts)
+        _invalidate_snapshots(conn, to_epoch_us(ts))
 
         # Upsert agent record
+        team_name = event_dict['team_name']
         agent_name = event_dict.get('agent_name')
         if agent_name:
             conn.execute(
-                """INSERT INTO agents (agent_name, team_name, first_seen, last_seen, event_count)
+                """INSERT INTO agents (team_name, agent_name, first_seen, last_seen, event_count)
                    VALUES (?, ?, ?, ?, 1)
-                   ON CONFLICT(agent_name) DO UPDATE SET
-                     team_name = COALESCE(excluded.team_name, agents.team_name),
-                     last_seen = excluded.last_seen,
+                   ON CONFLICT(team_name, agent_name) DO UPDATE SET
+                     last_seen = MAX(COALESCE(agents.last_seen, excluded.last_seen), excluded.last_seen),
                      event_count = agents.event_count + 1""",
-                (agent_name, event_dict.get('team_name'), ts, ts)
+                (team_name, agent_name, ts, ts)
             )
 
         # Upsert session record
         session_id = event_dict.get('session_id')
         if session_id:
             conn.execute(
-                """INSERT INTO sessions (session_id, team_name, started_at, ended_at, event_count)
-                   VALUES (?, ?, ?, ?, 1)
+                """INSERT INTO sessions (session_id, team_name, started_at, ended_at, event_count, stored_bytes)
+                   VALUES (?, ?, ?, ?, 1, ?)
                    ON CONFLICT(session_id) DO UPDATE SET
-                     team_name = COALESCE(excluded.team_name, sessions.team_name),
-                     ended_at = excluded.ended_at,
-                     event_count = sessions.event_count + 1""",
-                (session_id, event_dict.get('team_name'), ts, ts)
+                     team_name = COALESCE(NULLIF(excluded.team_name, 'unknown'), sessions.team_name),
+                     ended_at = MAX(COALESCE(sessions.ended_at, excluded.ended_at), excluded.ended_at),
+                     event_count = sessions.event_count + 1,
+                     stored_bytes = sessions.stored_bytes + excluded.stored_bytes""",
+                (session_id, team_name, ts, ts, len(event_dict.get('payload_json') or ''))
             )
 
+        _write_team_counts(conn, {(team_name, event_dict.get('event_category') or 'unknown'): [ts, ts, 1]})
+
+        _apply_derived(conn, event_dict)
+
         conn.commit()
         return event_id
     finally:
         conn.close()
 
 
-def get_events(page=1, per_page=50, category=None, agent=None, tool=None):
-    """Paginated event query with optional filters. Returns list of dicts."""
+@timed_db
+def insert_events(events, source_path=None, source_offset=None, usage_records=None):
+    """Bulk-insert events in a single transaction. Returns number inserted.
+
+    Events whose event_key is already stored (or repeated within the batch)
+    are skipped, so re-reading a transcript or backfilling calls that were
+    captured live doesn't store them twice. The ingest policy's sampling and
+    session budgets apply as in insert_event.
+
+    Agent/session records are aggregated once per batch rather than per row.
+    Because backfilled events may be older than what is already stored,
+    first_seen/last_seen only ever widen.
+
+    If source_path is given, the import watermark for that source (a
+    transcript file, or 'federation:<node>' for shipped events) is advanced to
+    source_offset in the same transaction, so an interrupted import never
+    records progress for events it didn't store. usage_records (from
+    parse_transcript_from) are folded into the token usage rollups in the
+    same transaction.
+    """
     conn = _get_connection()
     try:
-        conditions = []
-        params = []
-        if category:
-            conditions.append("event_category = ?")
-            params.append(category)
-        if agent:
-            conditions.append("agent_name = ?")
-            params.append(agent)
-        if tool:
-            conditions.append("tool_name = ?")
-            params.append(tool)
+        # Take the write lock up front so the duplicate check below can't race another writer
+        conn.execute("BEGIN IMMEDIATE")
+        events = _drop_duplicates(conn, events)
+        _resolve_teams(conn, events)
+        events, counts = _admit(conn, events)
+        _write_counters(conn, counts)
+        rows = []
+        agents = {}
+        sessions = {}
+        team_counts = {}
+        for ev in events:
+            ts = ev.get('timestamp')
+            rows.append((
+                ts,
+                to_epoch_us(ts),
+                ev.get('session_id'),
+                ev['team_name'],
+                ev.get('agent_name'),
+                ev.get('hook_event'),
+                ev.get('tool_name'),
+                ev.get('event_category'),
+                ev.get('summary'),
+                ev.get('payload_json'),
+                ev.get('duration_ms'),
+                ev.get('is_error', 0),
+                ev.get('event_key'),
+                ev.get('node'),
+            ))
+            if ev.get('agent_name'):
+                _accumulate(agents, (ev['team_name'], ev['agent_name']), None, ts)
+            _accumulate(sessions, ev.get('session_id'), ev['team_name'], ts)
+            _accumulate(team_counts, (ev['team_name'], ev.get('event_category') or 'unknown'), None, ts)
 
-        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
-        offset = (page - 1) * per_page
-        params.extend([per_page, offset])
+        conn.executemany(
+            """INSERT OR IGNORE INTO events
+               (timestamp, ts_us, session_id, team_name, agent_name, hook_event,
+                tool_name, event_category, summary, payload_json, duration_ms, is_error, event_key, node)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows
+        )
+        _invalidate_snapshots(conn, min((row[1] for row in rows if row[1] is not None), default=None))
 
-        rows = conn.execute(
-            f"SELECT id, timestamp, session_id, team_name, agent_name, hook_event, "
-            f"tool_name, event_category, summary "
-            f"FROM events{where} ORDER BY timestamp DESC LIMIT ? OFFSET ?",
-            params
-        ).fetchall()
+        for ev in events:
+            _apply_derived(conn, ev)
+        session_teams = {ev.get('session_id'): ev['team_name'] for ev in events if ev['team_name'] != 'unknown'}
+        for record in usage_records or ():
+            if record['team_name'] in (None, 'unknown'):
+                record = dict(record, team_name=session_teams.get(record['session_id'], record['team_name']))
+            _record_usage(conn, record)
 
-        # Get total count for pagination
-        count_params = params[:-2]  # exclude limit/offset
-        total = conn.execute(
-            f"SELECT COUNT(*) FROM events{where}",
-            count_params
-        ).fetchone()[0]
+        _write_agents(conn, agents)
+        _write_team_counts(conn, {key: agg[1:] for key, agg in team_counts.items()})
 
-        return {
-            'events': [dict(row) for row in rows],
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'pages': (total + per_page - 1) // per_page if per_page else 0,
-        }
+        conn.executemany(
+            """INSERT INTO sessions (session_id, team_name, started_at, ended_at, event_count)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(session_id) DO UPDATE SET
+                 team_name = COALESCE(NULLIF(excluded.team_name, 'unknown'), sessions.team_name),
+                 started_at = MIN(COALESCE(sessions.started_at, excluded.started_at), excluded.started_at),
+                 ended_at = MAX(COALESCE(sessions.ended_at, excluded.ended_at), excluded.ended_at),
+                 event_count = sessions.event_count + excluded.event_count""",
+            [(sid,) + tuple(agg) for sid, agg in sessions.items()]
+        )
+        session_bytes = {}
+        for ev in events:
+            if ev.get('session_id'):
+                sid = ev['session_id']
+                session_bytes[sid] = session_bytes.get(sid, 0) + len(ev.get('payload_json') or '')
+        conn.executemany(
+            "UPDATE sessions SET stored_bytes = stored_bytes + ? WHERE session_id = ?",
+            [(size, sid) for sid, size in session_bytes.items()]
+        )
+
+        if source_path:
+            conn.execute(
+                """INSERT INTO transcript_imports (path, byte_offset, event_count, imported_at)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(path) DO UPDATE SET
+                     byte_offset = excluded.byte_offset,
+                     event_count = transcript_imports.event_count + excluded.event_count,
+                     imported_at = excluded.imported_at""",
+                (source_path, source_offset or 0, len(rows), now_timestamp())
+            )
+
+        conn.commit()
+        return len(rows)
     finally:
         conn.close()
 
 
-def get_event_by_id(event_id):
-    """Return a single event with full payload, or None."""
+# Newest event revisions kept for readers catching up (see get_event_revisions)
+REVISIONS_KEPT = 10000
+
+
+def _merge_duplicate(conn, event_dict):
+    """Handle a second copy of a stored event; returns the stored event's id.
+
+    Transcript copies of a tool call carry no duration, so when the live copy
+    arrives second its duration is kept, and the change is logged in
+    event_revisions for readers holding the row (see get_event_revisions).
+    """
+    row = conn.execute(
+        "SELECT id, team_name, agent_name, tool_name, duration_ms FROM events WHERE event_key = ?",
+        (event_dict['event_key'],)
+    ).fetchone()
+    duration_ms = event_dict.get('duration_ms')
+    if duration_ms is not None and row['duration_ms'] is None and row['tool_name']:
+        conn.execute("UPDATE events SET duration_ms = ? WHERE id = ?", (duration_ms, row['id']))
+        _record_latency(conn, row['team_name'] or 'unknown', row['agent_name'] or 'unknown', row['tool_name'],
+                        duration_ms)
+        _log_revisions(conn, [row['id']])
+    return row['id']
+
+
+def _log_revisions(conn, event_ids, team_from=None):
+    """Record stored events changed after insert (see get_event_revisions)."""
+    conn.executemany("INSERT INTO event_revisions (event_id, team_from) VALUES (?, ?)",
+                     [(event_id, team_from) for event_id in event_ids])
+    revision = conn.execute("SELECT MAX(id) FROM event_revisions").fetchone()[0]
+    conn.execute("DELETE FROM event_revisions WHERE id <= ?", (revision - REVISIONS_KEPT,))
+
+
+def _apply_derived(conn, event_dict):
+    """Update the tables derived from events (latency, comm graph, subagent tree) at ingest time."""
+    # Fold the tool call's duration into its latency histogram
+    duration_ms = event_dict.get('duration_ms')
+    if duration_ms is not None and event_dict.get('tool_name'):
+        _record_latency(conn, event_dict.get('team_name') or 'unknown', event_dict.get('agent_name') or 'unknown',
+                        event_dict['tool_name'], duration_ms)
+
+    edge = event_dict.get('message_edge')
+    if edge:
+        _record_message_edge(conn, event_dict.get('team_name') or 'unknown', edge, event_dict.get('timestamp'))
+
+    change = event_dict.get('task_change')
+    if change:
+        _record_task_change(conn, event_dict, change)
+
+    touch = event_dict.get('file_touch')
+    if touch:
+        _record_file_touch(conn, event_dict, touch)
+
+    link = event_dict.get('subagent_link')
+    if link:
+        _record_subagent(conn, event_dict, link)
+
+
+def _record_subagent(conn, event_dict, link):
+    """Record a subagent starting or stopping under its parent.
+
+    A subagent started again after it stopped (same name) is running again.
+    """
+    ts = event_dict.get('timestamp')
+    started, stopped = (ts, None) if link['op'] == 'start' else (None, ts)
+    conn.execute(
+        """INSERT INTO subagents
+             (team_name, agent_name, parent_name, agent_id, agent_type, session_id, started_at, stopped_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(team_name, agent_name) DO UPDATE SET
+             parent_name = COALESCE(subagents.parent_name, excluded.parent_name),
+             agent_id = COALESCE(excluded.agent_id, subagents.agent_id),
+             agent_type = COALESCE(excluded.agent_type, subagents.agent_type),
+             session_id = COALESCE(subagents.session_id, excluded.session_id),
+             started_at = COALESCE(MIN(subagents.started_at, excluded.started_at),
+                                   subagents.started_at, excluded.started_at),
+             stopped_at = CASE
+               WHEN excluded.started_at > subagents.stopped_at THEN NULL
+               ELSE COALESCE(MAX(subagents.stopped_at, excluded.stopped_at),
+                             subagents.stopped_at, excluded.stopped_at)
+             END""",
+        (event_dict.get('team_name') or 'unknown', link['agent_name'], link['parent_name'], link['agent_id'],
+         link['agent_type'], event_dict.get('session_id'), started, stopped)
+    )
+
+
+def _record_file_touch(conn, event_dict, touch):
+    """Index a file read/write and raise a conflict alert on concurrent writes.
+
+    A write conflicts when another agent wrote the same path within
+    CONFLICT_WINDOW_S before it. One alert is kept per path per window.
+    """
+    agent_name = event_dict.get('agent_name') or 'unknown'
+    ts = event_dict.get('timestamp')
+    ts_us = to_epoch_us(ts)
+    conn.execute(
+        """INSERT INTO file_touches (file_path, agent_name, team_name, op, timestamp, ts_us)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        (touch['path'], agent_name, event_dict.get('team_name'), touch['op'], ts, ts_us)
+    )
+    if touch['op'] != 'write' or ts_us is None:
+        return
+
+    window_start = ts_us - int(CONFLICT_WINDOW_S * 1000000)
+    others = [row[0] for row in conn.execute(
+        """SELECT DISTINCT agent_name FROM file_touches
+           WHERE file_path = ? AND ts_us >= ? AND ts_us <= ? AND op = 'write' AND agent_name != ?""",
+        (touch['path'], window_start, ts_us, agent_name)
+    )]
+    if not others:
+        return
+    already = conn.execute(
+        "SELECT 1 FROM alerts WHERE kind = 'file_conflict' AND subject = ? AND ts_us >= ? LIMIT 1",
+        (touch['path'], window_start)
+    ).fetchone()
+    if already:
+        return
+
+    agents = sorted(set(others) | {agent_name})
+    _insert_alert(
+        conn, 'file_conflict', ts, ts_us,
+        team_name=event_dict.get('team_name'),
+        agent_name=agent_name,
+        subject=touch['path'],
+        summary=f"Concurrent writes to {touch['path']} by {', '.join(agents)}",
+        detail={'agents': agents, 'window_s': CONFLICT_WINDOW_S},
+    )
+
+
+def _insert_alert(conn, kind, ts, ts_us, severity='warning', team_name=None, agent_name=None,
+                  subject=None, summary=None, detail=None):
+    conn.execute(
+        """INSERT INTO alerts
+           (timestamp, ts_us, kind, severity, team_name, agent_name, subject, summary, detail_json)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (ts, ts_us, kind, severity, team_name, agent_name, subject, summary,
+         codec.dumps(detail) if detail is not None else None)
+    )
+
+
+# Task fields tracked in the transition log
+_TASK_FIELDS = ('status', 'owner', 'subject')
+
+
+def _record_task_change(conn, event_dict, change):
+    """Apply a TaskCreate/TaskUpdate to the task board and log what changed.
+
+    Backfilled events can be older than the board's current state; they
+    are still logged as transitions but don't overwrite newer values.
+    """
+    team_name = event_dict.get('team_name') or 'unknown'
+    task_id = change['task_id']
+    ts = event_dict.get('timestamp')
+    row = conn.execute(
+        "SELECT subject, status, owner, created_at, updated_at FROM tasks WHERE team_name = ? AND task_id = ?",
+        (team_name, task_id)
+    ).fetchone()
+    current = dict(row) if row else {}
+    stale = bool(row and ts and row['updated_at'] and ts < row['updated_at'])
+
+    transitions = []
+    for field in _TASK_FIELDS:
+        value = change.get(field)
+        if value is None or value == current.get(field):
+            continue
+        transitions.append((team_name, task_id, field, current.get(field), value,
+                            event_dict.get('agent_name'), ts, to_epoch_us(ts)))
+        if not stale:
+            current[field] = value
+    if transitions:
+        conn.executemany(
+            """INSERT INTO task_transitions
+               (team_name, task_id, field, old_value, new_value, agent_name, timestamp, ts_us)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            transitions
+        )
+
+    created_at = current.get('created_at')
+    if change['action'] == 'create' and ts and (created_at is None or ts < created_at):
+        created_at = ts
+    conn.execute(
+        """INSERT INTO tasks (team_name, task_id, subject, status, owner, created_at, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(team_name, task_id) DO UPDATE SET
+             subject = excluded.subject,
+             status = excluded.status,
+             owner = excluded.owner,
+             created_at = excluded.created_at,
+             updated_at = MAX(COALESCE(tasks.updated_at, excluded.updated_at), excluded.updated_at)""",
+        (team_name, task_id, current.get('subject'), current.get('status'), current.get('owner'),
+         created_at, ts)
+    )
+
+
+def _record_message_edge(conn, team_name, edge, ts):
+    conn.execute(
+        """INSERT INTO comm_edges (team_name, sender, recipient, msg_type, count, bytes, first_at, last_at)
+           VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+           ON CONFLICT(team_name, sender, recipient, msg_type) DO UPDATE SET
+             count = comm_edges.count + 1,
+             bytes = comm_edges.bytes + excluded.bytes,
+             first_at = MIN(COALESCE(comm_edges.first_at, excluded.first_at), excluded.first_at),
+             last_at = MAX(COALESCE(comm_edges.last_at, excluded.last_at), excluded.last_at)""",
+        (team_name, edge['sender'], edge['recipient'], edge['type'], edge['bytes'], ts, ts)
+    )
+
+
+_USAGE_SCOPES = (('agent', 'agent_name'), ('session', 'session_id'), ('team', 'team_name'))
+
+
+def _record_usage(conn, record):
+    """Store one message's token usage and add what's new to the rollups.
+
+    The same message can be seen again (a resumed transcript, a re-import);
+    counts only ever grow to the largest seen, and rollups get the difference.
+    A message without a team takes its session's, like the session's events.
+    """
+    columns = usage.TOKEN_FIELDS
+    row = conn.execute(
+        "SELECT team_name, input_tokens, output_tokens, cache_creation_tokens, cache_read_tokens "
+        "FROM token_usage_messages WHERE message_id = ?",
+        (record['message_id'],)
+    ).fetchone()
+    old = dict(row) if row else dict.fromkeys(columns, 0)
+    new = {c: max(old[c], record[c]) for c in columns}
+    delta = [new[c] - old[c] for c in columns]
+    if row and not any(delta):
+        return
+
+    if row:
+        # Rollups stay under the team the message was first counted for
+        team_name = row['team_name']
+        conn.execute(
+            "UPDATE token_usage_messages SET input_tokens = ?, output_tokens = ?, "
+            "cache_creation_tokens = ?, cache_read_tokens = ? WHERE message_id = ?",
+            [new[c] for c in columns] + [record['message_id']]
+        )
+    else:
+        team_name = record['team_name']
+        if not team_name or team_name == 'unknown':
+            session = conn.execute(
+                "SELECT team_name FROM sessions WHERE session_id = ?", (record['session_id'],)
+            ).fetchone()
+            if session and session[0]:
+                team_name = session[0]
+        conn.execute(
+            """INSERT INTO token_usage_messages
+               (message_id, agent_name, session_id, team_name, model, timestamp,
+                input_tokens, output_tokens, cache_creation_tokens, cache_read_tokens)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [record['message_id'], record['agent_name'], record['session_id'], team_name,
+             record['model'], record['timestamp']] + [new[c] for c in columns]
+        )
+
+    keys = {'agent_name': record['agent_name'], 'session_id': record['session_id'], 'team_name': team_name}
+    _add_usage(conn, [(scope, team_name if scope == 'agent' else '', keys[field], record['model'],
+                       0 if row else 1, *delta, record['timestamp'])
+                      for scope, field in _USAGE_SCOPES if keys[field]])
+
+
+def _add_usage(conn, rollups):
+    """Add (scope, team_name, key, model, messages, *TOKEN_FIELDS, last_at) rows to the usage rollups."""
+    conn.executemany(
+        """INSERT INTO token_usage
+           (scope, team_name, key, model, messages, input_tokens, output_tokens,
+            cache_creation_tokens, cache_read_tokens, last_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(scope, team_name, key, model) DO UPDATE SET
+             messages = token_usage.messages + excluded.messages,
+             input_tokens = token_usage.input_tokens + excluded.input_tokens,
+             output_tokens = token_usage.output_tokens + excluded.output_tokens,
+             cache_creation_tokens = token_usage.cache_creation_tokens + excluded.cache_creation_tokens,
+             cache_read_tokens = token_usage.cache_read_tokens + excluded.cache_read_tokens,
+             last_at = MAX(COALESCE(token_usage.last_at, excluded.last_at), excluded.last_at)""",
+        rollups
+    )
+
+
+def _move_usage(conn, session_id, team):
+    """Move a session's token usage recorded under 'unknown' to its team's agent and team rollups."""
+    rows = conn.execute(
+        "SELECT * FROM token_usage_messages WHERE session_id = ? AND team_name = 'unknown'", (session_id,)
+    ).fetchall()
+    if not rows:
+        return
+    conn.execute("UPDATE token_usage_messages SET team_name = ? WHERE session_id = ? AND team_name = 'unknown'",
+                 (team, session_id))
+    moves = []
+    for row in rows:
+        tokens = [row[c] for c in usage.TOKEN_FIELDS]
+        moves.append(('agent', 'unknown', row['agent_name'], row['model'], *tokens))
+        moves.append(('team', '', 'unknown', row['model'], *tokens))
+        _add_usage(conn, [('agent', team, row['agent_name'], row['model'], 1, *tokens, row['timestamp']),
+                          ('team', '', team, row['model'], 1, *tokens, row['timestamp'])])
+    conn.executemany(
+        """UPDATE token_usage SET messages = messages - 1, input_tokens = input_tokens - ?,
+             output_tokens = output_tokens - ?, cache_creation_tokens = cache_creation_tokens - ?,
+             cache_read_tokens = cache_read_tokens - ?
+           WHERE scope = ? AND team_name = ? AND key = ? AND model = ?""",
+        [(*tokens, scope, team_name, key, model) for scope, team_name, key, model, *tokens in moves]
+    )
+    conn.execute("DELETE FROM token_usage WHERE messages <= 0")
+
+
+def _record_latency(conn, team_name, agent_name, tool_name, duration_ms):
+    conn.execute(
+        """INSERT INTO tool_latency (team_name, agent_name, tool_name, bucket, count)
+           VALUES (?, ?, ?, ?, 1)
+           ON CONFLICT(team_name, agent_name, tool_name, bucket) DO UPDATE SET
+             count = tool_latency.count + 1""",
+        (team_name, agent_name, tool_name, latency.bucket_index(duration_ms))
+    )
+    conn.execute(
+        """INSERT INTO tool_latency_totals (team_name, agent_name, tool_name, count, total_ms, max_ms)
+           VALUES (?, ?, ?, 1, ?, ?)
+           ON CONFLICT(team_name, agent_name, tool_name) DO UPDATE SET
+             count = tool_latency_totals.count + 1,
+             total_ms = tool_latency_totals.total_ms + excluded.total_ms,
+             max_ms = MAX(tool_latency_totals.max_ms, excluded.max_ms)""",
+        (team_name, agent_name, tool_name, duration_ms, duration_ms)
+    )
+
+
+def _resolve_teams(conn, events):
+    """Set team_name on events that name no team, from their session or else their agent.
+
+    Only the team tools (TeamCreate, SendMessage, ...) carry a team_name, so
+    an agent's other calls would otherwise be filed under 'unknown', apart
+    from its team. A team named anywhere in the batch applies to the whole
+    batch, and a session's events stored before its team was known are
+    moved to it (see _adopt_session_team). Runs before anything is keyed by team.
+    """
+    batch_sessions = {}
+    batch_agents = {}
+    for ev in events:
+        team = ev.get('team_name')
+        if team and team != 'unknown':
+            if ev.get('session_id'):
+                batch_sessions[ev['session_id']] = team
+            if ev.get('agent_name'):
+                batch_agents[ev['agent_name']] = team
+    for session_id, team in batch_sessions.items():
+        row = conn.execute("SELECT team_name FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row and row[0] == 'unknown':
+            _adopt_session_team(conn, session_id, team)
+
+    sessions = {}
+    agents = {}
+    for ev in events:
+        if ev.get('team_name') and ev['team_name'] != 'unknown':
+            continue
+        session_id = ev.get('session_id')
+        agent_name = ev.get('agent_name')
+        team = batch_sessions.get(session_id)
+        if not team:
+            if session_id not in sessions or agent_name not in agents:
+                row = conn.execute(
+                    """SELECT (SELECT team_name FROM sessions WHERE session_id = ?),
+                              (SELECT team_name FROM agents WHERE agent_name = ? AND team_name != 'unknown'
+                               ORDER BY last_seen DESC LIMIT 1)""",
+                    (session_id, agent_name)
+                ).fetchone()
+                sessions.setdefault(session_id, row[0])
+                agents.setdefault(agent_name, row[1])
+            candidates = (sessions[session_id], batch_agents.get(agent_name), agents[agent_name])
+            team = next((t for t in candidates if t and t != 'unknown'), 'unknown')
+        ev['team_name'] = team
+
+
+def _adopt_session_team(conn, session_id, team):
+    """Move a session's events stored under 'unknown' to the team it turned out to belong to.
+
+    The agent, category and latency rollups are adjusted by the moved events
+    (first/last times of what stays under 'unknown' only ever widen), and
+    each move is logged in event_revisions for readers holding the rows.
+    """
+    moved = conn.execute(
+        "SELECT id, ts_us, timestamp, agent_name, event_category, tool_name, duration_ms FROM events "
+        "WHERE session_id = ? AND team_name = 'unknown'",
+        (session_id,)
+    ).fetchall()
+    if not moved:
+        return
+    conn.execute("UPDATE events SET team_name = ? WHERE session_id = ? AND team_name = 'unknown'",
+                 (team, session_id))
+
+    agents = {}
+    categories = {}
+    for row in moved:
+        _accumulate(agents, row['agent_name'], None, row['timestamp'])
+        _accumulate(categories, row['event_category'] or 'unknown', None, row['timestamp'])
+        if row['duration_ms'] is not None and row['tool_name']:
+            agent_name = row['agent_name'] or 'unknown'
+            conn.execute(
+                """UPDATE tool_latency SET count = count - 1
+                   WHERE team_name = 'unknown' AND agent_name = ? AND tool_name = ? AND bucket = ?""",
+                (agent_name, row['tool_name'], latency.bucket_index(row['duration_ms']))
+            )
+            conn.execute(
+                """UPDATE tool_latency_totals SET count = count - 1, total_ms = total_ms - ?
+                   WHERE team_name = 'unknown' AND agent_name = ? AND tool_name = ?""",
+                (row['duration_ms'], agent_name, row['tool_name'])
+            )
+            _record_latency(conn, team, agent_name, row['tool_name'], row['duration_ms'])
+    conn.execute("DELETE FROM tool_latency WHERE team_name = 'unknown' AND count <= 0")
+    conn.execute("DELETE FROM tool_latency_totals WHERE team_name = 'unknown' AND count <= 0")
+
+    conn.executemany(
+        "UPDATE agents SET event_count = event_count - ? WHERE team_name = 'unknown' AND agent_name = ?",
+        [(agg[3], name) for name, agg in agents.items()]
+    )
+    conn.execute("DELETE FROM agents WHERE team_name = 'unknown' AND event_count <= 0")
+    _write_agents(conn, {(team, name): agg for name, agg in agents.items()})
+
+    conn.executemany(
+        "UPDATE team_counts SET count = count - ? WHERE team_name = 'unknown' AND event_category = ?",
+        [(agg[3], category) for category, agg in categories.items()]
+    )
+    conn.execute("DELETE FROM team_counts WHERE team_name = 'unknown' AND count <= 0")
+    _write_team_counts(conn, {(team, category): agg[1:] for category, agg in categories.items()})
+
+    _move_usage(conn, session_id, team)
+    _invalidate_snapshots(conn, min((row['ts_us'] for row in moved if row['ts_us'] is not None), default=None))
+    _log_revisions(conn, [row['id'] for row in moved], team_from='unknown')
+
+
+def _admit(conn, events):
+    """Apply the ingest policy's sampling and per-session budget to events.
+
+    Returns (events to store, outcome counts for _write_counters). Events
+    over their session's budget have their payload reduced in place.
+    """
+    admitted = []
+    counts = {}
+    session_bytes = {}
+    for ev in events:
+        tool_name = ev.get('tool_name') or ''
+        if not POLICY.keep(ev):
+            _tally(counts, tool_name, 'sampled_out', 0)
+            continue
+
+        session_id = ev.get('session_id') or ''
+        if session_id not in session_bytes:
+            row = conn.execute(
+                "SELECT stored_bytes FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            session_bytes[session_id] = row[0] if row else 0
+        level = ev.get('capture_level') or 'full'
+        capped = lower_level(level, POLICY.budget_level(ev, session_bytes[session_id]))
+        if capped != level:
+            _degrade(ev, capped)
+            _tally(counts, tool_name, 'degraded', 0)
+
+        size = len(ev.get('payload_json') or '')
+        session_bytes[session_id] += size
+        _tally(counts, tool_name, ev.get('capture_level') or 'full', size)
+        admitted.append(ev)
+    return admitted, counts
+
+
+def _degrade(ev, level):
+    try:
+        payload = codec.loads(ev.get('payload_json') or '{}')
+    except codec.JSONDecodeError:
+        payload = None
+    if not isinstance(payload, dict):
+        payload = {'tool_name': ev.get('tool_name'), 'hook_event_name': ev.get('hook_event'),
+                   'session_id': ev.get('session_id')}
+    ev['payload_json'] = codec.dumps(POLICY.shape_payload(payload, level))
+    ev['capture_level'] = level
+
+
+def _tally(counts, tool_name, outcome, size):
+    entry = counts.setdefault((tool_name, outcome), [0, 0])
+    entry[0] += 1
+    entry[1] += size
+
+
+def _write_counters(conn, counts):
+    conn.executemany(
+        """INSERT INTO ingest_counters (tool_name, outcome, count, bytes)
+           VALUES (?, ?, ?, ?)
+           ON CONFLICT(tool_name, outcome) DO UPDATE SET
+             count = ingest_counters.count + excluded.count,
+             bytes = ingest_counters.bytes + excluded.bytes""",
+        [(tool, outcome, n, size) for (tool, outcome), (n, size) in counts.items()]
+    )
+
+
+def _invalidate_snapshots(conn, ts_us):
+    """Drop state snapshots that an event at ts_us arrived too late for; they are rebuilt later."""
+    if ts_us is not None:
+        conn.execute("DELETE FROM state_snapshots WHERE cut_us >= ?", (ts_us,))
+
+
+def _drop_duplicates(conn, events):
+    """Filter out events whose event_key is already stored or repeated in the batch."""
+    keys = [ev.get('event_key') for ev in events if ev.get('event_key')]
+    if not keys:
+        return events
+    stored = set()
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        stored.update(row[0] for row in conn.execute(
+            f"SELECT event_key FROM events WHERE event_key IN ({','.join('?' * len(chunk))})", chunk
+        ))
+    unique = []
+    for ev in events:
+        key = ev.get('event_key')
+        if key:
+            if key in stored:
+                continue
+            stored.add(key)
+        unique.append(ev)
+    return unique
+
+
+def _write_agents(conn, aggregates):
+    """Fold {(team_name, agent_name): _accumulate() aggregate} into the agent records."""
+    conn.executemany(
+        """INSERT INTO agents (team_name, agent_name, first_seen, last_seen, event_count)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT(team_name, agent_name) DO UPDATE SET
+             first_seen = MIN(COALESCE(agents.first_seen, excluded.first_seen), excluded.first_seen),
+             last_seen = MAX(COALESCE(agents.last_seen, excluded.last_seen), excluded.last_seen),
+             event_count = agents.event_count + excluded.event_count""",
+        [key + tuple(agg[1:]) for key, agg in aggregates.items()]
+    )
+
+
+def _write_team_counts(conn, counts):
+    """Fold {(team_name, event_category): [first_at, last_at, count]} into the per-team counts."""
+    conn.executemany(
+        """INSERT INTO team_counts (team_name, event_category, first_at, last_at, count)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT(team_name, event_category) DO UPDATE SET
+             first_at = MIN(COALESCE(team_counts.first_at, excluded.first_at), excluded.first_at),
+             last_at = MAX(COALESCE(team_counts.last_at, excluded.last_at), excluded.last_at),
+             count = team_counts.count + excluded.count""",
+        [key + tuple(agg) for key, agg in counts.items()]
+    )
+
+
+def _accumulate(aggregates, key, team_name, ts):
+    """Fold one event into a [team_name, first_seen, last_seen, count] aggregate."""
+    if not key:
+        return
+    agg = aggregates.get(key)
+    if agg is None:
+        aggregates[key] = [team_name, ts, ts, 1]
+        return
+    if team_name:
+        agg[0] = team_name
+    if ts and (agg[1] is None or ts < agg[1]):
+        agg[1] = ts
+    if ts and (agg[2] is None or ts > agg[2]):
+        agg[2] = ts
+    agg[3] += 1
+
+
+@timed_db
+def get_transcript_offset(path):
+    """Return the imported byte offset for one transcript (0 if never read)."""
     conn = _get_connection()
     try:
         row = conn.execute(
-            "SELECT * FROM events WHERE id = ?", (event_id,)
+            "SELECT byte_offset FROM transcript_imports WHERE path = ?", (path,)
         ).fetchone()
-        return dict(row) if row else None
+        return row[0] if row else 0
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_transcript_offsets():
+    """Return {path: offset} for every transcript that has been imported."""
+    conn = _get_connection()
+    try:
+        rows = conn.execute("SELECT path, byte_offset FROM transcript_imports").fetchall()
+        return {row['path']: row['byte_offset'] for row in rows}
     finally:
         conn.close()
 
 
-def get_agents():
-    """Return all agents with stats."""
+@timed_db
+def get_import_sources(prefix):
+    """Return the import watermarks whose source path starts with prefix, as dicts."""
     conn = _get_connection()
     try:
         rows = conn.execute(
-            "SELECT * FROM agents ORDER BY last_seen DESC"
+            "SELECT path, byte_offset, event_count, imported_at FROM transcript_imports "
+            "WHERE substr(path, 1, ?) = ? ORDER BY path",
+            (len(prefix), prefix)
         ).fetchall()
         return [dict(row) for row in rows]
     finally:
         conn.close()
 
 
-def get_stats():
-    """Aggregate stats: total events, per-category counts, most active agent, recent activity."""
+@timed_db
+def enqueue_backfill(transcript_path, agent_name=None, session_id=None, team_name=None, fallback_ts=None):
+    """Queue a transcript for backfill. Returns the job id.
+
+    A transcript that already has a pending job isn't queued twice: that job
+    reads the file from its watermark to the end whenever it runs.
+    """
     conn = _get_connection()
     try:
-        total = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        row = conn.execute(
+            "SELECT id FROM backfill_jobs WHERE transcript_path = ? AND status = 'pending'", (transcript_path,)
+        ).fetchone()
+        if row:
+            return row[0]
+        cursor = conn.execute(
+            """INSERT INTO backfill_jobs
+                   (transcript_path, agent_name, session_id, team_name, fallback_ts, created_at, updated_us)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (transcript_path, agent_name, session_id, team_name, fallback_ts, now_timestamp(), now_epoch_us())
+        )
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
 
-        cat_rows = conn.execute(
-            "SELECT event_category, COUNT(*) as cnt FROM events GROUP BY event_category"
+
+@timed_db
+def claim_backfill_jobs(worker, max_running, lease_s=300, keep_s=86400):
+    """Mark due pending jobs as running by worker and return them, as dicts.
+
+    At most max_running jobs run at once across every process sharing the
+    database, and never two for the same transcript. A running job whose
+    worker hasn't reported progress for lease_s seconds is presumed dead and
+    becomes pending again. Finished jobs older than keep_s are deleted.
+    """
+    now_us = now_epoch_us()
+    conn = _get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE backfill_jobs SET status = 'pending', worker = NULL WHERE status = 'running' AND updated_us < ?",
+            (now_us - int(lease_s * 1e6),)
+        )
+        conn.execute("DELETE FROM backfill_jobs WHERE status = 'done' AND updated_us < ?",
+                     (now_us - int(keep_s * 1e6),))
+        running = conn.execute("SELECT COUNT(*) FROM backfill_jobs WHERE status = 'running'").fetchone()[0]
+        rows = []
+        if running < max_running:
+            rows = conn.execute(
+                """SELECT * FROM backfill_jobs
+                   WHERE status = 'pending' AND run_after_us <= ?
+                     AND transcript_path NOT IN (SELECT transcript_path FROM backfill_jobs WHERE status = 'running')
+                   ORDER BY id LIMIT ?""",
+                (now_us, max_running - running)
+            ).fetchall()
+        jobs = []
+        for row in rows:
+            if any(job['transcript_path'] == row['transcript_path'] for job in jobs):
+                continue
+            conn.execute(
+                "UPDATE backfill_jobs SET status = 'running', attempts = attempts + 1, worker = ?, updated_us = ? "
+                "WHERE id = ?",
+                (worker, now_us, row['id'])
+            )
+            job = dict(row)
+            job.update(status='running', attempts=row['attempts'] + 1, worker=worker)
+            jobs.append(job)
+        conn.commit()
+        return jobs
+    finally:
+        conn.close()
+
+
+@timed_db
+def update_backfill_progress(job_id, bytes_done, bytes_total, events):
+    """Record how far a running job has read (this also renews its lease)."""
+    conn = _get_connection()
+    try:
+        conn.execute(
+            "UPDATE backfill_jobs SET bytes_done = ?, bytes_total = ?, events = ?, updated_us = ? WHERE id = ?",
+            (bytes_done, bytes_total, events, now_epoch_us(), job_id)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@timed_db
+def finish_backfill_job(job_id, error=None, retry_at_us=None):
+    """Mark a job done, or after an error pending again from retry_at_us (failed if None)."""
+    if error is None:
+        status = 'done'
+    else:
+        status = 'pending' if retry_at_us is not None else 'failed'
+    conn = _get_connection()
+    try:
+        conn.execute(
+            "UPDATE backfill_jobs SET status = ?, error = ?, run_after_us = COALESCE(?, run_after_us), "
+            "worker = NULL, updated_us = ? WHERE id = ?",
+            (status, error, retry_at_us, now_epoch_us(), job_id)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@timed_db
+def retry_failed_backfills():
+    """Queue every failed job again with a fresh attempt count. Returns how many."""
+    conn = _get_connection()
+    try:
+        cursor = conn.execute(
+            "UPDATE backfill_jobs SET status = 'pending', attempts = 0, run_after_us = 0, updated_us = ? "
+            "WHERE status = 'failed'",
+            (now_epoch_us(),)
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_backfill_jobs(status=None, limit=50):
+    """Job counts by status, and the most recent jobs (running ones first) as dicts."""
+    conn = _get_connection()
+    try:
+        counts = {row['status']: row['n'] for row in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM backfill_jobs GROUP BY status")}
+        where, params = ("WHERE status = ?", [status]) if status else ("", [])
+        rows = conn.execute(
+            f"SELECT * FROM backfill_jobs {where} ORDER BY status = 'running' DESC, id DESC LIMIT ?",
+            params + [limit]
         ).fetchall()
-        by_category = {row['event_category']: row['cnt'] for row in cat_rows}
+        return {'counts': counts, 'jobs': [dict(row) for row in rows]}
+    finally:
+        conn.close()
 
-        most_active_row = conn.execute(
-            "SELECT agent_name, event_count FROM agents ORDER BY event_count DESC LIMIT 1"
-        ).fetchone()
-        most_active = dict(most_active_row) if most_active_row else None
 
-        now = datetime.now(timezone.utc).isoformat()
-        # Events in last 60 seconds
-        recent = conn.execute(
-            "SELECT COUNT(*) FROM events WHERE timestamp >= datetime(?, '-60 seconds')",
-            (now,)
-        ).fetchone()[0]
+@timed_db
+def get_events(page=1, per_page=50, category=None, agent=None, tool=None, max_id=None, team=None, session=None):
+    """Paginated event query with optional filters. Returns list of dicts.
 
-        return {
-            'total_events': total,
-            'by_category': by_category,
-            'most_active_agent': most_active,
-            'events_last_minute': recent,
-        }
+    With max_id, only events up to that id count (the page as of that watermark).
+    team and session scope the feed to one team or session.
+    """
+    conn = _get_connection()
+    try:
+        return _query_events(conn, page=page, per_page=per_page, category=category, agent=agent, tool=tool,
+                             max_id=max_id, team=team, session=session)
+    finally:
+        conn.close()
+
+
+def _query_events(conn, page=1, per_page=50, category=None, agent=None, tool=None, max_id=None, team=None,
+                  session=None):
+    conditions = []
+    params = []
+    if max_id is not None:
+        conditions.append("id <= ?")
+        params.append(max_id)
+    if team:
+        conditions.append("team_name = ?")
+        params.append(team)
+    if session:
+        conditions.append("session_id = ?")
+        params.append(session)
+    if category:
+        conditions.append("event_category = ?")
+        params.append(category)
+    if agent:
+        conditions.append("agent_name = ?")
+        params.append(agent)
+    if tool:
+        conditions.append("tool_name = ?")
+        params.append(tool)
+
+    where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+    offset = (page - 1) * per_page
+    params.extend([per_page, offset])
+
+    rows = conn.execute(
+        f"SELECT id, timestamp, session_id, team_name, agent_name, hook_event, "
+        f"tool_name, event_category, summary, duration_ms, is_error, node "
+        f"FROM events{where} ORDER BY ts_us DESC, id DESC LIMIT ? OFFSET ?",
+        params
+    ).fetchall()
+
+    # Get total count for pagination
+    count_params = params[:-2]  # exclude limit/offset
+    total = conn.execute(
+        f"SELECT COUNT(*) FROM events{where}",
+        count_params
+    ).fetchone()[0]
+
+    return {
+        'events': [dict(row) for row in rows],
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page if per_page else 0,
+    }
+
+
+@timed_db
+def get_events_since(last_id, limit=200):
+    """Return up to `limit` events with id > last_id, oldest first.
+
+    The id is the monotonic ingest order, so this picks up backfilled events
+    regardless of how old their timestamps are. For the anomaly detector,
+    SubagentStart/SubagentStop events also carry the subagent they are about
+    as subagent_name (their agent_name is the parent's), and Bash calls
+    their full command (the summary truncates it) when it was stored.
+    """
+    conn = _get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT id, timestamp, session_id, team_name, agent_name, hook_event, "
+            "tool_name, event_category, summary, duration_ms, is_error, node, "
+            "CASE WHEN hook_event IN ('SubagentStart', 'SubagentStop') OR tool_name = 'Bash' "
+            "THEN payload_json END AS payload_json "
+            "FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit)
+        ).fetchall()
+        return [_with_detector_fields(dict(row)) for row in rows]
+    finally:
+        conn.close()
+
+
+def _with_detector_fields(event):
+    """Replace an event's selected payload_json by the fields the detector reads from it."""
+    raw = event.pop('payload_json')
+    if not raw:
+        return event
+    try:
+        payload = codec.loads(raw)
+    except codec.JSONDecodeError:
+        return event
+    if not isinstance(payload, dict):
+        return event
+    if event['tool_name'] == 'Bash':
+        tool_input = payload.get('tool_input')
+        command = tool_input.get('command') if isinstance(tool_input, dict) else None
+        if isinstance(command, str):
+            event['command'] = command
+        return event
+    name = subagent_name(payload)
+    if name:
+        event['subagent_name'] = name
+    return event
+
+
+SHIP_COLUMNS = (
+    'id', 'timestamp', 'session_id', 'team_name', 'agent_name', 'hook_event', 'tool_name',
+    'event_category', 'summary', 'payload_json', 'duration_ms', 'is_error', 'event_key', 'node',
+)
+
+
+@timed_db
+def get_events_for_shipping(after_id, limit=1000):
+    """Return up to `limit` full events (SHIP_COLUMNS, payload included) with id > after_id, oldest first."""
+    conn = _get_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(SHIP_COLUMNS)} FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+# Event columns held by the server's in-memory hot store (server/hot_store.py)
+HOT_COLUMNS = (
+    'id', 'ts_us', 'timestamp', 'session_id', 'team_name', 'agent_name', 'hook_event', 'tool_name',
+    'event_category', 'summary', 'duration_ms', 'is_error', 'node',
+)
+
+
+@timed_db
+def count_events_outside(max_id, floor, team=None, session=None, category=None, agent=None, tool=None):
+    """Count events up to max_id, matching the filters, that are untimed or before floor ((ts_us, id), or None)."""
+    conditions = ["id <= ?"]
+    params = [max_id]
+    if floor is None:
+        conditions.append("ts_us IS NULL")
+    else:
+        conditions.append("(ts_us IS NULL OR ts_us < ? OR (ts_us = ? AND id < ?))")
+        params += [floor[0], floor[0], floor[1]]
+    for column, value in (('team_name', team), ('session_id', session), ('event_category', category),
+                          ('agent_name', agent), ('tool_name', tool)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    conn = _get_connection()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM events WHERE {' AND '.join(conditions)}", params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def iter_recent_events(max_id, limit, batch_size=5000):
+    """Yield batches of HOT_COLUMNS tuples for the newest `limit` events up to max_id, oldest first.
+
+    Events without a parseable timestamp are left out (they sort after
+    everything else in the feed).
+    """
+    conn = sqlite3.connect(get_db_path())
+    try:
+        conn.execute("BEGIN")
+        oldest = conn.execute(
+            "SELECT ts_us, id FROM events WHERE ts_us IS NOT NULL AND id <= ? "
+            "ORDER BY ts_us DESC, id DESC LIMIT 1 OFFSET ?",
+            (max_id, max(limit - 1, 0))
+        ).fetchone() or (None, 0)
+        cursor = conn.execute(
+            f"SELECT {', '.join(HOT_COLUMNS)} FROM events "
+            f"WHERE id <= ? AND ts_us IS NOT NULL AND (? IS NULL OR ts_us > ? OR (ts_us = ? AND id >= ?)) "
+            f"ORDER BY ts_us, id",
+            (max_id, oldest[0], oldest[0], oldest[0], oldest[1])
+        )
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield batch
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_max_event_id():
+    """Return the highest event id (the ingest watermark), or 0 if empty."""
+    conn = _get_connection()
+    try:
+        return conn.execute("SELECT MAX(id) FROM events").fetchone()[0] or 0
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_write_marks():
+    """Return (max event id, max alert id, max revision id).
+
+    Together they change on every write the read APIs show.
+    """
+    conn = _get_connection()
+    try:
+        return tuple(conn.execute(
+            "SELECT (SELECT COALESCE(MAX(id), 0) FROM events), (SELECT COALESCE(MAX(id), 0) FROM alerts), "
+            "(SELECT COALESCE(MAX(id), 0) FROM event_revisions)"
+        ).fetchone())
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_event_revisions(last_id, limit=1000):
+    """Events changed after insert, for revisions with id greater than last_id, oldest first.
+
+    Each row has the revision id, the team the event was moved from (None
+    if it kept its team) and the event's current id, ts_us, duration_ms and
+    count dimensions. Only the newest REVISIONS_KEPT revisions are kept.
+    """
+    conn = _get_connection()
+    try:
+        rows = conn.execute(
+            """SELECT r.id AS revision, r.team_from, e.id, e.ts_us, e.duration_ms, e.team_name, e.session_id,
+                      e.event_category, e.agent_name, e.tool_name
+               FROM event_revisions r JOIN events e ON e.id = r.event_id
+               WHERE r.id > ? ORDER BY r.id LIMIT ?""",
+            (last_id, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+@timed_db
+def checkpoint_wal(mode='PASSIVE', busy_timeout_ms=100):
+    """Checkpoint the write-ahead log. Returns (busy, wal_frames, checkpointed_frames).
+
+    busy_timeout_ms bounds how long a blocking mode waits on readers and
+    writers (and so how long hooks can be held up behind it).
+    """
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f'unknown checkpoint mode: {mode}')
+    conn = sqlite3.connect(get_db_path(), timeout=busy_timeout_ms / 1000)
+    try:
+        busy, wal_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        return busy, wal_frames, checkpointed
+    finally:
+        conn.close()
+
+
+@timed_db
+def analyze_db(analysis_limit=1000):
+    """Refresh the query planner's statistics, sampling at most analysis_limit rows per index."""
+    conn = _get_connection()
+    try:
+        conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_schema_version():
+    """Return the database's schema version (PRAGMA user_version)."""
+    conn = _get_connection()
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_event_by_id(event_id):
+    """Return a single event with full payload, or None."""
+    conn = _get_connection()
+    try:
+        row = conn.execute(
+            "SELECT * FROM events WHERE id = ?", (event_id,)
+        ).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_agents(team=None):
+    """Return all agents (or one team's) with stats. Agents are keyed by (team_name, agent_name)."""
+    conn = _get_connection()
+    try:
+        return _query_agents(conn, team=team)
+    finally:
+        conn.close()
+
+
+def _query_agents(conn, team=None):
+    if team:
+        rows = conn.execute(
+            "SELECT * FROM agents WHERE team_name = ? ORDER BY last_seen DESC", (team,)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM agents ORDER BY last_seen DESC"
+        ).fetchall()
+    names = [row['agent_name'] for row in rows] if team else None
+    spend = {(entry['team_name'], entry['key']): entry
+             for entry in _query_usage(conn, 'agent', keys=names, team=team, per_team=True)}
+    agents = []
+    for row in rows:
+        agent = dict(row)
+        entry = spend.get((agent['team_name'], agent['agent_name']))
+        agent['total_tokens'] = entry['total_tokens'] if entry else 0
+        agent['cost_usd'] = entry['cost_usd'] if entry else None
+        agents.append(agent)
+    return agents
+
+
+@timed_db
+def get_teams():
+    """Every team with its event, agent and session counts, most recently active first.
+
+    Read from the per-team counts and the agent and session records, never
+    from the events themselves.
+    """
+    conn = _get_connection()
+    try:
+        teams = {}
+        for row in conn.execute(
+            "SELECT team_name, SUM(count) AS event_count, MIN(first_at) AS first_seen, MAX(last_at) AS last_seen "
+            "FROM team_counts GROUP BY team_name"
+        ):
+            teams[row['team_name']] = dict(row, agent_count=0, session_count=0)
+        for column, table in (('agent_count', 'agents'), ('session_count', 'sessions')):
+            for row in conn.execute(f"SELECT team_name, COUNT(*) FROM {table} GROUP BY team_name"):
+                if row[0] in teams:
+                    teams[row[0]][column] = row[1]
+        return sorted(teams.values(), key=lambda t: t['last_seen'] or '', reverse=True)
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_sessions(team=None, limit=100):
+    """Sessions (one team's, when given), most recently active first."""
+    conn = _get_connection()
+    try:
+        if team:
+            rows = conn.execute(
+                "SELECT * FROM sessions WHERE team_name = ? ORDER BY ended_at DESC LIMIT ?", (team, limit)
+            ).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM sessions ORDER BY ended_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_agent_tree(team, session=None):
+    """One team's agents as a forest: each agent carries its subagents under 'children'.
+
+    Links come from SubagentStart/SubagentStop. Agents nobody spawned (as
+    far as the monitor saw) are roots. With session, only that session's
+    agents and the subagents started from it are included.
+    """
+    conn = _get_connection()
+    try:
+        if session:
+            agent_rows = conn.execute(
+                """SELECT a.* FROM agents a
+                   JOIN (SELECT DISTINCT agent_name FROM events WHERE session_id = ?) s
+                     ON s.agent_name = a.agent_name
+                   WHERE a.team_name = ?""",
+                (session, team)
+            ).fetchall()
+            links = conn.execute(
+                "SELECT * FROM subagents WHERE session_id = ? AND team_name = ?", (session, team)
+            ).fetchall()
+        else:
+            agent_rows = conn.execute("SELECT * FROM agents WHERE team_name = ?", (team,)).fetchall()
+            links = conn.execute("SELECT * FROM subagents WHERE team_name = ?", (team,)).fetchall()
+    finally:
+        conn.close()
+
+    nodes = {}
+
+    def node(name):
+        if name not in nodes:
+            nodes[name] = {'agent_name': name, 'team_name': team, 'first_seen': None, 'last_seen': None,
+                           'event_count': 0, 'agent_type': None, 'agent_id': None, 'started_at': None,
+                           'stopped_at': None, 'children': []}
+        return nodes[name]
+
+    for row in agent_rows:
+        node(row['agent_name']).update(first_seen=row['first_seen'], last_seen=row['last_seen'],
+                                       event_count=row['event_count'])
+    parents = {}
+    for link in links:
+        node(link['agent_name']).update(agent_type=link['agent_type'], agent_id=link['agent_id'],
+                                        started_at=link['started_at'], stopped_at=link['stopped_at'])
+        if link['parent_name'] and link['parent_name'] != link['agent_name']:
+            node(link['parent_name'])
+            parents[link['agent_name']] = link['parent_name']
+
+    # Follow parent links up from each agent; a link that would close a cycle is dropped
+    for name in sorted(parents):
+        seen = {name}
+        ancestor = parents.get(name)
+        while ancestor is not None and ancestor not in seen:
+            seen.add(ancestor)
+            ancestor = parents.get(ancestor)
+        if ancestor == name:
+            del parents[name]
+    for name in sorted(nodes, key=lambda n: nodes[n]['started_at'] or nodes[n]['first_seen'] or ''):
+        if name in parents:
+            nodes[parents[name]]['children'].append(nodes[name])
+    roots = [nodes[name] for name in nodes if name not in parents]
+    roots.sort(key=lambda n: n['last_seen'] or '', reverse=True)
+    return roots
+
+
+@timed_db
+def get_stats(team=None, session=None):
+    """Aggregate stats: total events, per-category counts, most active agent, recent activity.
+
+    Totals come from the per-team counts kept at ingest. With team or
+    session, everything is scoped to it; sampled-out events aren't tracked
+    per team or session, so sampled_out and total_observed are then None.
+    """
+    conn = _get_connection()
+    try:
+        return _query_stats(conn, team=team, session=session)
+    finally:
+        conn.close()
+
+
+def _query_stats(conn, team=None, session=None):
+    recent_since = now_epoch_us() - 60 * 1000000
+    if session:
+        cat_rows = conn.execute(
+            "SELECT event_category, COUNT(*) AS cnt FROM events WHERE session_id = ? GROUP BY event_category",
+            (session,)
+        ).fetchall()
+        most_active_row = conn.execute(
+            "SELECT agent_name, COUNT(*) AS event_count FROM events WHERE session_id = ? "
+            "GROUP BY agent_name ORDER BY event_count DESC LIMIT 1",
+            (session,)
+        ).fetchone()
+        recent = conn.execute(
+            "SELECT COUNT(*) FROM events WHERE session_id = ? AND ts_us >= ?", (session, recent_since)
+        ).fetchone()[0]
+    elif team:
+        cat_rows = conn.execute(
+            "SELECT event_category, count AS cnt FROM team_counts WHERE team_name = ?", (team,)
+        ).fetchall()
+        most_active_row = conn.execute(
+            "SELECT agent_name, event_count FROM agents WHERE team_name = ? ORDER BY event_count DESC LIMIT 1",
+            (team,)
+        ).fetchone()
+        recent = conn.execute(
+            "SELECT COUNT(*) FROM events WHERE team_name = ? AND ts_us >= ?", (team, recent_since)
+        ).fetchone()[0]
+    else:
+        cat_rows = conn.execute(
+            "SELECT event_category, SUM(count) AS cnt FROM team_counts GROUP BY event_category"
+        ).fetchall()
+        most_active_row = conn.execute(
+            "SELECT agent_name, event_count FROM agents ORDER BY event_count DESC LIMIT 1"
+        ).fetchone()
+        # Events in last 60 seconds
+        recent = conn.execute(
+            "SELECT COUNT(*) FROM events WHERE ts_us >= ?", (recent_since,)
+        ).fetchone()[0]
+
+    by_category = {row['event_category']: row['cnt'] for row in cat_rows}
+    total = sum(by_category.values())
+    if team or session:
+        sampled_out = None
+    else:
+        sampled_out = conn.execute(
+            "SELECT COALESCE(SUM(count), 0) FROM ingest_counters WHERE outcome = 'sampled_out'"
+        ).fetchone()[0]
+
+    return {
+        'total_events': total,
+        'sampled_out': sampled_out,
+        'total_observed': total + sampled_out if sampled_out is not None else None,
+        'by_category': by_category,
+        'most_active_agent': dict(most_active_row) if most_active_row else None,
+        'events_last_minute': recent,
+    }
+
+
+@timed_db
+def get_bootstrap(per_page=100, category=None, agent=None, tool=None, include_events=True, team=None,
+                  session=None):
+    """Everything the dashboard needs for its first paint, read from one snapshot.
+
+    All queries run inside a single read transaction, so events, agents,
+    stats and latency are mutually consistent, and `cursor` (the max event
+    id in that snapshot) tells the SSE stream exactly where to resume;
+    `alert_cursor` does the same for alerts. With include_events=False the
+    caller fills in 'events' itself, as of `cursor`. team scopes every
+    part to one team; session scopes the events and stats.
+    """
+    conn = _get_connection()
+    try:
+        conn.execute("BEGIN")
+        cursor = conn.execute("SELECT MAX(id) FROM events").fetchone()[0] or 0
+        return {
+            'events': (_query_events(conn, page=1, per_page=per_page, category=category, agent=agent, tool=tool,
+                                     team=team, session=session)
+                       if include_events else None),
+            'agents': _query_agents(conn, team=team),
+            'stats': _query_stats(conn, team=team, session=session),
+            'latency': _query_latency(conn, team=team),
+            'alerts': _query_alerts(conn, team=team, limit=20),
+            'cursor': cursor,
+            'alert_cursor': conn.execute("SELECT COALESCE(MAX(id), 0) FROM alerts").fetchone()[0],
+        }
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+@timed_db
+def get_latency(agent=None, tool=None, by_agent=False, team=None):
+    """Per-tool latency percentiles computed from the stored histograms.
+
+    Groups by tool across all agents, or by (team, agent, tool) when by_agent
+    is set. Returns a list of dicts sorted by p95 descending.
+    """
+    conn = _get_connection()
+    try:
+        return _query_latency(conn, agent=agent, tool=tool, by_agent=by_agent, team=team)
+    finally:
+        conn.close()
+
+
+def _query_latency(conn, agent=None, tool=None, by_agent=False, team=None):
+    conditions = []
+    params = []
+    if team:
+        conditions.append("team_name = ?")
+        params.append(team)
+    if agent:
+        conditions.append("agent_name = ?")
+        params.append(agent)
+    if tool:
+        conditions.append("tool_name = ?")
+        params.append(tool)
+    where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+    group = "team_name, agent_name, tool_name" if by_agent else "tool_name"
+
+    totals = conn.execute(
+        f"SELECT {group}, SUM(count) AS count, SUM(total_ms) AS total_ms, MAX(max_ms) AS max_ms "
+        f"FROM tool_latency_totals{where} GROUP BY {group}",
+        params
+    ).fetchall()
+    bucket_rows = conn.execute(
+        f"SELECT {group}, bucket, SUM(count) AS count "
+        f"FROM tool_latency{where} GROUP BY {group}, bucket",
+        params
+    ).fetchall()
+
+    histograms = {}
+    for row in bucket_rows:
+        key = (row['team_name'], row['agent_name'], row['tool_name']) if by_agent else row['tool_name']
+        histograms.setdefault(key, {})[row['bucket']] = row['count']
+
+    results = []
+    for row in totals:
+        key = (row['team_name'], row['agent_name'], row['tool_name']) if by_agent else row['tool_name']
+        p50, p95, p99 = latency.percentiles(histograms.get(key, {}), max_ms=row['max_ms'])
+        entry = {
+            'tool_name': row['tool_name'],
+            'count': row['count'],
+            'mean_ms': round(row['total_ms'] / row['count'], 2) if row['count'] else None,
+            'max_ms': round(row['max_ms'], 2),
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+        }
+        if by_agent:
+            entry['team_name'] = row['team_name']
+            entry['agent_name'] = row['agent_name']
+        results.append(entry)
+
+    results.sort(key=lambda e: e['p95_ms'] or 0, reverse=True)
+    return results
+
+
+@timed_db
+def get_graph(team=None, agent=None):
+    """Agent communication graph, maintained incrementally at ingest.
+
+    Returns {'nodes': [...], 'edges': [...]}. Each edge aggregates all
+    messages of one type from a sender to a recipient ('*' for broadcasts);
+    each node carries its sent/received message counts. With agent set,
+    only edges touching that agent are returned.
+    """
+    conn = _get_connection()
+    try:
+        return _query_graph(conn, team=team, agent=agent)
+    finally:
+        conn.close()
+
+
+def _query_graph(conn, team=None, agent=None):
+    conditions = []
+    params = []
+    if team:
+        conditions.append("team_name = ?")
+        params.append(team)
+    if agent:
+        conditions.append("(sender = ? OR recipient = ?)")
+        params.extend([agent, agent])
+    where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+    rows = conn.execute(
+        f"SELECT team_name, sender, recipient, msg_type, count, bytes, first_at, last_at "
+        f"FROM comm_edges{where} ORDER BY count DESC",
+        params
+    ).fetchall()
+
+    edges = [dict(row) for row in rows]
+    nodes = {}
+    for edge in edges:
+        for name, direction in ((edge['sender'], 'sent'), (edge['recipient'], 'received')):
+            node = nodes.setdefault(name, {'agent_name': name, 'sent': 0, 'received': 0})
+            node[direction] += edge['count']
+    return {'nodes': sorted(nodes.values(), key=lambda n: n['agent_name']), 'edges': edges}
+
+
+@timed_db
+def get_tasks(team=None, status=None, owner=None):
+    """Current task board, most recently updated first."""
+    conn = _get_connection()
+    try:
+        return _query_tasks(conn, team=team, status=status, owner=owner)
+    finally:
+        conn.close()
+
+
+def _query_tasks(conn, team=None, status=None, owner=None):
+    conditions = []
+    params = []
+    if team:
+        conditions.append("team_name = ?")
+        params.append(team)
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    if owner:
+        conditions.append("owner = ?")
+        params.append(owner)
+    where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+    rows = conn.execute(
+        f"SELECT * FROM tasks{where} ORDER BY updated_at DESC", params
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+@timed_db
+def get_task_transitions(task_id, team=None):
+    """Transition history for one task, oldest first."""
+    conn = _get_connection()
+    try:
+        params = [str(task_id)]
+        team_filter = ""
+        if team:
+            team_filter = " AND team_name = ?"
+            params.append(team)
+        rows = conn.execute(
+            f"""SELECT team_name, task_id, field, old_value, new_value, agent_name, timestamp
+                FROM task_transitions WHERE task_id = ?{team_filter}
+                ORDER BY ts_us, id""",
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_task_metrics(team=None, window_hours=24):
+    """Cycle time and throughput for tasks completed in the last window_hours.
+
+    Computed from the status transition log: cycle time runs from a task's
+    first in_progress to its first completed transition, lead time from
+    creation to completion. Throughput is completions per hour.
+    """
+    conn = _get_connection()
+    try:
+        return _query_task_metrics(conn, team=team, window_hours=window_hours)
+    finally:
+        conn.close()
+
+
+def _query_task_metrics(conn, team=None, window_hours=24):
+    hour_us = 3600 * 1000000
+    window_start = now_epoch_us() - window_hours * hour_us
+    team_filter = " AND team_name = ?" if team else ""
+    params = [team] if team else []
+
+    rows = conn.execute(
+        f"""SELECT team_name, task_id,
+                   MIN(CASE WHEN new_value = 'pending' THEN ts_us END) AS created_us,
+                   MIN(CASE WHEN new_value = 'in_progress' THEN ts_us END) AS started_us,
+                   MIN(CASE WHEN new_value = 'completed' THEN ts_us END) AS completed_us
+            FROM task_transitions
+            WHERE field = 'status'{team_filter}
+            GROUP BY team_name, task_id
+            HAVING completed_us >= ?""",
+        params + [window_start]
+    ).fetchall()
+
+    cycle = []
+    lead = []
+    per_hour = {}
+    for row in rows:
+        completed = row['completed_us']
+        if row['started_us'] is not None and row['started_us'] <= completed:
+            cycle.append((completed - row['started_us']) / 1e6)
+        if row['created_us'] is not None and row['created_us'] <= completed:
+            lead.append((completed - row['created_us']) / 1e6)
+        hour = completed // hour_us
+        per_hour[hour] = per_hour.get(hour, 0) + 1
+
+    throughput = [
+        {'hour': format_timestamp(datetime.fromtimestamp(hour * 3600, timezone.utc)), 'completed': count}
+        for hour, count in sorted(per_hour.items())
+    ]
+    return {
+        'window_hours': window_hours,
+        'completed': len(rows),
+        'throughput_per_hour': round(len(rows) / window_hours, 2) if window_hours else None,
+        'completed_by_hour': throughput,
+        'cycle_time_s': _duration_summary(cycle),
+        'lead_time_s': _duration_summary(lead),
+    }
+
+
+def _duration_summary(values):
+    """count/mean/p50/p95/max of a list of durations in seconds."""
+    if not values:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'max': None}
+    values = sorted(values)
+
+    def pct(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))], 1)
+
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 1),
+        'p50': pct(0.5),
+        'p95': pct(0.95),
+        'max': round(values[-1], 1),
+    }
+
+
+@timed_db
+def get_files(path=None, directory=None, agent=None, limit=200, team=None):
+    """Answer file-touch questions from the file index.
+
+    With path, returns that file's touch history (newest first). Otherwise
+    returns one summary row per file (readers, writers, last touch), limited
+    to files under directory when given. agent and team restrict either to
+    one agent or team.
+    """
+    conn = _get_connection()
+    try:
+        return _query_files(conn, path=path, directory=directory, agent=agent, limit=limit, team=team)
+    finally:
+        conn.close()
+
+
+def _query_files(conn, path=None, directory=None, agent=None, limit=200, team=None):
+    conditions = []
+    params = []
+    if path:
+        conditions.append("file_path = ?")
+        params.append(path)
+    elif directory:
+        # Prefix range on file_path so the path index covers the whole subtree
+        prefix = directory.rstrip('/') + '/'
+        conditions.append("file_path >= ? AND file_path < ?")
+        params.extend([prefix, prefix[:-1] + '0'])
+    if agent:
+        conditions.append("agent_name = ?")
+        params.append(agent)
+    if team:
+        conditions.append("team_name = ?")
+        params.append(team)
+    where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+    if path:
+        rows = conn.execute(
+            f"""SELECT file_path, agent_name, team_name, op, timestamp FROM file_touches{where}
+                ORDER BY ts_us DESC, id DESC LIMIT ?""",
+            params + [limit]
+        ).fetchall()
+        return {'path': path, 'touches': [dict(row) for row in rows]}
+
+    rows = conn.execute(
+        f"""SELECT file_path,
+                   SUM(op = 'read') AS reads,
+                   SUM(op = 'write') AS writes,
+                   GROUP_CONCAT(DISTINCT agent_name) AS agents,
+                   MAX(timestamp) AS last_at
+            FROM file_touches{where}
+            GROUP BY file_path
+            ORDER BY MAX(ts_us) DESC LIMIT ?""",
+        params + [limit]
+    ).fetchall()
+    files = []
+    for row in rows:
+        entry = dict(row)
+        entry['agents'] = sorted((entry['agents'] or '').split(',')) if entry['agents'] else []
+        files.append(entry)
+    return {'directory': directory, 'files': files}
+
+
+@timed_db
+def insert_alerts(alerts):
+    """Store alerts raised outside the ingest path (e.g. by the anomaly detector)."""
+    if not alerts:
+        return
+    conn = _get_connection()
+    try:
+        for alert in alerts:
+            _insert_alert(
+                conn, alert['kind'], alert['timestamp'], alert['ts_us'],
+                severity=alert.get('severity', 'warning'),
+                team_name=alert.get('team_name'),
+                agent_name=alert.get('agent_name'),
+                subject=alert.get('subject'),
+                summary=alert.get('summary'),
+                detail=alert.get('detail'),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_alerts(kind=None, agent=None, limit=100, team=None):
+    """Most recent alerts, newest first."""
+    conn = _get_connection()
+    try:
+        return _query_alerts(conn, kind=kind, agent=agent, limit=limit, team=team)
+    finally:
+        conn.close()
+
+
+def _query_alerts(conn, kind=None, agent=None, limit=100, team=None):
+    conditions = []
+    params = []
+    if team:
+        conditions.append("team_name = ?")
+        params.append(team)
+    if kind:
+        conditions.append("kind = ?")
+        params.append(kind)
+    if agent:
+        conditions.append("agent_name = ?")
+        params.append(agent)
+    where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+    rows = conn.execute(
+        f"SELECT * FROM alerts{where} ORDER BY id DESC LIMIT ?", params + [limit]
+    ).fetchall()
+    return [_alert_dict(row) for row in rows]
+
+
+@timed_db
+def get_alerts_since(last_id, limit=100):
+    """Alerts with id greater than last_id, oldest first."""
+    conn = _get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT * FROM alerts WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+        ).fetchall()
+        return [_alert_dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_max_alert_id():
+    """Return the newest alert id, or 0 if there are none."""
+    conn = _get_connection()
+    try:
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM alerts").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _alert_dict(row):
+    alert = dict(row)
+    detail = alert.pop('detail_json', None)
+    alert['detail'] = codec.loads(detail) if detail else None
+    return alert
+
+
+@timed_db
+def get_usage(by='agent', key=None):
+    """Token usage and estimated cost per agent, session or team, highest spend first.
+
+    Each entry carries totals across models plus a per-model breakdown.
+    cost_usd is None when no model in the entry has a known price.
+    """
+    conn = _get_connection()
+    try:
+        return _query_usage(conn, by, key=key)
+    finally:
+        conn.close()
+
+
+def _query_usage(conn, scope, key=None, keys=None, team=None, per_team=False):
+    """Usage entries of a scope; agent entries of one team, or one entry per (team, agent) with per_team."""
+    params = [scope]
+    key_filter = ""
+    if key:
+        key_filter = " AND key = ?"
+        params.append(key)
+    elif keys is not None:
+        key_filter = f" AND key IN ({','.join('?' * len(keys))})"
+        params.extend(keys)
+    if team:
+        key_filter += " AND team_name = ?"
+        params.append(team)
+    rows = conn.execute(
+        f"SELECT * FROM token_usage WHERE scope = ?{key_filter}", params
+    ).fetchall()
+
+    entries = {}
+    for row in rows:
+        group = (row['team_name'], row['key']) if per_team else row['key']
+        entry = entries.get(group)
+        if entry is None:
+            entry = entries[group] = {
+                'key': row['key'], 'messages': 0, 'total_tokens': 0, 'cost_usd': None,
+                'last_at': None, 'models': [],
+                **dict.fromkeys(usage.TOKEN_FIELDS, 0),
+            }
+            if per_team:
+                entry['team_name'] = row['team_name']
+        tokens = {field: row[field] for field in usage.TOKEN_FIELDS}
+        cost = usage.estimate_cost(row['model'], **tokens)
+        entry['models'].append({'model': row['model'], 'messages': row['messages'],
+                                'cost_usd': round(cost, 4) if cost is not None else None, **tokens})
+        entry['messages'] += row['messages']
+        for field, value in tokens.items():
+            entry[field] += value
+            entry['total_tokens'] += value
+        if cost is not None:
+            entry['cost_usd'] = round((entry['cost_usd'] or 0) + cost, 4)
+        if row['last_at'] and (entry['last_at'] is None or row['last_at'] > entry['last_at']):
+            entry['last_at'] = row['last_at']
+
+    return sorted(entries.values(), key=lambda e: (e['cost_usd'] or 0, e['total_tokens']), reverse=True)
+
+
+@timed_db
+def get_ingest_stats():
+    """What the ingest policy did: per-tool counts and payload bytes by outcome.
+
+    Outcomes are the capture level an event was stored at (full, inputs,
+    summary), sampled_out (not stored), and degraded (stored at a lower
+    level because its session was over budget; also counted under that level).
+    """
+    conn = _get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT tool_name, outcome, count, bytes FROM ingest_counters ORDER BY tool_name"
+        ).fetchall()
+        tools = {}
+        totals = {}
+        for row in rows:
+            tool = tools.setdefault(row['tool_name'] or '(none)', {})
+            tool[row['outcome']] = {'count': row['count'], 'bytes': row['bytes']}
+            total = totals.setdefault(row['outcome'], {'count': 0, 'bytes': 0})
+            total['count'] += row['count']
+            total['bytes'] += row['bytes']
+        budgets = conn.execute(
+            "SELECT session_id, stored_bytes FROM sessions ORDER BY stored_bytes DESC LIMIT 10"
+        ).fetchall()
+        return {
+            'totals': totals,
+            'by_tool': tools,
+            'largest_sessions': [dict(row) for row in budgets],
+            'session_budget_bytes': POLICY.session_budget_bytes or None,
+        }
+    finally:
+        conn.close()
+
+
+# ---- Time travel ----
+
+def _fold(conn, state, after_us, until_us):
+    """Fold events and task transitions with after_us < ts_us <= until_us into state.
+
+    Returns the number of events folded in.
+    """
+    rows = conn.execute(
+        """SELECT agent_name, team_name, event_category, timestamp FROM events
+           WHERE ts_us > ? AND ts_us <= ? ORDER BY ts_us, id""",
+        (after_us, until_us)
+    ).fetchall()
+    for row in rows:
+        state.apply_event(row['agent_name'], row['team_name'], row['event_category'], row['timestamp'])
+    for row in conn.execute(
+        """SELECT team_name, task_id, field, new_value, timestamp, ts_us FROM task_transitions
+           WHERE ts_us > ? AND ts_us <= ? ORDER BY ts_us, id""",
+        (after_us, until_us)
+    ):
+        state.apply_transition(row['team_name'], row['task_id'], row['field'], row['new_value'],
+                               row['timestamp'], row['ts_us'])
+    return len(rows)
+
+
+def _latest_snapshot(conn, at_us=None):
+    """(state, cut_us) of the newest snapshot at or before at_us, or an empty state and None."""
+    if at_us is None:
+        row = conn.execute("SELECT cut_us, state_json FROM state_snapshots ORDER BY cut_us DESC LIMIT 1").fetchone()
+    else:
+        row = conn.execute(
+            "SELECT cut_us, state_json FROM state_snapshots WHERE cut_us <= ? ORDER BY cut_us DESC LIMIT 1",
+            (at_us,)
+        ).fetchone()
+    if row is None:
+        return DashboardState(), None
+    return DashboardState(codec.loads(row['state_json'])), row['cut_us']
+
+
+@timed_db
+def get_state_at(at_us):
+    """Agents, stats and tasks as they stood at at_us (epoch microseconds).
+
+    Starts from the nearest snapshot at or before at_us and replays only the
+    events after it, so the cost is bounded by the snapshot interval rather
+    than the length of history.
+    """
+    conn = _get_connection()
+    try:
+        conn.execute("BEGIN")
+        state, cut_us = _latest_snapshot(conn, at_us)
+        replayed = _fold(conn, state, -1 if cut_us is None else cut_us, at_us)
+        recent = conn.execute(
+            "SELECT COUNT(*) FROM events WHERE ts_us > ? AND ts_us <= ?",
+            (at_us - 60 * 1000000, at_us)
+        ).fetchone()[0]
+        conn.rollback()
+    finally:
+        conn.close()
+
+    result = state.render(events_last_minute=recent)
+    result.update({
+        'at': _format_us(at_us),
+        'snapshot_at': None if cut_us is None else _format_us(cut_us),
+        'replayed_events': replayed,
+    })
+    return result
+
+
+def _format_us(ts_us):
+    return format_timestamp(datetime.fromtimestamp(ts_us / 1e6, timezone.utc))
+
+
+@timed_db
+def take_snapshots(interval_s, until_us, limit=20, budget_s=0.2):
+    """Persist state snapshots at every interval_s boundary up to until_us that has new events.
+
+    Resumes from the newest snapshot. Stops after `limit` snapshots or
+    budget_s seconds (the write lock is held throughout), so a long history
+    is snapshotted over several calls. Returns the number written.
+    """
+    interval_us = int(interval_s * 1000000)
+    conn = _get_connection()
+    try:
+        last_cut = conn.execute("SELECT MAX(cut_us) FROM state_snapshots").fetchone()[0]
+        first = conn.execute(
+            "SELECT MIN(ts_us) FROM events WHERE ts_us > ?", (-1 if last_cut is None else last_cut,)
+        ).fetchone()[0]
+        if first is None or -(-first // interval_us) * interval_us > until_us:
+            return 0
+
+        conn.execute("BEGIN IMMEDIATE")
+        state, last_cut = _latest_snapshot(conn)
+        written = 0
+        deadline = time.perf_counter() + budget_s
+        while written < limit and time.perf_counter() < deadline:
+            first = conn.execute(
+                "SELECT MIN(ts_us) FROM events WHERE ts_us > ?", (-1 if last_cut is None else last_cut,)
+            ).fetchone()[0]
+            if first is None:
+                break
+            # The first boundary at or after the next event; empty intervals are skipped
+            cut_us = -(-first // interval_us) * interval_us
+            if cut_us > until_us:
+                break
+            _fold(conn, state, -1 if last_cut is None else last_cut, cut_us)
+            conn.execute(
+                "INSERT OR REPLACE INTO state_snapshots (cut_us, timestamp, event_count, state_json) VALUES (?, ?, ?, ?)",
+                (cut_us, _format_us(cut_us), state.total, codec.dumps(state.to_dict()))
+            )
+            last_cut = cut_us
+            written += 1
+        conn.commit()
+        return written
+    finally:
+        conn.close()
+
+
+@timed_db
+def get_events_between(start_us, end_us, after=None, limit=500):
+    """Events with start_us <= ts_us <= end_us in timestamp order, for replay.
+
+    `after` is the (ts_us, id) of the last event already returned.
+    """
+    after_us, after_id = after if after else (start_us, 0)
+    conn = _get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT id, timestamp, ts_us, session_id, team_name, agent_name, hook_event, "
+            "tool_name, event_category, summary, duration_ms, is_error "
+            "FROM events WHERE (ts_us > ? OR (ts_us = ? AND id > ?)) AND ts_us <= ? "
+            "ORDER BY ts_us, id LIMIT ?",
+            (after_us, after_us, after_id, end_us, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+# ---- Export ----
+
+EXPORT_COLUMNS = (
+    'id', 'timestamp', 'ts_us', 'session_id', 'team_name', 'agent_name', 'hook_event',
+    'tool_name', 'event_category', 'summary', 'duration_ms', 'is_error', 'event_key', 'node',
+)
+
+
+def iter_events(start_us=None, end_us=None, team=None, agent=None, category=None, tool=None,
+                include_payload=False, batch_size=1000):
+    """Yield batches of event tuples (EXPORT_COLUMNS, plus payload_json if asked) in timestamp order.
+
+    One query, read with a single forward cursor inside one read transaction,
+    so memory stays at one batch however many rows match and the export is a
+    consistent snapshot. The connection is closed when the generator is
+    exhausted or closed. While it is open the WAL can't be checkpointed
+    past it, so consume it promptly.
+    """
+    columns = EXPORT_COLUMNS + (('payload_json',) if include_payload else ())
+    conditions = []
+    params = []
+    for column, op, value in (('ts_us', '>=', start_us), ('ts_us', '<=', end_us), ('team_name', '=', team),
+                              ('agent_name', '=', agent), ('event_category', '=', category),
+                              ('tool_name', '=', tool)):
+        if value is not None:
+            conditions.append(f'{column} {op} ?')
+            params.append(value)
+    where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+
+    conn = sqlite3.connect(get_db_path())
+    try:
+        conn.execute("BEGIN")
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM events {where} ORDER BY ts_us, id", params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield batch
+        conn.rollback()
     finally:
         conn.close()
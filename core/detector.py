@@ -0,0 +1,202 @@
+"""Streaming anomaly detection for team-monitor plugin.
+
+Consumes events in ingest order and keeps a small fixed amount of state
+per agent, so memory is O(agents) however long the server runs:
+
+- stalled agents: no event for STALL_AFTER_S since the agent's last one
+  (agents that stopped cleanly are forgotten; a SubagentStop stops the
+  subagent it names, not the parent session it fired in)
+- retry loops: the same Bash command REPEAT_THRESHOLD times within the
+  agent's last REPEAT_WINDOW Bash calls (compared in full when the event
+  carries its command, else by summary)
+- error storms: an exponentially weighted error rate over the agent's
+  events crossing ERROR_RATE_THRESHOLD
+
+Every detector raises one alert per episode and re-arms once the
+condition clears. Alerts are plain dicts in the shape of the alerts table.
+"""
+
+import os
+import zlib
+from collections import deque
+
+from core.timeutil import format_timestamp, parse_timestamp, to_epoch_us, now_epoch_us
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, '') or default)
+    except ValueError:
+        return float(default)
+
+
+STALL_AFTER_S = _env_float('TEAM_MONITOR_STALL_S', 300)
+
+REPEAT_WINDOW = 10
+REPEAT_THRESHOLD = 4
+
+# Smoothing factor of the error-rate EWMA; ~1/alpha recent events dominate
+ERROR_ALPHA = 0.2
+ERROR_RATE_THRESHOLD = 0.5
+# Don't judge an agent's error rate on fewer events than this
+ERROR_MIN_EVENTS = 5
+
+
+class AgentState:
+    """Per-agent detector state."""
+
+    __slots__ = ('team_name', 'last_seen_us', 'stalled', 'recent_commands',
+                 'repeat_alerted', 'error_rate', 'events', 'storming')
+
+    def __init__(self, team_name):
+        self.team_name = team_name
+        self.last_seen_us = 0
+        self.stalled = False
+        self.recent_commands = deque(maxlen=REPEAT_WINDOW)
+        self.repeat_alerted = set()
+        self.error_rate = 0.0
+        self.events = 0
+        self.storming = False
+
+
+class AnomalyDetector:
+    """Feed events in with observe(); call check_stalls() periodically."""
+
+    def __init__(self):
+        # Both keyed by (team_name, agent_name)
+        self.agents = {}
+        # agent -> time it stopped; the transcript backfill that follows a stop is history
+        self.stopped = {}
+
+    def observe(self, event):
+        """Update state with one event and return any alerts it raises."""
+        agent_name = event.get('agent_name') or 'unknown'
+        team_name = event.get('team_name') or 'unknown'
+        key = (team_name, agent_name)
+        now_us = now_epoch_us()
+        ts_us = to_epoch_us(event.get('timestamp')) or now_us
+        hook_event = event.get('hook_event')
+        if hook_event == 'Stop':
+            self.agents.pop(key, None)
+            self.stopped[key] = ts_us
+            return []
+        if hook_event in ('SubagentStart', 'SubagentStop'):
+            # agent_name is the parent; the subagent's own events (backfilled
+            # from its transcript) are attributed to subagent_name
+            subagent = event.get('subagent_name')
+            if subagent:
+                sub_key = (team_name, subagent)
+                if hook_event == 'SubagentStop':
+                    self.agents.pop(sub_key, None)
+                    self.stopped[sub_key] = ts_us
+                else:
+                    self.stopped.pop(sub_key, None)
+            # Either way the parent session is active
+
+        if ts_us < now_us - STALL_AFTER_S * 1000000:
+            return []  # backfilled history, not live activity
+        if key in self.stopped:
+            if ts_us <= self.stopped[key]:
+                return []
+            del self.stopped[key]
+
+        state = self.agents.get(key)
+        if state is None:
+            # Events stored before the agent's team was known were moved to it (see
+            # db._adopt_session_team); carry their state over rather than let it stall
+            state = self.agents.pop(('unknown', agent_name), None) if team_name != 'unknown' else None
+            if state is not None:
+                state.team_name = team_name
+            else:
+                state = AgentState(team_name)
+            self.agents[key] = state
+        # Backfilled events can be older than what we've seen; time only moves forward
+        state.last_seen_us = max(state.last_seen_us, ts_us)
+        state.stalled = False
+        state.events += 1
+
+        alerts = []
+        if event.get('tool_name') == 'Bash':
+            alert = self._check_repeat(agent_name, state, event)
+            if alert:
+                alerts.append(alert)
+        alert = self._check_errors(agent_name, state, event)
+        if alert:
+            alerts.append(alert)
+        return alerts
+
+    def check_stalls(self, now_us=None):
+        """Return alerts for agents that have gone quiet since the last check."""
+        now_us = now_us or now_epoch_us()
+        cutoff = now_us - int(STALL_AFTER_S * 1000000)
+        alerts = []
+        for (_, agent_name), state in self.agents.items():
+            if state.stalled or state.last_seen_us >= cutoff:
+                continue
+            state.stalled = True
+            idle_s = (now_us - state.last_seen_us) / 1e6
+            alerts.append(_alert(
+                'agent_stalled', now_us, agent_name, state.team_name,
+                summary=f'{agent_name} has been silent for {idle_s / 60:.0f} min',
+                detail={'last_seen': _format_us(state.last_seen_us), 'idle_s': round(idle_s)},
+            ))
+        return alerts
+
+    def _check_repeat(self, agent_name, state, event):
+        command = (event.get('summary') or '').strip()
+        # The summary truncates long commands, so commands sharing a prefix would look alike
+        digest = zlib.crc32((event.get('command') or command).strip().encode('utf-8'))
+        state.recent_commands.append(digest)
+        count = state.recent_commands.count(digest)
+
+        # Re-arm commands that have dropped back under the threshold
+        state.repeat_alerted = {d for d in state.repeat_alerted
+                                if state.recent_commands.count(d) >= REPEAT_THRESHOLD}
+        if count < REPEAT_THRESHOLD or digest in state.repeat_alerted:
+            return None
+        state.repeat_alerted.add(digest)
+        return _alert(
+            'retry_loop', _event_us(event), agent_name, state.team_name,
+            subject=command,
+            summary=f'{agent_name} ran the same command {count} times in its last {len(state.recent_commands)}: {command}',
+            detail={'count': count, 'window': len(state.recent_commands)},
+        )
+
+    def _check_errors(self, agent_name, state, event):
+        failed = 1.0 if event.get('is_error') else 0.0
+        state.error_rate += ERROR_ALPHA * (failed - state.error_rate)
+        if state.storming:
+            if state.error_rate < ERROR_RATE_THRESHOLD / 2:
+                state.storming = False
+            return None
+        if state.events < ERROR_MIN_EVENTS or state.error_rate < ERROR_RATE_THRESHOLD:
+            return None
+        state.storming = True
+        return _alert(
+            'error_storm', _event_us(event), agent_name, state.team_name,
+            severity='critical',
+            summary=f'{agent_name} error rate at {state.error_rate:.0%}',
+            detail={'error_rate': round(state.error_rate, 3), 'last_tool': event.get('tool_name')},
+        )
+
+
+def _event_us(event):
+    return to_epoch_us(event.get('timestamp')) or now_epoch_us()
+
+
+def _format_us(ts_us):
+    return format_timestamp(parse_timestamp(ts_us / 1e6))
+
+
+def _alert(kind, ts_us, agent_name, team_name, severity='warning', subject=None, summary=None, detail=None):
+    return {
+        'kind': kind,
+        'severity': severity,
+        'timestamp': _format_us(ts_us),
+        'ts_us': ts_us,
+        'team_name': team_name,
+        'agent_name': agent_name,
+        'subject': subject if subject is not None else agent_name,
+        'summary': summary,
+        'detail': detail,
+    }
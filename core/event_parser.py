@@ -1,10 +1,25 @@
 """Event classification and parsing for team-monitor plugin."""
 
-import json
-from datetime import datetime, timezone
+import re
 
-# Maximum size for tool_result in stored payload (50 KB)
-MAX_TOOL_RESULT_SIZE = 50 * 1024
+from core import codec
+from core.policy import POLICY
+from core.timeutil import now_timestamp, to_epoch_us
+
+# Tools that touch a single file, and whether they read or modify it
+FILE_TOOLS = {
+    'Read': 'read',
+    'Edit': 'write',
+    'MultiEdit': 'write',
+    'Write': 'write',
+    'NotebookEdit': 'write',
+}
+
+# Tool calls without a tool_use id are identified by a content hash within this many seconds
+EVENT_KEY_BUCKET_S = 1
+
+# TaskCreate reports the new task's id in its result, e.g. "Task #5 created successfully"
+_TASK_ID_RE = re.compile(r'#(\w+)')
 
 
 def parse_event(hook_data):
@@ -15,9 +30,10 @@ def parse_event(hook_data):
 
     Returns:
         dict with keys: timestamp, session_id, team_name, agent_name,
-        hook_event, tool_name, event_category, summary, payload_json
+        hook_event, tool_name, event_category, summary, payload_json,
+        event_key, capture_level (plus derived facts, see add_derived_fields)
     """
-    timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+    timestamp = now_timestamp()
     session_id = hook_data.get('session_id', '')
     hook_event = hook_data.get('hook_event_name', '')
     tool_name = hook_data.get('tool_name', '') or ''
@@ -33,14 +49,11 @@ def parse_event(hook_data):
     # Classify the event
     event_category, summary = _classify(tool_name, hook_event, tool_input, tool_result)
 
-    # Truncate tool_result in payload to keep storage reasonable
-    payload = dict(hook_data)
-    if 'tool_result' in payload:
-        result_str = str(payload['tool_result'])
-        if len(result_str) > MAX_TOOL_RESULT_SIZE:
-            payload['tool_result'] = result_str[:MAX_TOOL_RESULT_SIZE] + '...[truncated]'
+    # Store as much of the payload as the ingest policy asks for
+    capture_level = POLICY.level_for(tool_name, event_category)
+    payload = POLICY.shape_payload(hook_data, capture_level)
 
-    return {
+    event = {
         'timestamp': timestamp,
         'session_id': session_id,
         'team_name': team_name,
@@ -49,8 +62,170 @@ def parse_event(hook_data):
         'tool_name': tool_name,
         'event_category': event_category,
         'summary': summary,
-        'payload_json': json.dumps(payload, default=str),
+        'payload_json': codec.dumps(payload),
+        'event_key': event_key(hook_data.get('tool_use_id'), agent_name, tool_name, tool_input, timestamp),
+        'capture_level': capture_level,
     }
+    add_derived_fields(event, tool_name, tool_input, hook_data.get('tool_response') or tool_result, hook_data)
+    return event
+
+
+def event_key(tool_use_id, agent_name, tool_name, tool_input, timestamp):
+    """Stable identity of a tool call, shared by its live and transcript copies.
+
+    The tool_use id when known, otherwise a hash of agent, tool, input and
+    the EVENT_KEY_BUCKET_S window it happened in. None for non-tool events,
+    which are never deduplicated.
+    """
+    if tool_use_id:
+        return f'tu:{tool_use_id}'
+    if not tool_name:
+        return None
+    ts_us = to_epoch_us(timestamp)
+    bucket = ts_us // (EVENT_KEY_BUCKET_S * 1000000) if ts_us is not None else None
+    basis = codec.dumps([agent_name or '', tool_name, tool_input, bucket])
+    import hashlib  # most calls have a tool_use id, so most hooks never import it
+    return 'h:' + hashlib.sha1(basis.encode('utf-8')).hexdigest()
+
+
+def add_derived_fields(event, tool_name, tool_input, tool_result=None, hook_data=None):
+    """Attach structured facts that core.db maintains derived tables from.
+
+    These keys aren't stored as event columns; they spare the ingest path
+    from re-parsing payload_json. hook_data is the raw hook payload, needed
+    for the subagent fields of SubagentStart/SubagentStop.
+    """
+    link = _extract_subagent_link(event.get('hook_event'), hook_data or {}, tool_input, event.get('session_id'))
+    if link:
+        event['subagent_link'] = link
+
+    edge = _extract_message_edge(tool_name, tool_input, event.get('agent_name'))
+    if edge:
+        event['message_edge'] = edge
+
+    change = _extract_task_change(tool_name, tool_input, tool_result)
+    if change:
+        event['task_change'] = change
+
+    if _is_error(event.get('hook_event'), tool_result):
+        event['is_error'] = 1
+
+    op = FILE_TOOLS.get(tool_name)
+    path = tool_input.get('file_path') or tool_input.get('notebook_path') if op else None
+    if path:
+        event['file_touch'] = {'path': str(path), 'op': op}
+
+
+def subagent_name(hook_data):
+    """Name of the subagent a SubagentStart/SubagentStop hook is about, or ''.
+
+    Its name from the spawning call when known, otherwise its type plus
+    the start of its agent id (e.g. 'Explore-a1b2c3d4'), so each subagent
+    gets a card of its own.
+    """
+    tool_input = hook_data.get('tool_input') or {}
+    name = tool_input.get('name', '') if isinstance(tool_input, dict) else ''
+    if name:
+        return name
+    agent_id = str(hook_data.get('agent_id') or '')
+    if agent_id:
+        return f"{hook_data.get('agent_type') or 'subagent'}-{agent_id[:8]}"
+    return ''
+
+
+def _extract_subagent_link(hook_event, hook_data, tool_input, session_id):
+    """Return the parent -> subagent link for a SubagentStart/SubagentStop hook, or None.
+
+    The parent is the agent whose session the hook fired in.
+    """
+    if hook_event not in ('SubagentStart', 'SubagentStop'):
+        return None
+    child = subagent_name(hook_data)
+    if not child:
+        return None
+    return {
+        'agent_name': child,
+        'parent_name': _extract_agent_name(hook_data, {}, session_id),
+        'agent_id': hook_data.get('agent_id') or None,
+        'agent_type': hook_data.get('agent_type') or tool_input.get('subagent_type') or None,
+        'op': 'start' if hook_event == 'SubagentStart' else 'stop',
+    }
+
+
+def _extract_message_edge(tool_name, tool_input, sender):
+    """Return the sender -> recipient edge for a SendMessage call, or None."""
+    if tool_name != 'SendMessage':
+        return None
+    msg_type = tool_input.get('type', 'message') or 'message'
+    if msg_type == 'broadcast':
+        recipient = '*'
+    else:
+        recipient = tool_input.get('recipient', '') or 'unknown'
+    content = tool_input.get('content', '') or ''
+    return {
+        'sender': sender or 'unknown',
+        'recipient': recipient,
+        'type': msg_type,
+        'bytes': len(str(content).encode('utf-8')),
+    }
+
+
+def _is_error(hook_event, tool_result):
+    """Best-effort check whether a tool call failed."""
+    if hook_event == 'PostToolUseFailure':
+        return True
+    if isinstance(tool_result, dict):
+        return bool(tool_result.get('is_error') or tool_result.get('error'))
+    return False
+
+
+def _extract_task_change(tool_name, tool_input, tool_result):
+    """Return the task fields set by a TaskCreate/TaskUpdate call, or None.
+
+    TaskCreate only carries the new task's id in its result, so creates seen
+    without one (e.g. from transcripts) can't be placed on the board.
+    """
+    if tool_name == 'TaskCreate':
+        task_id = _created_task_id(tool_result)
+        if not task_id:
+            return None
+        return {
+            'task_id': task_id,
+            'action': 'create',
+            'subject': tool_input.get('subject', '') or '',
+            'status': 'pending',
+            'owner': tool_input.get('owner', '') or None,
+        }
+
+    if tool_name == 'TaskUpdate':
+        task_id = str(tool_input.get('taskId', '') or '')
+        if not task_id:
+            return None
+        return {
+            'task_id': task_id,
+            'action': 'update',
+            'subject': tool_input.get('subject', '') or None,
+            'status': tool_input.get('status', '') or None,
+            'owner': tool_input.get('owner', '') or None,
+        }
+
+    return None
+
+
+def _created_task_id(tool_result):
+    """Find the new task's id in a TaskCreate result (dict or text)."""
+    if isinstance(tool_result, dict):
+        task = tool_result.get('task')
+        if isinstance(task, dict) and task.get('id'):
+            return str(task['id'])
+        if tool_result.get('id') or tool_result.get('taskId'):
+            return str(tool_result.get('id') or tool_result.get('taskId'))
+        return None
+    if tool_result:
+        match = _TASK_ID_RE.search(str(tool_result))
+        if match:
+            return match.group(1)
+    return None
 
 
 def _extract_agent_name(hook_data, tool_input, session_id):
@@ -0,0 +1,192 @@
+"""Event history export for team-monitor plugin.
+
+Both formats consume the batches from core.db.iter_events, so memory is
+bounded by one batch (plus one row group per open partition for columnar
+output) no matter how many events are exported.
+
+- NDJSON: one JSON object per event, streamed (used by /api/export)
+- Columnar: one file set per day and team under a Hive-style directory
+  layout (day=2025-01-31/team=my-team/), as Parquet when pyarrow is
+  installed, otherwise as gzipped CSV in which the repetitive string
+  columns hold integer codes into per-partition dictionary files. A
+  _manifest.json at the top lists every partition (the leading underscore
+  keeps Parquet dataset readers from treating it as data).
+"""
+
+import csv
+import gzip
+import os
+
+from core import codec
+from core.db import EXPORT_COLUMNS
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Columns with few distinct values, dictionary-encoded in CSV output
+DICTIONARY_COLUMNS = ('session_id', 'team_name', 'agent_name', 'hook_event', 'tool_name', 'event_category')
+
+GZIP_LEVEL = 6
+
+# Rows buffered per partition before a Parquet row group is written
+ROW_GROUP_SIZE = 50000
+
+_INT_COLUMNS = ('id', 'ts_us', 'duration_ms', 'is_error')
+
+
+def ndjson_chunks(batches, include_payload=False):
+    """Yield one str chunk of NDJSON lines per batch of rows.
+
+    Stored payloads are spliced in as raw JSON text rather than decoded and
+    re-encoded.
+    """
+    for batch in batches:
+        lines = []
+        for row in batch:
+            line = codec.dumps(dict(zip(EXPORT_COLUMNS, row)))
+            if include_payload:
+                payload = row[len(EXPORT_COLUMNS)]
+                line = f'{line[:-1]},"payload":{payload or "null"}}}'
+            lines.append(line)
+        lines.append('')
+        yield '\n'.join(lines)
+
+
+def columnar_format(requested='auto'):
+    """Resolve 'auto' to 'parquet' or 'csv' depending on whether pyarrow is installed."""
+    if requested == 'auto':
+        return 'parquet' if pyarrow is not None else 'csv'
+    if requested == 'parquet' and pyarrow is None:
+        raise RuntimeError('Parquet output needs pyarrow (pip install pyarrow)')
+    return requested
+
+
+def _partition_key(row):
+    day = (row[1] or 'unknown')[:10]
+    return day, row[4] or 'unknown'
+
+
+def _safe(value):
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in value) or '_'
+
+
+class _CsvPartition:
+    def __init__(self, path, columns):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.columns = columns
+        self.rows = 0
+        self._file = gzip.open(os.path.join(path, 'events.csv.gz'), 'wt', compresslevel=GZIP_LEVEL,
+                               encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+        self._dicts = {col: {} for col in DICTIONARY_COLUMNS}
+        self._dict_index = [(i, self._dicts[col]) for i, col in enumerate(columns) if col in self._dicts]
+
+    def write(self, row):
+        row = list(row)
+        for i, mapping in self._dict_index:
+            value = row[i]
+            if value is not None:
+                row[i] = mapping.setdefault(value, len(mapping))
+        self._writer.writerow(row)
+        self.rows += 1
+
+    def close(self):
+        self._file.close()
+        files = ['events.csv.gz']
+        for col, mapping in self._dicts.items():
+            name = f'{col}.dict.csv'
+            with open(os.path.join(self.path, name), 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('code', 'value'))
+                writer.writerows((code, value) for value, code in mapping.items())
+            files.append(name)
+        return files
+
+
+class _ParquetPartition:
+    def __init__(self, path, columns):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.columns = columns
+        self.rows = 0
+        self._buffer = []
+        fields = [pyarrow.field(col, pyarrow.int64() if col in _INT_COLUMNS else pyarrow.string())
+                  for col in columns]
+        self._schema = pyarrow.schema(fields)
+        self._writer = pyarrow.parquet.ParquetWriter(
+            os.path.join(path, 'events.parquet'), self._schema, compression='zstd', use_dictionary=True,
+        )
+
+    def write(self, row):
+        self._buffer.append(row)
+        self.rows += 1
+        if len(self._buffer) >= ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        arrays = [pyarrow.array([row[i] for row in self._buffer], type=field.type)
+                  for i, field in enumerate(self._schema)]
+        self._writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self._schema))
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        return ['events.parquet']
+
+
+def write_columnar(batches, out_dir, fmt='auto', include_payload=False):
+    """Write rows into day/team partitions under out_dir. Returns the manifest dict.
+
+    Rows arrive in timestamp order, so a day's partitions are all closed
+    once the next day starts; only the current day's teams are open at once.
+    """
+    fmt = columnar_format(fmt)
+    columns = EXPORT_COLUMNS + (('payload_json',) if include_payload else ())
+    partition_cls = _ParquetPartition if fmt == 'parquet' else _CsvPartition
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest = {'format': fmt, 'columns': list(columns), 'rows': 0, 'partitions': []}
+    if fmt == 'csv':
+        manifest['dictionary_columns'] = list(DICTIONARY_COLUMNS)
+    open_partitions = {}
+    current_day = None
+
+    def close_all():
+        for (day, team), part in sorted(open_partitions.items()):
+            files = part.close()
+            manifest['partitions'].append({
+                'day': day,
+                'team': team,
+                'path': os.path.relpath(part.path, out_dir).replace(os.sep, '/'),
+                'rows': part.rows,
+                'files': files,
+            })
+        open_partitions.clear()
+
+    try:
+        for batch in batches:
+            for row in batch:
+                key = _partition_key(row)
+                if key[0] != current_day:
+                    close_all()
+                    current_day = key[0]
+                part = open_partitions.get(key)
+                if part is None:
+                    path = os.path.join(out_dir, f'day={_safe(key[0])}', f'team={_safe(key[1])}')
+                    part = open_partitions[key] = partition_cls(path, columns)
+                part.write(row)
+                manifest['rows'] += 1
+    finally:
+        close_all()
+
+    with open(os.path.join(out_dir, '_manifest.json'), 'w', encoding='utf-8') as f:
+        f.write(codec.dumps(manifest))
+    return manifest
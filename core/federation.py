@@ -0,0 +1,262 @@
+"""Multi-host federation for team-monitor plugin.
+
+Each node ships its event log, in id order, to one aggregator, which
+merges the streams from every node into its own database and serves the
+combined dashboard. Shipping is incremental: the aggregator keeps one
+import watermark per node ('federation:<node>' in transcript_imports), the
+highest source event id it has stored, advanced in the same transaction as
+the events themselves. A shipper resumes from that watermark, so a batch
+that was lost or sent twice is re-sent or ignored without gaps.
+
+Two transports:
+- HTTP: gzipped JSON batches POSTed to the aggregator's
+  /api/federation/ingest, authenticated with a shared bearer token
+- Directory: gzipped NDJSON batch files written to <dir>/<node>/ on a
+  shared filesystem, named <first id>-<last id>.ndjson.gz, which the
+  aggregator's Collector picks up
+
+Events are deduplicated by a global event key, '<node>:<event_key>' (or
+'<node>:#<id>' for events without one), so re-shipping is harmless.
+Events the aggregator received from further nodes keep their origin node
+and key when it ships them on, and a node never stores its own events
+back. Derived facts (latency, comm graph, task board, file touches) are
+re-derived from the payloads on arrival; file paths are prefixed with the
+node, so agents on different hosts never raise write-conflict alerts
+against each other.
+"""
+
+import gzip
+import os
+import re
+import socket
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from core import codec, metrics
+from core.db import SHIP_COLUMNS, get_events_for_shipping, get_transcript_offset, insert_events
+from core.event_parser import add_derived_fields
+
+NODE_ID = os.environ.get('TEAM_MONITOR_NODE') or socket.gethostname()
+
+SOURCE_PREFIX = 'federation:'
+
+# Events per shipped batch
+BATCH_SIZE = 1000
+
+_NODE_RE = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+_BATCH_FILE_RE = re.compile(r'^(\d+)-(\d+)\.ndjson\.gz$')
+
+
+def valid_node(node):
+    """Node ids are hostnames or similar: letters, digits, '.', '_' and '-'."""
+    return isinstance(node, str) and bool(_NODE_RE.match(node))
+
+
+def prepare_shipped(sender, row):
+    """Turn a shipped event row into an event dict for insert_events, or None to skip it."""
+    origin = row.get('node') or sender
+    if origin == NODE_ID:
+        return None
+    event = {col: row.get(col) for col in SHIP_COLUMNS if col != 'id'}
+    event['node'] = origin
+    event['is_error'] = row.get('is_error') or 0
+    if not row.get('node'):
+        event['event_key'] = f"{origin}:{row.get('event_key') or '#%s' % row.get('id')}"
+
+    try:
+        payload = codec.loads(row.get('payload_json') or '{}')
+    except codec.JSONDecodeError:
+        payload = None
+    if isinstance(payload, dict):
+        tool_input = payload.get('tool_input')
+        add_derived_fields(event, row.get('tool_name'), tool_input if isinstance(tool_input, dict) else {},
+                           payload.get('tool_response') or payload.get('tool_result'), payload)
+    touch = event.get('file_touch')
+    if touch:
+        touch['path'] = f"{origin}:{touch['path']}"
+    return event
+
+
+def ingest_shipped(sender, rows, last_id):
+    """Store a batch shipped by a node. Returns (events inserted, the node's watermark afterwards).
+
+    Rows at or below the watermark were stored by an earlier batch and are
+    skipped before insert.
+    """
+    source = SOURCE_PREFIX + sender
+    watermark = get_transcript_offset(source)
+    if last_id <= watermark:
+        return 0, watermark
+    events = []
+    for row in rows:
+        if isinstance(row, dict) and isinstance(row.get('id'), int) and row['id'] > watermark:
+            event = prepare_shipped(sender, row)
+            if event:
+                events.append(event)
+    inserted = insert_events(events, source, last_id)
+    metrics.inc('team_monitor_federation_events_total', inserted, direction='received')
+    return inserted, last_id
+
+
+# ---- Transports ----
+
+class HttpTarget:
+    """Ships to an aggregator's /api/federation/ingest."""
+
+    def __init__(self, url, token=None, timeout=30):
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def __str__(self):
+        return self.url
+
+    def _request(self, path, body=None):
+        headers = {'Accept': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+            headers['Content-Encoding'] = 'gzip'
+        req = urllib.request.Request(self.url + path, data=body, headers=headers,
+                                     method='POST' if body is not None else 'GET')
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return codec.loads(resp.read())
+        except urllib.error.HTTPError as exc:
+            detail = exc.read()[:200].decode('utf-8', 'replace')
+            raise RuntimeError(f'{self.url}{path}: HTTP {exc.code} {detail}') from None
+
+    def watermark(self, node):
+        """The highest event id of this node the aggregator has stored."""
+        status = self._request('/api/federation/status?' + urllib.parse.urlencode({'node': node}))
+        return status.get('last_id') or 0
+
+    def send(self, node, events, last_id):
+        body = gzip.compress(codec.dumps({'node': node, 'last_id': last_id, 'events': events}).encode('utf-8'),
+                             compresslevel=6)
+        return self._request('/api/federation/ingest', body)['last_id']
+
+
+class DirTarget:
+    """Ships batch files into <path>/<node>/ for a Collector to pick up."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __str__(self):
+        return self.path
+
+    def watermark(self, node):
+        """The last id of the newest batch file written (the Collector always keeps it)."""
+        return max((last for _, last, _ in _batch_files(os.path.join(self.path, node))), default=0)
+
+    def send(self, node, events, last_id):
+        node_dir = os.path.join(self.path, node)
+        os.makedirs(node_dir, exist_ok=True)
+        name = f"{events[0]['id']:012d}-{last_id:012d}.ndjson.gz"
+        tmp = os.path.join(node_dir, f'.{name}.tmp')
+        with gzip.open(tmp, 'wt', compresslevel=6, encoding='utf-8') as f:
+            for event in events:
+                f.write(codec.dumps(event))
+                f.write('\n')
+        os.replace(tmp, os.path.join(node_dir, name))
+        return last_id
+
+
+def make_target(spec, token=None):
+    """An HttpTarget for an http(s):// URL, otherwise a DirTarget for a directory."""
+    if spec.startswith(('http://', 'https://')):
+        return HttpTarget(spec, token=token)
+    return DirTarget(spec)
+
+
+def _batch_files(node_dir):
+    """(first id, last id, path) of each complete batch file in a node directory, in id order."""
+    try:
+        names = os.listdir(node_dir)
+    except OSError:
+        return []
+    files = []
+    for name in names:
+        match = _BATCH_FILE_RE.match(name)
+        if match:
+            files.append((int(match.group(1)), int(match.group(2)), os.path.join(node_dir, name)))
+    return sorted(files)
+
+
+class Shipper:
+    """Ships this node's events to a target, resuming from the target's watermark."""
+
+    def __init__(self, target, node=NODE_ID, batch_size=BATCH_SIZE):
+        self.target = target
+        self.node = node
+        self.batch_size = batch_size
+        self.position = None
+
+    def ship_once(self):
+        """Ship one batch. Returns the number of events sent (0 when caught up)."""
+        if self.position is None:
+            self.position = self.target.watermark(self.node)
+        events = get_events_for_shipping(self.position, self.batch_size)
+        if not events:
+            return 0
+        try:
+            self.position = self.target.send(self.node, events, events[-1]['id'])
+        except Exception:
+            # Ask the target where it stands before trying again
+            self.position = None
+            raise
+        metrics.inc('team_monitor_federation_events_total', len(events), direction='shipped')
+        return len(events)
+
+    def ship_all(self, max_batches=None):
+        """Ship until caught up (or max_batches). Returns the number of events sent."""
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            sent = self.ship_once()
+            if not sent:
+                break
+            total += sent
+            batches += 1
+        return total
+
+
+class Collector:
+    """Ingests batch files that nodes shipped into a shared directory.
+
+    Fully ingested files are deleted, except each node's newest, which the
+    node's DirTarget reads its watermark from.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def collect_once(self):
+        """Ingest every new batch file. Returns {node: events inserted} for nodes with new files."""
+        try:
+            nodes = sorted(name for name in os.listdir(self.path) if valid_node(name))
+        except OSError:
+            return {}
+        results = {}
+        for node in nodes:
+            if node == NODE_ID:
+                continue
+            files = _batch_files(os.path.join(self.path, node))
+            watermark = get_transcript_offset(SOURCE_PREFIX + node)
+            for first, last, path in files:
+                if last <= watermark:
+                    continue
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    rows = [codec.loads(line) for line in f if line.strip()]
+                inserted, watermark = ingest_shipped(node, rows, last)
+                results[node] = results.get(node, 0) + inserted
+            for first, last, path in files[:-1]:
+                if last <= watermark:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        return results
@@ -0,0 +1,121 @@
+"""Tool-call latency measurement for team-monitor plugin.
+
+PreToolUse writes a tiny start-marker file keyed by the tool-use id;
+PostToolUse pops it to get the call's duration. Durations are folded into
+log-bucketed histograms (see bucket_index) so percentiles can be read
+without keeping raw samples.
+"""
+
+import math
+import os
+import time
+
+from core import codec
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get('TEAM_MONITOR_DATA_DIR') or os.path.join(PLUGIN_ROOT, 'data')
+MARKER_DIR = os.path.join(DATA_DIR, 'tool_starts')
+
+# Markers older than this belong to calls that never completed
+MARKER_MAX_AGE = 24 * 3600
+
+# Histogram layout: bucket i covers [MIN_MS * GROWTH**i, MIN_MS * GROWTH**(i+1)).
+# 8 buckets per doubling keeps the relative error of any percentile under ~4.5%.
+MIN_MS = 0.1
+GROWTH = 2 ** (1 / 8)
+_LOG_GROWTH = math.log(GROWTH)
+
+
+def marker_key(hook_data):
+    """Return a filesystem-safe key shared by a tool call's Pre and Post hooks."""
+    tool_use_id = hook_data.get('tool_use_id')
+    if tool_use_id:
+        return ''.join(c for c in str(tool_use_id) if c.isalnum() or c in '-_')
+    # Older Claude Code versions don't send an id; Pre and Post carry the same input
+    basis = codec.dumps([
+        hook_data.get('session_id', ''),
+        hook_data.get('tool_name', ''),
+        hook_data.get('tool_input', {}),
+    ])
+    import hashlib
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()
+
+
+def record_start(hook_data):
+    """Write a start marker for a tool call about to run."""
+    os.makedirs(MARKER_DIR, exist_ok=True)
+    key = marker_key(hook_data)
+    with open(os.path.join(MARKER_DIR, key), 'w', encoding='utf-8') as f:
+        f.write(str(time.time_ns() // 1000))
+    # Occasionally sweep markers left by calls that never completed
+    if key[-2:] == '00':
+        prune_markers()
+
+
+def pop_duration_ms(hook_data):
+    """Consume a tool call's start marker and return its duration in ms, or None."""
+    path = os.path.join(MARKER_DIR, marker_key(hook_data))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            started_us = int(f.read().strip())
+        os.remove(path)
+    except (OSError, ValueError):
+        return None
+    return max(0.0, (time.time_ns() // 1000 - started_us) / 1000.0)
+
+
+def prune_markers(max_age=MARKER_MAX_AGE):
+    """Delete start markers older than max_age seconds."""
+    cutoff = time.time() - max_age
+    try:
+        names = os.listdir(MARKER_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(MARKER_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def bucket_index(duration_ms):
+    """Return the histogram bucket for a duration."""
+    if duration_ms <= MIN_MS:
+        return 0
+    return int(math.log(duration_ms / MIN_MS) / _LOG_GROWTH)
+
+
+def bucket_bounds(index):
+    """Return the (lower, upper) ms bounds of a bucket."""
+    lower = MIN_MS * GROWTH ** index
+    return lower, lower * GROWTH
+
+
+def percentiles(buckets, quantiles=(0.5, 0.95, 0.99), max_ms=None):
+    """Estimate quantiles from a {bucket index: count} histogram.
+
+    Each estimate is the geometric midpoint of the bucket holding that rank,
+    capped at max_ms when known. Returns a list aligned with quantiles
+    (None for an empty histogram).
+    """
+    total = sum(buckets.values())
+    if not total:
+        return [None for _ in quantiles]
+
+    ordered = sorted(buckets.items())
+    results = []
+    for q in quantiles:
+        rank = q * total
+        seen = 0
+        for index, count in ordered:
+            seen += count
+            if seen >= rank:
+                lower, upper = bucket_bounds(index)
+                value = math.sqrt(lower * upper) if index else upper / 2
+                if max_ms is not None:
+                    value = min(value, max_ms)
+                results.append(round(value, 2))
+                break
+    return results
@@ -0,0 +1,336 @@
+"""Self-instrumentation for team-monitor plugin.
+
+In-process histograms and counters rendered in the Prometheus text format,
+a timing decorator for database calls with a slow-query log, and a cheap
+stage timer for hooks. Hooks run in short-lived processes, so they append
+one line per run to data/metrics/hook_stages.log; the server folds those
+lines into its histograms when /metrics is scraped.
+
+Metrics are per process, so under a multi-worker server each worker
+reports its own. Every worker folds the whole hook log, keeping its own
+position by the file's inode; once the log passes HOOK_LOG_ROTATE_BYTES
+it is renamed to hook_stages.log.1, which workers still behind finish
+reading on their next scrape.
+
+Slow-query thresholds come from TEAM_MONITOR_SLOW_QUERY_MS, either a single
+number ("250") or a default plus per-function overrides
+("250,get_stats=1000,get_events=100").
+"""
+
+import functools
+import os
+import threading
+import time
+
+from core import codec
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get('TEAM_MONITOR_DATA_DIR') or os.path.join(PLUGIN_ROOT, 'data')
+METRICS_DIR = os.path.join(DATA_DIR, 'metrics')
+HOOK_LOG = os.path.join(METRICS_DIR, 'hook_stages.log')
+HOOK_LOG_ROTATED = HOOK_LOG + '.1'
+SLOW_QUERY_LOG = os.path.join(DATA_DIR, 'slow_queries.log')
+
+# Rotate the hook log once a worker has consumed this much of it
+HOOK_LOG_ROTATE_BYTES = 1024 * 1024
+
+# Histogram upper bounds in seconds, from 100us to 10s
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_HELP = {
+    'team_monitor_db_call_seconds': 'Time spent in core.db calls',
+    'team_monitor_hook_stage_seconds': 'Time spent in each hook stage',
+    'team_monitor_http_request_seconds': 'HTTP request handling time',
+    'team_monitor_sse_poll_seconds': 'Time per event bus poll iteration',
+    'team_monitor_event_bus_errors_total': 'Event bus failures by stage (poll, detector, listener)',
+    'team_monitor_alerts_total': 'Alerts raised by the anomaly detector',
+    'team_monitor_sse_messages_total': 'SSE messages sent',
+    'team_monitor_sse_filtered_total': 'Events and alerts withheld from SSE clients by their stream filters',
+    'team_monitor_sse_clients': 'Connected SSE clients',
+    'team_monitor_slow_queries_total': 'DB calls over the slow-query threshold',
+    'team_monitor_read_api_total': 'Read API requests by outcome (not_modified, cache_hit, miss)',
+    'team_monitor_db_calls_in_flight': 'core.db calls currently running in this process',
+    'team_monitor_wal_bytes': 'Size of the SQLite write-ahead log',
+    'team_monitor_checkpoint_seconds': 'WAL checkpoint duration by mode',
+    'team_monitor_checkpoints_total': 'WAL checkpoints by mode and outcome (ok, busy)',
+    'team_monitor_federation_events_total': 'Federated events by direction (shipped, received)',
+    'team_monitor_hot_store_events': 'Events held in the in-memory hot store',
+    'team_monitor_hot_store_bytes': 'Approximate memory held by the hot store',
+    'team_monitor_hot_store_queries_total': 'Feed pages by source (hit = hot store, miss = SQLite)',
+    'team_monitor_backfill_jobs_total': 'Transcript backfill jobs run by outcome (done, retry, failed)',
+}
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+# (inode, offset) of this process's position in the hook log
+_hook_log_position = (None, 0)
+_hook_log_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running sum and count."""
+
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+def observe(name, seconds, **labels):
+    """Record one observation (in seconds) in a labelled histogram."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram()
+        hist.observe(seconds)
+
+
+def inc(name, amount=1, **labels):
+    """Increment a labelled counter."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def gauge_add(name, amount, **labels):
+    """Adjust a labelled gauge by amount (may be negative)."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + amount
+
+
+def gauge_set(name, value, **labels):
+    """Set a labelled gauge."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _gauges[key] = value
+
+
+def gauge_value(name, **labels):
+    """Current value of a labelled gauge (0 if never set)."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        return _gauges.get(key, 0)
+
+
+# ---- Slow-query log ----
+
+def _parse_thresholds(spec):
+    default = 250.0
+    overrides = {}
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if '=' in part:
+                name, value = part.split('=', 1)
+                overrides[name.strip()] = float(value)
+            else:
+                default = float(part)
+        except ValueError:
+            continue
+    return default, overrides
+
+
+_slow_default_ms, _slow_overrides_ms = _parse_thresholds(os.environ.get('TEAM_MONITOR_SLOW_QUERY_MS'))
+
+
+def slow_threshold_ms(fn_name):
+    """Return the slow-query threshold in ms for a function."""
+    return _slow_overrides_ms.get(fn_name, _slow_default_ms)
+
+
+def _log_slow_query(fn_name, elapsed_ms, args, kwargs):
+    inc('team_monitor_slow_queries_total', fn=fn_name)
+    try:
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG), exist_ok=True)
+        detail = codec.dumps({'args': [repr(a)[:200] for a in args],
+                              'kwargs': {k: repr(v)[:200] for k, v in kwargs.items()}})
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime())
+        with open(SLOW_QUERY_LOG, 'a', encoding='utf-8') as f:
+            f.write(f"{stamp}Z {fn_name} {elapsed_ms:.1f}ms {detail}\n")
+    except OSError:
+        pass
+
+
+def timed_db(fn):
+    """Decorator: time a core.db function and log it if it runs slow."""
+    name = fn.__name__
+    threshold = slow_threshold_ms(name)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        gauge_add('team_monitor_db_calls_in_flight', 1)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            gauge_add('team_monitor_db_calls_in_flight', -1)
+            observe('team_monitor_db_call_seconds', elapsed, fn=name)
+            if elapsed * 1000 >= threshold:
+                _log_slow_query(name, elapsed * 1000, args, kwargs)
+
+    return wrapper
+
+
+# ---- Hook stage timing ----
+
+class HookTimer:
+    """Collect per-stage durations for one hook run and append them to the hook log.
+
+    Create it as early as possible in the hook script; the interpreter's own
+    startup is taken from the process CPU time already spent at that point.
+    """
+
+    def __init__(self, hook_name):
+        self.hook_name = hook_name
+        self.stages = {'startup': time.process_time() * 1000}
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        """Add the time since the previous mark to `stage`."""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0) + (now - self._last) * 1000
+        self._last = now
+
+    def flush(self):
+        """Append this run's stage timings (ms) to the hook log. Never raises."""
+        self.stages['total'] = (time.perf_counter() - self._start) * 1000
+        line = codec.dumps({'hook': self.hook_name,
+                            'stages': {k: round(v, 3) for k, v in self.stages.items()}})
+        try:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            with open(HOOK_LOG, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError:
+            pass
+
+
+def collect_hook_timings():
+    """Fold new hook log lines into the hook stage histograms (server side)."""
+    with _hook_log_lock:
+        _collect_hook_timings()
+
+
+def _collect_hook_timings():
+    global _hook_log_position
+    inode, offset = _hook_log_position
+    try:
+        st = os.stat(HOOK_LOG)
+    except OSError:
+        st = None
+    if st is None or st.st_ino != inode:
+        # Rotated since the last scrape: finish the old file if it's still the renamed one
+        if inode is not None:
+            try:
+                if os.stat(HOOK_LOG_ROTATED).st_ino == inode:
+                    _fold_hook_log(HOOK_LOG_ROTATED, offset)
+            except OSError:
+                pass
+        if st is None:
+            _hook_log_position = (None, 0)
+            return
+        inode, offset = st.st_ino, 0
+    elif st.st_size < offset:
+        offset = 0
+    if st.st_size > offset:
+        offset = _fold_hook_log(HOOK_LOG, offset)
+    _hook_log_position = (inode, offset)
+
+    if offset >= HOOK_LOG_ROTATE_BYTES:
+        try:
+            # Rename rather than delete, so workers that haven't read it all yet still can
+            if os.stat(HOOK_LOG).st_ino == inode:
+                os.replace(HOOK_LOG, HOOK_LOG_ROTATED)
+        except OSError:
+            pass
+
+
+def _fold_hook_log(path, offset):
+    """Fold complete lines after offset into the stage histograms. Returns the new offset."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except OSError:
+        return offset
+    end = data.rfind(b'\n') + 1
+    for line in data[:end].splitlines():
+        try:
+            record = codec.loads(line)
+        except codec.JSONDecodeError:
+            continue
+        hook = record.get('hook', 'unknown')
+        for stage, ms in (record.get('stages') or {}).items():
+            observe('team_monitor_hook_stage_seconds', ms / 1000.0, hook=hook, stage=stage)
+    return offset + end
+
+
+# ---- Exposition ----
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    parts = []
+    for key, value in items:
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def render_prometheus():
+    """Render every metric in the Prometheus text exposition format."""
+    with _lock:
+        histograms = sorted((k, (list(h.counts), h.total, h.count, h.bounds)) for k, h in _histograms.items())
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+
+    lines = []
+    seen = set()
+
+    def header(name, kind):
+        if name not in seen:
+            seen.add(name)
+            if name in _HELP:
+                lines.append(f'# HELP {name} {_HELP[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+
+    for (name, labels), (counts, total, count, bounds) in histograms:
+        header(name, 'histogram')
+        cumulative = 0
+        for bound, n in zip(bounds, counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{_format_labels(labels, ("le", repr(bound)))} {cumulative}')
+        lines.append(f'{name}_bucket{_format_labels(labels, ("le", "+Inf"))} {count}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {total:.6f}')
+        lines.append(f'{name}_count{_format_labels(labels)} {count}')
+
+    for (name, labels), value in counters:
+        header(name, 'counter')
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+
+    for (name, labels), value in gauges:
+        header(name, 'gauge')
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+
+    return '\n'.join(lines) + '\n'
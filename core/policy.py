@@ -0,0 +1,198 @@
+"""Ingest policy for team-monitor plugin.
+
+Decides how much of each event is stored. Loaded once per process from
+the JSON file named by TEAM_MONITOR_POLICY (default data/ingest_policy.json);
+every key is optional:
+
+    {
+      "default_level": "full",
+      "categories": {"communication": "full"},
+      "tools": {"Read": {"level": "inputs"}, "Grep": {"level": "inputs", "sample": 0.25}},
+      "max_result_bytes": 51200,
+      "session_budget_bytes": 52428800
+    }
+
+Without a file, every event is stored in full (tool results truncated to
+50 KB) and sessions have no budget.
+
+Capture levels, from most to least detail:
+- full: the hook payload, with tool results truncated to max_result_bytes
+- inputs: the payload without tool results
+- summary: only the classification (tool, hook event, session); no inputs
+
+Sampling keeps a deterministic fraction of a tool's calls (the same call
+is always kept or always dropped, so live and transcript copies agree).
+Once a session has stored session_budget_bytes of payload, its tool calls
+drop to inputs, and to summary past twice the budget. Only tool_use events
+are ever sampled or degraded. Communication, task and lifecycle events are
+kept in full unless "categories" names a lower level for them; the comm
+graph and task board are derived before that, but a rebuild from stored
+payloads (a migration, or an aggregator replaying shipped events) only has
+what was kept.
+"""
+
+import os
+
+from core import codec
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get('TEAM_MONITOR_DATA_DIR') or os.path.join(PLUGIN_ROOT, 'data')
+DEFAULT_POLICY_PATH = os.path.join(DATA_DIR, 'ingest_policy.json')
+
+LEVELS = ('summary', 'inputs', 'full')
+
+# Without a policy file everything is stored in full, as before policies existed
+DEFAULT_CONFIG = {
+    'default_level': 'full',
+    'categories': {},
+    'tools': {},
+    'max_result_bytes': 50 * 1024,
+    'session_budget_bytes': 0,
+}
+
+_RESULT_KEYS = ('tool_result', 'tool_response')
+_SUMMARY_KEYS = ('tool_name', 'hook_event_name', 'session_id', 'tool_use_id', '_source')
+
+
+class IngestPolicy:
+    """Capture level, sampling and budget decisions for events.
+
+    Invalid values are reported with a warning and replaced by the default,
+    so a bad policy file never stops events from being stored.
+    """
+
+    def __init__(self, config=None):
+        config = dict(DEFAULT_CONFIG, **(config or {}))
+        self.default_level = _level(config.get('default_level'), 'full', 'default_level')
+        self.categories = {k: _level(v, self.default_level, f'categories.{k}')
+                           for k, v in _mapping(config, 'categories').items()}
+        self.tools = {}
+        self.sample_rates = {}
+        for tool, rule in _mapping(config, 'tools').items():
+            if isinstance(rule, str):
+                rule = {'level': rule}
+            if not isinstance(rule, dict):
+                _warn(f'tools.{tool}: expected a level or an object, got {rule!r}; rule ignored')
+                continue
+            if 'level' in rule:
+                self.tools[tool] = _level(rule['level'], self.default_level, f'tools.{tool}.level')
+            if 'sample' in rule:
+                sample = _number(rule['sample'], float, None, f'tools.{tool}.sample')
+                if sample is not None:
+                    self.sample_rates[tool] = min(1.0, max(0.0, sample))
+        self.max_result_bytes = _number(config.get('max_result_bytes') or DEFAULT_CONFIG['max_result_bytes'],
+                                        int, DEFAULT_CONFIG['max_result_bytes'], 'max_result_bytes')
+        self.session_budget_bytes = _number(config.get('session_budget_bytes') or 0,
+                                            int, DEFAULT_CONFIG['session_budget_bytes'], 'session_budget_bytes')
+
+    def level_for(self, tool_name, category):
+        """Configured capture level for an event.
+
+        Tool calls use their tool's rule, then the tool_use category, then
+        default_level; other events use their category's level, else full.
+        """
+        if category != 'tool_use':
+            return self.categories.get(category, 'full')
+        if tool_name in self.tools:
+            return self.tools[tool_name]
+        return self.categories.get(category, self.default_level)
+
+    def shape_payload(self, payload, level):
+        """Return a copy of a hook payload reduced to a capture level."""
+        if level == 'summary':
+            return {k: payload[k] for k in _SUMMARY_KEYS if k in payload}
+        shaped = dict(payload)
+        for key in _RESULT_KEYS:
+            if key not in shaped:
+                continue
+            if level == 'inputs':
+                del shaped[key]
+                continue
+            result_str = shaped[key] if isinstance(shaped[key], str) else codec.dumps(shaped[key])
+            if len(result_str) > self.max_result_bytes:
+                shaped[key] = result_str[:self.max_result_bytes] + '...[truncated]'
+        return shaped
+
+    def keep(self, event):
+        """Deterministic sampling decision for an event."""
+        if event.get('event_category') != 'tool_use':
+            return True
+        rate = self.sample_rates.get(event.get('tool_name'), 1.0)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        basis = event.get('event_key') or f"{event.get('session_id')}|{event.get('timestamp')}|{event.get('summary')}"
+        import hashlib
+        point = int(hashlib.sha1(basis.encode('utf-8')).hexdigest()[:8], 16) / 0x100000000
+        return point < rate
+
+    def budget_level(self, event, session_bytes):
+        """Highest capture level a session's tool calls may still use, or None if unlimited."""
+        if not self.session_budget_bytes or event.get('event_category') != 'tool_use':
+            return None
+        if session_bytes >= 2 * self.session_budget_bytes:
+            return 'summary'
+        if session_bytes >= self.session_budget_bytes:
+            return 'inputs'
+        return None
+
+
+def lower_level(a, b):
+    """The less detailed of two capture levels (None means no limit)."""
+    if b is None:
+        return a
+    return a if LEVELS.index(a) <= LEVELS.index(b) else b
+
+
+def _warn(message):
+    # Imported here: hooks load the policy on every call and it is rarely invalid
+    import logging
+    logging.getLogger(__name__).warning('ingest policy: %s', message)
+
+
+def _level(value, fallback, field):
+    if value in LEVELS:
+        return value
+    if value is not None:
+        _warn(f'{field}: unknown level {value!r}; using {fallback!r}')
+    return fallback
+
+
+def _number(value, kind, fallback, field):
+    try:
+        number = kind(value)
+    except (TypeError, ValueError, OverflowError):
+        number = None
+    if number is None or number < 0 or isinstance(value, bool):
+        _warn(f'{field}: expected a non-negative number, got {value!r}; using {fallback!r}')
+        return fallback
+    return number
+
+
+def _mapping(config, field):
+    value = config.get(field) or {}
+    if isinstance(value, dict):
+        return value
+    _warn(f'{field}: expected an object, got {type(value).__name__}; using the default')
+    return DEFAULT_CONFIG[field]
+
+
+def load_policy(path=None):
+    """Load the ingest policy from a JSON file, falling back to the defaults."""
+    path = path or os.environ.get('TEAM_MONITOR_POLICY') or DEFAULT_POLICY_PATH
+    try:
+        with open(path, 'rb') as f:
+            config = codec.loads(f.read())
+    except OSError:
+        config = None
+    except ValueError as exc:
+        _warn(f'{path}: {exc}; using the defaults')
+        config = None
+    if config is not None and not isinstance(config, dict):
+        _warn(f'{path}: expected an object, got {type(config).__name__}; using the defaults')
+        config = None
+    return IngestPolicy(config)
+
+
+POLICY = load_policy()
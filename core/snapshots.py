@@ -0,0 +1,92 @@
+"""Point-in-time dashboard state for team-monitor plugin.
+
+DashboardState is the aggregate the dashboard shows (agent cards, event
+counts, the task board), built by folding in events and task transitions
+in timestamp order. It round-trips through a compact dict, so db.py can
+persist snapshots of it at fixed time boundaries and rebuild the state at
+any time T from the nearest snapshot before T plus the events after it.
+
+Task fields are last-writer-wins by timestamp, so transitions folded in
+slightly out of order still land on the right value.
+"""
+
+
+class DashboardState:
+    """Agents, event counts and tasks as of some point in time."""
+
+    def __init__(self, data=None):
+        data = data or {}
+        # "team\x1fagent_name" -> [team_name, first_seen, last_seen, event_count]
+        self.agents = data.get('agents', {})
+        self.by_category = data.get('by_category', {})
+        self.total = data.get('total', 0)
+        # "team\x1ftask_id" -> {'created_at', 'updated_at', 'fields': {field: [value, ts_us]}}
+        self.tasks = data.get('tasks', {})
+
+    def to_dict(self):
+        return {'agents': self.agents, 'by_category': self.by_category, 'total': self.total, 'tasks': self.tasks}
+
+    def apply_event(self, agent_name, team_name, category, timestamp):
+        self.total += 1
+        category = category or 'unknown'
+        self.by_category[category] = self.by_category.get(category, 0) + 1
+        if not agent_name:
+            return
+        key = f'{team_name}\x1f{agent_name}'
+        entry = self.agents.get(key)
+        if entry is None:
+            self.agents[key] = [team_name, timestamp, timestamp, 1]
+            return
+        if timestamp and (entry[1] is None or timestamp < entry[1]):
+            entry[1] = timestamp
+        if timestamp and (entry[2] is None or timestamp > entry[2]):
+            entry[2] = timestamp
+        entry[3] += 1
+
+    def apply_transition(self, team_name, task_id, field, value, timestamp, ts_us):
+        task = self.tasks.setdefault(f'{team_name}\x1f{task_id}',
+                                     {'created_at': None, 'updated_at': None, 'fields': {}})
+        current = task['fields'].get(field)
+        if current is None or (ts_us or 0) >= (current[1] or 0):
+            task['fields'][field] = [value, ts_us]
+        if timestamp and (task['created_at'] is None or timestamp < task['created_at']):
+            task['created_at'] = timestamp
+        if timestamp and (task['updated_at'] is None or timestamp > task['updated_at']):
+            task['updated_at'] = timestamp
+
+    def render(self, events_last_minute=0):
+        """The state in the shapes of /api/agents, /api/stats and /api/tasks."""
+        agents = sorted(
+            ({'agent_name': key.split('\x1f', 1)[1], 'team_name': team, 'first_seen': first, 'last_seen': last,
+              'event_count': count}
+             for key, (team, first, last, count) in self.agents.items()),
+            key=lambda a: a['last_seen'] or '', reverse=True,
+        )
+        most_active = max(agents, key=lambda a: a['event_count'], default=None)
+
+        tasks = []
+        for key, task in self.tasks.items():
+            team_name, task_id = key.split('\x1f', 1)
+            fields = task['fields']
+            tasks.append({
+                'team_name': team_name,
+                'task_id': task_id,
+                'subject': fields.get('subject', [None])[0],
+                'status': fields.get('status', [None])[0],
+                'owner': fields.get('owner', [None])[0],
+                'created_at': task['created_at'],
+                'updated_at': task['updated_at'],
+            })
+        tasks.sort(key=lambda t: t['updated_at'] or '', reverse=True)
+
+        return {
+            'agents': agents,
+            'stats': {
+                'total_events': self.total,
+                'by_category': dict(self.by_category),
+                'most_active_agent': ({'agent_name': most_active['agent_name'],
+                                       'event_count': most_active['event_count']} if most_active else None),
+                'events_last_minute': events_last_minute,
+            },
+            'tasks': tasks,
+        }
@@ -5,11 +5,12 @@ The Flask server reads and deletes them to stream as SSE to browsers.
 """
 
 import os
-import json
-import glob
+
+from core import codec
 
 PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-SSE_DIR = os.path.join(PLUGIN_ROOT, 'data', 'sse_events')
+DATA_DIR = os.environ.get('TEAM_MONITOR_DATA_DIR') or os.path.join(PLUGIN_ROOT, 'data')
+SSE_DIR = os.path.join(DATA_DIR, 'sse_events')
 
 
 def ensure_sse_dir():
@@ -41,10 +42,11 @@ def notify_sse(event_dict):
         'agent_name': event_dict.get('agent_name', ''),
         'timestamp': ts,
         'tool_name': event_dict.get('tool_name', ''),
+        'duration_ms': event_dict.get('duration_ms'),
     }
 
     with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(notification, f)
+        f.write(codec.dumps(notification))
 
 
 def get_pending_events():
@@ -53,6 +55,7 @@ def get_pending_events():
     Returns:
         list of dicts sorted by filename (chronological order)
     """
+    import glob
     ensure_sse_dir()
     pattern = os.path.join(SSE_DIR, '*.json')
     files = sorted(glob.glob(pattern))
@@ -60,11 +63,11 @@ def get_pending_events():
 
     for filepath in files:
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(filepath, 'rb') as f:
+                data = codec.loads(f.read())
             events.append(data)
             os.remove(filepath)
-        except (json.JSONDecodeError, OSError):
+        except (codec.JSONDecodeError, OSError):
             # If file is corrupt or locked, try to remove and skip
             try:
                 os.remove(filepath)
@@ -0,0 +1,64 @@
+"""Timestamp helpers for team-monitor plugin.
+
+All stored timestamps use the same UTC ISO-8601 format with millisecond
+precision, e.g. ``2025-01-31T14:32:05.123Z``.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+
+
+def format_timestamp(dt):
+    """Format an aware datetime as a stored timestamp string."""
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def now_timestamp():
+    """Return the current UTC time as a stored timestamp string."""
+    return format_timestamp(datetime.now(timezone.utc))
+
+
+def parse_timestamp(value):
+    """Parse an ISO-8601 string or epoch seconds into an aware datetime.
+
+    Returns None if the value can't be interpreted.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value, timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    if not isinstance(value, str):
+        return None
+
+    text = value.strip()
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def normalize_timestamp(value):
+    """Convert any parseable timestamp into the stored format, or None."""
+    dt = parse_timestamp(value)
+    return format_timestamp(dt) if dt else None
+
+
+def to_epoch_us(value):
+    """Convert a timestamp to integer microseconds since the Unix epoch, or None."""
+    dt = parse_timestamp(value)
+    return (dt - EPOCH) // _ONE_US if dt else None
+
+
+def now_epoch_us():
+    """Return the current time as integer microseconds since the Unix epoch."""
+    return (datetime.now(timezone.utc) - EPOCH) // _ONE_US
@@ -1,8 +1,13 @@
 """Parse subagent transcript JSONL files to extract tool call events."""
 
-import json
 import os
 
+from core import codec
+from core.event_parser import event_key
+from core.policy import POLICY
+from core.usage import extract_usage, merge_usage
+from core.timeutil import normalize_timestamp
+
 MAX_TOOL_RESULT_SIZE = 50 * 1024
 
 
@@ -18,61 +23,154 @@ def parse_transcript(transcript_path, agent_name=None, session_id=None, team_nam
     Returns:
         list of event dicts ready for insert_event()
     """
-    if not transcript_path or not os.path.exists(transcript_path):
-        return []
+    result = parse_transcript_from(transcript_path, 0, agent_name, session_id, team_name)
+    return result['events']
 
-    events = []
-    for line in _read_jsonl(transcript_path):
-        extracted = _extract_tool_events(line, agent_name, session_id, team_name)
+
+def parse_transcript_from(transcript_path, offset=0, agent_name=None, session_id=None, team_name=None,
+                          max_bytes=None):
+    """Parse a JSONL transcript starting at a byte offset.
+
+    Only complete (newline-terminated) lines are consumed, so a transcript
+    that is still being written can be resumed later from the returned offset.
+    With max_bytes, stops at the first line end past that many bytes where no
+    tool call is waiting for its result (or at twice that many regardless),
+    so a large transcript can be read in chunks.
+
+    Returns:
+        dict with keys:
+            events: list of event dicts ready for insert_event()
+            usage: token usage records, one per assistant message id
+            offset: byte offset just past the last complete line consumed
+            bytes_read: number of bytes consumed by this call
+    """
+    result = {'events': [], 'usage': [], 'offset': offset, 'bytes_read': 0}
+    if not transcript_path or not os.path.exists(transcript_path):
+        return result
+
+    events = result['events']
+    usage = {}
+    pending = {}
+    end = offset
+    for entry, end in _read_jsonl(transcript_path, offset):
+        extracted = _extract_tool_events(entry, agent_name, session_id, team_name, pending)
         events.extend(extracted)
+        record = extract_usage(entry, agent_name, session_id, team_name)
+        if record:
+            if not agent_name:
+                record['agent_name'] = _session_agent(entry, session_id)
+            merge_usage(usage, record)
+        if max_bytes and end - offset >= max_bytes and (not pending or end - offset >= 2 * max_bytes):
+            break
+
+    result['usage'] = list(usage.values())
+    result['offset'] = end
+    result['bytes_read'] = end - offset
+    return result
 
-    return events
 
+def _session_agent(entry, session_id):
+    """Fallback attribution for usage when no agent name was given, as for tool events."""
+    from core.event_parser import _extract_agent_name
+    return _extract_agent_name({}, {}, session_id or entry.get('sessionId') or '')
 
-def _read_jsonl(path):
-    """Read a JSONL file, yielding parsed dicts. Skip malformed lines."""
+
+def _read_jsonl(path, offset=0):
+    """Read a JSONL file from a byte offset, yielding (parsed dict, end offset).
+
+    Skips malformed lines. Stops at a trailing partial line.
+    """
     try:
-        with open(path, 'r', encoding='utf-8') as f:
+        with open(path, 'rb') as f:
+            if offset:
+                f.seek(offset)
+            pos = offset
             for line in f:
+                if not line.endswith(b'\n'):
+                    return
+                pos += len(line)
                 line = line.strip()
                 if not line:
                     continue
                 try:
-                    yield json.loads(line)
-                except json.JSONDecodeError:
+                    entry = codec.loads(line)
+                except (codec.JSONDecodeError, UnicodeDecodeError):
                     continue
+                if isinstance(entry, dict):
+                    yield entry, pos
     except (OSError, IOError):
         return
 
 
-def _extract_tool_events(entry, agent_name, session_id, team_name):
+def _extract_tool_events(entry, agent_name, session_id, team_name, pending=None):
     """Extract tool use events from a single transcript entry.
 
     Transcript entries can be in various formats depending on the Claude Code version.
+    Older versions store the message fields at the top level; newer ones wrap them
+    in a ``message`` object alongside ``timestamp`` and ``sessionId``.
     We look for tool_use blocks in assistant messages and their corresponding tool_result blocks.
+
+    If a `pending` dict is passed, tool_use events are registered in it by
+    id so that a later entry's tool_result can complete them (error flag,
+    facts only found in results such as a created task's id).
     """
     events = []
 
+    message = entry.get('message')
+    if not isinstance(message, dict):
+        message = entry
+
     # Handle assistant messages with tool_use content blocks
-    if entry.get('role') == 'assistant':
-        content = entry.get('content', [])
+    if message.get('role') == 'assistant':
+        content = message.get('content', [])
         if isinstance(content, list):
+            timestamp = normalize_timestamp(entry.get('timestamp'))
+            session_id = session_id or entry.get('sessionId') or ''
             for block in content:
                 if isinstance(block, dict) and block.get('type') == 'tool_use':
                     event = _tool_use_to_event(block, agent_name, session_id, team_name)
                     if event:
+                        if timestamp:
+                            event['timestamp'] = timestamp
+                        tool_input = block.get('input', {}) or {}
+                        # The block id is the tool_use_id live hooks see, so both copies share a key
+                        event['event_key'] = event_key(block.get('id'), event['agent_name'], event['tool_name'],
+                                                       tool_input, event.get('timestamp'))
+                        if pending is not None and block.get('id'):
+                            pending[block['id']] = (event, tool_input)
                         events.append(event)
 
-    # Handle tool_result messages (contains the result of a tool call)
-    # We skip these since we capture enough from tool_use blocks
-    # and including results would double the events
+    # tool_result blocks don't become events of their own (that would double
+    # the events); they complete the tool_use event they answer
+    elif message.get('role') == 'user' and pending:
+        content = message.get('content', [])
+        if isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict) and block.get('type') == 'tool_result':
+                    _pair_tool_result(block, pending)
 
     return events
 
 
+def _pair_tool_result(block, pending):
+    """Fold a tool_result block into the tool_use event it answers."""
+    from core.event_parser import add_derived_fields
+
+    paired = pending.pop(block.get('tool_use_id'), None)
+    if paired is None:
+        return
+    event, tool_input = paired
+    content = block.get('content', '')
+    if isinstance(content, list):
+        content = ' '.join(str(part.get('text', '')) for part in content if isinstance(part, dict))
+    add_derived_fields(event, event['tool_name'], tool_input, content)
+    if block.get('is_error'):
+        event['is_error'] = 1
+
+
 def _tool_use_to_event(block, agent_name, session_id, team_name):
     """Convert a tool_use content block into an event dict."""
-    from core.event_parser import _classify, _extract_team_name
+    from core.event_parser import _classify, _extract_agent_name, _extract_team_name, add_derived_fields
 
     tool_name = block.get('name', '')
     tool_input = block.get('input', {}) or {}
@@ -85,7 +183,7 @@ def _tool_use_to_event(block, agent_name, session_id, team_name):
 
     # Try to extract better agent/team info from the tool_input
     if not agent_name:
-        agent_name = tool_input.get('name', '') or 'unknown'
+        agent_name = _extract_agent_name({}, tool_input, session_id)
     if not team_name or team_name == 'unknown':
         team_name = _extract_team_name({'tool_input': tool_input}, tool_input)
 
@@ -96,8 +194,10 @@ def _tool_use_to_event(block, agent_name, session_id, team_name):
         'hook_event_name': 'PostToolUse',
         '_source': 'transcript',
     }
+    capture_level = POLICY.level_for(tool_name, event_category)
+    payload = POLICY.shape_payload(payload, capture_level)
 
-    return {
+    event = {
         'session_id': session_id or '',
         'team_name': team_name or 'unknown',
         'agent_name': agent_name or 'unknown',
@@ -105,5 +205,8 @@ def _tool_use_to_event(block, agent_name, session_id, team_name):
         'tool_name': tool_name,
         'event_category': event_category,
         'summary': summary,
-        'payload_json': json.dumps(payload, default=str)[:MAX_TOOL_RESULT_SIZE],
+        'payload_json': codec.dumps(payload)[:MAX_TOOL_RESULT_SIZE],
+        'capture_level': capture_level,
     }
+    add_derived_fields(event, tool_name, tool_input)
+    return event
@@ -0,0 +1,98 @@
+"""Token usage extraction and cost estimation for team-monitor plugin.
+
+Assistant messages in transcripts carry a ``usage`` block. Claude Code
+writes one JSONL line per content block, repeating the same message id
+and usage, so records are keyed by message id and merged rather than
+summed.
+
+Costs are estimates from list prices per million tokens, matched on the
+model name. Override or extend them with TEAM_MONITOR_PRICES, a JSON
+object mapping a model-name substring to [input, output, cache_write,
+cache_read] USD per million tokens.
+"""
+
+import os
+
+from core import codec
+from core.timeutil import normalize_timestamp
+
+TOKEN_FIELDS = ('input_tokens', 'output_tokens', 'cache_creation_tokens', 'cache_read_tokens')
+
+# (model-name substring, [input, output, cache_write, cache_read] USD per MTok); first match wins
+DEFAULT_PRICES = [
+    ('opus-4-5', [5.0, 25.0, 6.25, 0.50]),
+    ('opus', [15.0, 75.0, 18.75, 1.50]),
+    ('sonnet', [3.0, 15.0, 3.75, 0.30]),
+    ('haiku-4', [1.0, 5.0, 1.25, 0.10]),
+    ('haiku', [0.80, 4.0, 1.0, 0.08]),
+]
+
+
+def _load_prices():
+    prices = list(DEFAULT_PRICES)
+    try:
+        overrides = codec.loads(os.environ.get('TEAM_MONITOR_PRICES', '') or '{}')
+    except codec.JSONDecodeError:
+        overrides = {}
+    if isinstance(overrides, dict):
+        custom = [(str(k), [float(x) for x in v]) for k, v in overrides.items()
+                  if isinstance(v, list) and len(v) == 4]
+        prices = custom + prices
+    return prices
+
+
+PRICES = _load_prices()
+
+
+def extract_usage(entry, agent_name, session_id, team_name):
+    """Return a usage record for an assistant transcript entry, or None."""
+    message = entry.get('message')
+    if not isinstance(message, dict) or message.get('role') != 'assistant':
+        return None
+    usage = message.get('usage')
+    if not isinstance(usage, dict):
+        return None
+    message_id = message.get('id') or entry.get('requestId') or entry.get('uuid')
+    if not message_id:
+        return None
+
+    return {
+        'message_id': str(message_id),
+        'agent_name': agent_name or 'unknown',
+        'session_id': session_id or entry.get('sessionId') or '',
+        'team_name': team_name or 'unknown',
+        'model': message.get('model') or 'unknown',
+        'timestamp': normalize_timestamp(entry.get('timestamp')),
+        'input_tokens': _count(usage.get('input_tokens')),
+        'output_tokens': _count(usage.get('output_tokens')),
+        'cache_creation_tokens': _count(usage.get('cache_creation_input_tokens')),
+        'cache_read_tokens': _count(usage.get('cache_read_input_tokens')),
+    }
+
+
+def merge_usage(records, record):
+    """Fold a record into a {message_id: record} dict, keeping the largest count per field."""
+    existing = records.get(record['message_id'])
+    if existing is None:
+        records[record['message_id']] = record
+        return
+    for field in TOKEN_FIELDS:
+        existing[field] = max(existing[field], record[field])
+    existing['timestamp'] = existing['timestamp'] or record['timestamp']
+
+
+def estimate_cost(model, input_tokens=0, output_tokens=0, cache_creation_tokens=0, cache_read_tokens=0):
+    """Estimated USD cost of some token counts for a model, or None if the model is unknown."""
+    name = (model or '').lower()
+    for pattern, rates in PRICES:
+        if pattern in name:
+            return (input_tokens * rates[0] + output_tokens * rates[1]
+                    + cache_creation_tokens * rates[2] + cache_read_tokens * rates[3]) / 1e6
+    return None
+
+
+def _count(value):
+    try:
+        return max(0, int(value or 0))
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,153 @@
+"""Single entry point for every team-monitor hook.
+
+    python3 hooks/dispatch.py <HookEventName> < hook JSON
+
+Routes by the payload's hook_event_name (falling back to the event named
+on the command line) and imports only what that event needs: PreToolUse
+never loads the database, only SubagentStop loads the backfill queue, and
+an empty payload, one that isn't a JSON object, or an unrecognized event
+returns before anything but the JSON codec and stage timer is imported. Claude Code starts a fresh interpreter for every hook,
+so import time is paid on every tool call; scripts/bench_hooks.py
+measures it against a budget.
+
+Always prints {} to stdout and exits 0.
+"""
+
+import os
+import sys
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Hook event -> hook name in the stage metrics and the error log
+HOOK_NAMES = {
+    'PreToolUse': 'pretooluse',
+    'PostToolUse': 'posttooluse',
+    'PostToolUseFailure': 'posttooluse',
+    'SubagentStart': 'subagentstart',
+    'Stop': 'stop',
+    'SubagentStop': 'stop',
+    'Notification': 'notification',
+}
+
+
+def pre_tool_use(hook_data, timer):
+    """Record a start marker so PostToolUse can time the call. No database."""
+    from core.latency import record_start
+    timer.mark('import')
+    record_start(hook_data)
+    timer.mark('record_start')
+
+
+def post_tool_use(hook_data, timer):
+    """Store the tool call with its duration, paired from the PreToolUse marker."""
+    from core.latency import pop_duration_ms
+    store_event(hook_data, timer, duration_lookup=pop_duration_ms)
+
+
+def subagent_stop(hook_data, timer):
+    """Store the stop and queue the subagent's transcript for backfill (see core/backfill.py)."""
+    event_dict = store_event(hook_data, timer)
+    from core.backfill import job_from_hook, server_running, spawn_runner
+    from core.db import enqueue_backfill
+    job = job_from_hook(hook_data)
+    if job:
+        # Lines without their own timestamp fall back to the stop time
+        enqueue_backfill(fallback_ts=event_dict['timestamp'], **job)
+        if not server_running():
+            spawn_runner()
+        timer.mark('enqueue_backfill')
+
+
+def store_event(hook_data, timer, duration_lookup=None):
+    """Classify the event, store it and notify the SSE bridge. Returns the event dict.
+
+    duration_lookup, if given, is called with the hook payload and returns
+    the tool call's duration in ms (or None).
+    """
+    from core.db import init_db, insert_event
+    from core.event_parser import parse_event
+    from core.sse_bridge import notify_sse
+    timer.mark('import')
+
+    event_dict = parse_event(hook_data)
+    if duration_lookup is not None:
+        event_dict['duration_ms'] = duration_lookup(hook_data)
+    timer.mark('parse_event')
+
+    init_db()
+    timer.mark('init_db')
+    event_dict['id'] = insert_event(event_dict)
+    timer.mark('insert_event')
+
+    notify_sse(event_dict)
+    timer.mark('notify_sse')
+    return event_dict
+
+
+HANDLERS = {
+    'PreToolUse': pre_tool_use,
+    'PostToolUse': post_tool_use,
+    'PostToolUseFailure': post_tool_use,
+    'SubagentStart': store_event,
+    'Stop': store_event,
+    'SubagentStop': subagent_stop,
+    'Notification': store_event,
+}
+
+
+def main(default_event=None):
+    """Handle one hook invocation, print {} and exit 0, whatever happens."""
+    hook_name = HOOK_NAMES.get(default_event, 'dispatch')
+    try:
+        os.environ['CLAUDE_PLUGIN_ROOT'] = PLUGIN_ROOT
+        sys.path.insert(0, PLUGIN_ROOT)
+
+        # One small payload doesn't repay importing a fast JSON backend
+        forced_backend = 'TEAM_MONITOR_JSON_BACKEND' in os.environ
+        os.environ.setdefault('TEAM_MONITOR_JSON_BACKEND', 'stdlib')
+        from core.metrics import HookTimer
+        timer = HookTimer(hook_name)
+        from core import codec
+        if not forced_backend:
+            # Don't pass the choice on to processes started from here
+            del os.environ['TEAM_MONITOR_JSON_BACKEND']
+        timer.mark('import')
+
+        raw = sys.stdin.buffer.read()
+        hook_data = codec.loads(raw) if raw.strip() else None
+        event = None
+        # Nothing to record without a payload object, whatever the command line names
+        if isinstance(hook_data, dict) and hook_data:
+            event = hook_data.get('hook_event_name') or default_event
+        handler = HANDLERS.get(event)
+        if handler is not None:
+            hook_data['hook_event_name'] = event
+            hook_name = timer.hook_name = HOOK_NAMES[event]
+            handler(hook_data, timer)
+            timer.flush()
+
+    except Exception:
+        # Log errors to file for debugging — never block Claude
+        try:
+            import traceback
+            log_path = os.path.join(
+                os.environ.get('TEAM_MONITOR_DATA_DIR') or os.path.join(PLUGIN_ROOT, 'data'),
+                'hook_errors.log'
+            )
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(f"=== {hook_name}_hook ===\n")
+                f.write(f"PLUGIN_ROOT={PLUGIN_ROOT}\n")
+                f.write(f"__file__={os.path.abspath(__file__)}\n")
+                traceback.print_exc(file=f)
+                f.write("\n")
+        except Exception:
+            pass
+
+    # Always output valid JSON and exit cleanly
+    print("{}")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,15 @@
+"""PreToolUse hook for team-monitor plugin.
+
+Kept for hook registrations made before hooks/dispatch.py, which now
+handles every event; re-run scripts/install_hooks.py to switch over.
+Always prints {} to stdout and exits 0.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dispatch import main  # noqa: E402
+
+main('PreToolUse')
@@ -0,0 +1,79 @@
+"""Run or inspect the transcript backfill queue.
+
+    python3 scripts/backfill.py run       # run queued jobs until the queue is empty
+    python3 scripts/backfill.py status    # job counts and recent jobs
+    python3 scripts/backfill.py retry     # queue failed jobs again
+
+The SubagentStop hook queues a job for each finished subagent's transcript.
+A running dashboard server works through the queue in the background (see
+server/backfill.py); when none is running the hook starts `run` detached.
+Set TEAM_MONITOR_BACKFILL_WORKERS to change how many jobs run at once.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PLUGIN_ROOT)
+
+from core import codec  # noqa: E402
+from core.backfill import MAX_RUNNING, claim, run_and_finish, worker_id  # noqa: E402
+from core.db import get_backfill_jobs, init_db, retry_failed_backfills  # noqa: E402
+
+POLL_INTERVAL = 1
+
+
+def run(args):
+    worker = worker_id()
+    with ThreadPoolExecutor(max_workers=MAX_RUNNING) as pool:
+        futures = []
+        while True:
+            futures = [f for f in futures if not f.done()]
+            jobs = claim(worker)
+            for job in jobs:
+                futures.append(pool.submit(run_and_finish, job))
+                if args.verbose:
+                    print(f'job {job["id"]}: {job["transcript_path"]} (attempt {job["attempts"]})')
+            # Done once nothing is left to wait for, retries included
+            if not jobs and not futures and not get_backfill_jobs(status='pending', limit=1)['jobs']:
+                return
+            time.sleep(POLL_INTERVAL)
+
+
+def status(args):
+    print(codec.dumps(get_backfill_jobs(status=args.status, limit=args.limit)))
+
+
+def retry(args):
+    print(f'Queued {retry_failed_backfills()} failed job(s) again')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Team Monitor transcript backfill')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('run', help='Run queued jobs until the queue is empty')
+    p.add_argument('-v', '--verbose', action='store_true', help='Print each job as it starts')
+    p.set_defaults(func=run)
+
+    p = sub.add_parser('status', help='Show job counts and recent jobs')
+    p.add_argument('--status', choices=('pending', 'running', 'done', 'failed'), help='Only jobs in this state')
+    p.add_argument('--limit', type=int, default=20, help='Jobs to list')
+    p.set_defaults(func=status)
+
+    p = sub.add_parser('retry', help='Queue failed jobs again')
+    p.set_defaults(func=retry)
+
+    args = parser.parse_args()
+    init_db()
+    try:
+        args.func(args)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Micro-benchmark the JSON codec on each hot path.
+
+Compares every importable backend against the stdlib on representative
+inputs for the paths that go through core.codec, and checks that each
+backend produces the same output as the stdlib encoder.
+
+    python3 scripts/bench_codec.py [--seconds 0.5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PLUGIN_ROOT)
+
+from core import codec  # noqa: E402
+
+
+def _sample_hook_payload():
+    return {
+        'session_id': 'a1b2c3d4-e5f6-7890-abcd-ef1234567890',
+        'hook_event_name': 'PostToolUse',
+        'tool_name': 'Read',
+        'tool_input': {'file_path': '/home/dev/project/src/module.py'},
+        'tool_result': ''.join(f'{i:5d}\tline {i} of some source file — ünïcode\n' for i in range(400)),
+        'cwd': '/home/dev/project',
+    }
+
+
+def _sample_transcript_line():
+    return {
+        'type': 'assistant',
+        'sessionId': 'a1b2c3d4-e5f6-7890-abcd-ef1234567890',
+        'timestamp': '2025-01-31T14:32:05.123Z',
+        'message': {
+            'id': 'msg_01ABCDEF',
+            'role': 'assistant',
+            'model': 'model-name',
+            'content': [
+                {'type': 'text', 'text': 'Let me run the tests. ' * 20},
+                {'type': 'tool_use', 'id': 'toolu_01XYZ', 'name': 'Bash',
+                 'input': {'command': 'python -m pytest -q tests/', 'timeout': 120000}},
+            ],
+            'usage': {'input_tokens': 1234, 'output_tokens': 56,
+                      'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 9876},
+        },
+    }
+
+
+def _sample_sse_event():
+    return {
+        'id': 123456,
+        'category': 'tool_use',
+        'summary': 'Bash: python -m pytest -q tests/',
+        'agent_name': 'backend-dev',
+        'timestamp': '2025-01-31T14:32:05.123Z',
+        'tool_name': 'Bash',
+    }
+
+
+def build_cases():
+    """Return [(path name, 'dumps'|'loads', input)] for every hot path."""
+    hook = _sample_hook_payload()
+    line = _sample_transcript_line()
+    sse = _sample_sse_event()
+    return [
+        ('hook stdin (loads)', 'loads', codec.dumps(hook).encode('utf-8')),
+        ('transcript line (loads)', 'loads', codec.dumps(line).encode('utf-8')),
+        ('event payload (dumps)', 'dumps', hook),
+        ('event detail (loads)', 'loads', codec.dumps(hook)),
+        ('SSE message (dumps)', 'dumps', sse),
+    ]
+
+
+def time_call(fn, arg, seconds):
+    """Return mean microseconds per call of fn(arg) over roughly `seconds`."""
+    fn(arg)
+    n = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(n):
+            fn(arg)
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return elapsed / n * 1e6
+        n *= 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark core.codec backends on each hot path')
+    parser.add_argument('--seconds', type=float, default=0.5, help='Minimum time per measurement')
+    args = parser.parse_args()
+
+    backends = codec.available_backends()
+    funcs = {name: codec.load_backend(name) for name in backends}
+    std_dumps, _std_loads = funcs['stdlib']
+    cases = build_cases()
+
+    print(f'Active backend: {codec.BACKEND}')
+    print(f'Available: {", ".join(backends)}')
+    print()
+
+    header = f'{"path":<26}' + ''.join(f'{name:>12}' for name in backends) + f'{"speedup":>10}'
+    print(header)
+    print('-' * len(header))
+    for label, kind, arg in cases:
+        timings = {}
+        for name in backends:
+            dumps, loads = funcs[name]
+            timings[name] = time_call(dumps if kind == 'dumps' else loads, arg, args.seconds)
+        best = min(timings[name] for name in backends)
+        speedup = timings['stdlib'] / best if best else 0.0
+        print(f'{label:<26}' + ''.join(f'{timings[n]:>10.1f}us' for n in backends) + f'{speedup:>9.1f}x')
+
+    print()
+    mismatches = 0
+    for label, kind, arg in cases:
+        if kind != 'dumps':
+            continue
+        expected = std_dumps(arg)
+        for name in backends:
+            if funcs[name][0](arg) != expected:
+                mismatches += 1
+                print(f'MISMATCH: {name} output differs from stdlib on {label}')
+    if not mismatches:
+        print('All backends produce output identical to the stdlib encoder.')
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Measure cold hook startup against a time budget.
+
+Claude Code starts a new interpreter for every hook, and PreToolUse and
+PostToolUse run on every tool call, so a hook's imports are paid each
+time. For each hook event this runs hooks/dispatch.py in a fresh process
+on a scratch database and reports:
+
+- wall: median wall-clock time per run, and its overhead over a bare
+  `python -c pass` (interpreter startup isn't ours to cut)
+- imports: time importing modules the bare interpreter doesn't, from
+  `-X importtime` (the quickest of a few runs), and the slowest of them
+
+    python3 scripts/bench_hooks.py [--runs 15]
+    python3 scripts/bench_hooks.py --budget-ms 40 --import-budget-ms 25
+
+Exits 1 if any event's overhead exceeds --budget-ms or its import time
+exceeds --import-budget-ms, so it can run as a startup-time regression
+check (tests/test_hook_startup.py runs it under pytest). Bytecode is
+compiled first, as it would be after a hook's first run.
+"""
+
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PLUGIN_ROOT)
+
+from core import codec  # noqa: E402
+
+DISPATCH = os.path.join(PLUGIN_ROOT, 'hooks', 'dispatch.py')
+
+# Default budgets, with room for a busy machine. The per-event hook scripts
+# that hooks/dispatch.py replaced took about 60 ms over a bare interpreter
+DEFAULT_BUDGET_MS = 50
+DEFAULT_IMPORT_BUDGET_MS = 40
+
+
+def _payloads(scratch):
+    transcript = os.path.join(scratch, 'agent-bench.jsonl')
+    with open(transcript, 'w', encoding='utf-8') as f:
+        f.write(codec.dumps({'type': 'user', 'message': {'role': 'user', 'content': 'hi'}}) + '\n')
+    tool = {
+        'session_id': 'bench-session',
+        'tool_use_id': 'toolu_bench',
+        'tool_name': 'Read',
+        'tool_input': {'file_path': '/home/dev/project/src/module.py'},
+        'cwd': '/home/dev/project',
+    }
+    return {
+        'PreToolUse': dict(tool, hook_event_name='PreToolUse'),
+        'PostToolUse': dict(tool, hook_event_name='PostToolUse', tool_response='line\n' * 200),
+        'SubagentStart': {'hook_event_name': 'SubagentStart', 'session_id': 'bench-session',
+                          'agent_id': 'a1b2c3d4e5', 'agent_type': 'Explore'},
+        'SubagentStop': {'hook_event_name': 'SubagentStop', 'session_id': 'bench-session',
+                         'agent_id': 'a1b2c3d4e5', 'agent_type': 'Explore', 'agent_transcript_path': transcript},
+        'Stop': {'hook_event_name': 'Stop', 'session_id': 'bench-session'},
+        'Notification': {'hook_event_name': 'Notification', 'session_id': 'bench-session', 'message': 'bench'},
+    }
+
+
+def _run(cmd, env, stdin=b''):
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, input=stdin, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return (time.perf_counter() - start) * 1000, proc.stderr.decode('utf-8', 'replace')
+
+
+def _times_ms(cmd, env, stdin, runs):
+    return [_run(cmd, env, stdin)[0] for _ in range(runs)]
+
+
+def _top_level_imports(importtime_output):
+    """{module: cumulative ms} for the modules imported directly by the script or interpreter."""
+    imports = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        if name.startswith('  '):
+            continue
+        imports[name.strip()] = int(parts[1]) / 1000
+    return imports
+
+
+def _own_imports(cmd, env, stdin, bare_imports):
+    """{module: ms} for the modules a hook run imports that a bare interpreter doesn't."""
+    imports = _top_level_imports(_run([sys.executable, '-X', 'importtime'] + cmd[1:], env, stdin)[1])
+    return {name: ms for name, ms in imports.items() if name not in bare_imports}
+
+
+def measure(runs):
+    """Time every hook event. Returns (bare interpreter ms, per-event results, hook error log or None).
+
+    Each result has event, wall_ms, overhead_ms (medians), quickest_overhead_ms
+    (quickest run against the quickest bare start, which machine noise
+    hardly moves), import_ms and imports ({module: ms} for the modules a
+    bare interpreter doesn't import).
+    """
+    for directory in ('core', 'hooks'):
+        compileall.compile_dir(os.path.join(PLUGIN_ROOT, directory), quiet=1)
+
+    with tempfile.TemporaryDirectory(prefix='team-monitor-bench-') as scratch:
+        data_dir = os.path.join(scratch, 'data')
+        os.makedirs(data_dir)
+        # Claim a running server so SubagentStop only queues, as it does in use
+        with open(os.path.join(data_dir, 'server.pid'), 'w') as f:
+            f.write(str(os.getpid()))
+        env = dict(os.environ, CLAUDE_PLUGIN_ROOT=PLUGIN_ROOT, TEAM_MONITOR_DATA_DIR=data_dir)
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+        bare_times = _times_ms([sys.executable, '-c', 'pass'], env, b'', runs)
+        bare_ms = statistics.median(bare_times)
+        bare_imports = _top_level_imports(_run([sys.executable, '-X', 'importtime', '-c', 'pass'], env)[1])
+
+        results = []
+        for event, payload in _payloads(scratch).items():
+            cmd = [sys.executable, DISPATCH, event]
+            stdin = codec.dumps(payload).encode('utf-8')
+            _run(cmd, env, stdin)  # creates the schema on the first event
+            times = _times_ms(cmd, env, stdin, runs)
+            wall_ms = statistics.median(times)
+            # A single import timing is noisy; keep the quickest of a few
+            ours = min((_own_imports(cmd, env, stdin, bare_imports) for _ in range(max(3, runs // 3))),
+                       key=lambda imports: sum(imports.values()))
+            results.append({'event': event, 'wall_ms': wall_ms, 'overhead_ms': wall_ms - bare_ms,
+                            'quickest_overhead_ms': min(times) - min(bare_times),
+                            'import_ms': sum(ours.values()), 'imports': ours})
+
+        errors = None
+        errors_path = os.path.join(data_dir, 'hook_errors.log')
+        if os.path.exists(errors_path):
+            with open(errors_path, encoding='utf-8') as f:
+                errors = f.read()
+    return bare_ms, results, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold hook startup against a time budget')
+    parser.add_argument('--runs', type=int, default=15, help='Runs per event (median reported)')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Largest allowed wall-clock overhead over a bare interpreter')
+    parser.add_argument('--import-budget-ms', type=float, default=DEFAULT_IMPORT_BUDGET_MS,
+                        help='Largest allowed import time')
+    args = parser.parse_args()
+
+    bare_ms, results, errors = measure(args.runs)
+    print(f'Bare interpreter: {bare_ms:.1f} ms ({sys.executable})')
+    print(f'Budget: {args.budget_ms:.0f} ms overhead, {args.import_budget_ms:.0f} ms imports')
+    print()
+    header = f'{"event":<14}{"wall":>9}{"overhead":>10}{"imports":>9}  slowest imports'
+    print(header)
+    print('-' * (len(header) + 30))
+
+    over = []
+    for result in results:
+        slowest = ', '.join(f'{name} {ms:.1f}' for name, ms in
+                            sorted(result['imports'].items(), key=lambda item: -item[1])[:3])
+        flag = ''
+        if result['overhead_ms'] > args.budget_ms or result['import_ms'] > args.import_budget_ms:
+            over.append(result['event'])
+            flag = '  OVER BUDGET'
+        print(f'{result["event"]:<14}{result["wall_ms"]:>7.1f}ms{result["overhead_ms"]:>8.1f}ms'
+              f'{result["import_ms"]:>7.1f}ms  {slowest}{flag}')
+
+    if errors:
+        print()
+        print(f'Hooks logged errors:\n{errors}')
+        sys.exit(1)
+
+    print()
+    if over:
+        print(f'Over budget: {", ".join(over)}')
+        sys.exit(1)
+    print('All hook events are within budget.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""Load-test the dashboard server with mixed REST + SSE traffic.
+
+REST clients cycle through the dashboard's read endpoints on keep-alive
+connections while SSE clients hold /api/stream open. Reports request
+throughput and latency percentiles, plus how long new events take to
+reach the SSE clients.
+
+    python3 scripts/bench_server.py --compare              # dev vs production, scratch database
+    python3 scripts/bench_server.py --url http://localhost:5111
+
+--compare seeds a scratch database, starts the development server and
+then the production server against it, and runs the same load on each
+while a writer inserts events at --write-rate per second. Against --url
+nothing is written, so SSE delivery latency isn't measured.
+"""
+
+import argparse
+import http.client
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+PLUGIN_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REST_PATHS = [
+    '/api/bootstrap?per_page=100',
+    '/api/stats',
+    '/api/agents',
+    '/api/events?page=1&per_page=50',
+    '/api/events?category=tool_use&per_page=50',
+    '/api/latency',
+    '/api/tasks',
+    '/api/alerts',
+]
+
+SEED_EVENTS = 20000
+SEED_AGENTS = 8
+SEED_TOOLS = ('Bash', 'Read', 'Edit', 'Grep', 'Write')
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.streams_open = 0
+        self.delivery = []
+
+    def add(self, field, value):
+        with self.lock:
+            getattr(self, field).append(value)
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def rest_client(host, port, stop, results):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    rng = random.Random()
+    while not stop.is_set():
+        path = rng.choice(REST_PATHS)
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                with results.lock:
+                    results.errors += 1
+            else:
+                results.add('latencies', time.perf_counter() - start)
+        except (OSError, http.client.HTTPException):
+            with results.lock:
+                results.errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.close()
+
+
+def sse_client(host, port, since, stop, results, connections):
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    connections.append(conn)
+    try:
+        conn.request('GET', f'/api/stream?since={since}')
+        resp = conn.getresponse()
+        if resp.status != 200:
+            with results.lock:
+                results.errors += 1
+            return
+        with results.lock:
+            results.streams_open += 1
+        while not stop.is_set():
+            line = resp.readline()
+            if not line:
+                break
+            if not line.startswith(b'data: '):
+                continue
+            received = time.time()
+            # Writer events carry their insert time in the summary: "bench <epoch seconds>"
+            marker = line.find(b'"bench ')
+            if marker != -1:
+                sent = float(line[marker + 7:line.index(b'"', marker + 1)])
+                results.add('delivery', received - sent)
+    except (OSError, http.client.HTTPException, ValueError):
+        pass
+    finally:
+        conn.close()
+
+
+def writer(rate, stop):
+    from core.db import insert_event
+    from core.timeutil import now_timestamp
+    interval = 1.0 / rate
+    n = 0
+    while not stop.is_set():
+        n += 1
+        insert_event({
+            'timestamp': now_timestamp(),
+            'session_id': 'bench-session',
+            'team_name': 'bench',
+            'agent_name': f'agent-{n % SEED_AGENTS}',
+            'hook_event': 'PostToolUse',
+            'tool_name': 'Bash',
+            'event_category': 'tool_use',
+            'summary': f'bench {time.time():.6f}',
+            'payload_json': '{}',
+            'duration_ms': 5,
+        })
+        time.sleep(interval)
+
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+
+def run_load(base_url, seconds, clients, streams, write_rate=0):
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.request('GET', '/api/bootstrap?per_page=1')
+    from core import codec
+    cursor = codec.loads(conn.getresponse().read()).get('cursor', 0)
+    conn.close()
+
+    results = Results()
+    stop = threading.Event()
+    connections = []
+    threads = [threading.Thread(target=sse_client, args=(host, port, cursor, stop, results, connections), daemon=True)
+               for _ in range(streams)]
+    threads += [threading.Thread(target=rest_client, args=(host, port, stop, results), daemon=True)
+                for _ in range(clients)]
+    if write_rate:
+        threads.append(threading.Thread(target=writer, args=(write_rate, stop), daemon=True))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for c in connections:
+        try:
+            c.sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, AttributeError):
+            pass
+    for t in threads:
+        t.join(timeout=5)
+
+    return {
+        'requests': len(results.latencies),
+        'rps': len(results.latencies) / seconds,
+        'p50': _ms(percentile(results.latencies, 50)),
+        'p95': _ms(percentile(results.latencies, 95)),
+        'p99': _ms(percentile(results.latencies, 99)),
+        'errors': results.errors,
+        'streams': results.streams_open,
+        'delivered': len(results.delivery),
+        'delivery_p50': _ms(percentile(results.delivery, 50)),
+        'delivery_p95': _ms(percentile(results.delivery, 95)),
+    }
+
+
+def seed(count):
+    from core.db import init_db, insert_events
+    from core.timeutil import format_timestamp, parse_timestamp
+    init_db()
+    rng = random.Random(1)
+    start = time.time() - count
+    events = []
+    for i in range(count):
+        tool = rng.choice(SEED_TOOLS)
+        events.append({
+            'timestamp': format_timestamp(parse_timestamp(start + i)),
+            'session_id': f'seed-{i % 4}',
+            'team_name': 'bench',
+            'agent_name': f'agent-{i % SEED_AGENTS}',
+            'hook_event': 'PostToolUse',
+            'tool_name': tool,
+            'event_category': 'tool_use',
+            'summary': f'{tool}: seed {i}',
+            'payload_json': '{"tool_input": {"command": "echo seed"}}',
+            'duration_ms': rng.randint(1, 2000),
+            'event_key': f'tu:seed-{i}',
+        })
+    insert_events(events, 'bench-seed', 0)
+
+
+def wait_ready(port, proc, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/readyz')
+            if conn.getresponse().status == 200:
+                return True
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def compare(args):
+    modes = [('dev', [os.path.join(PLUGIN_ROOT, 'server', 'app.py')])]
+    production_pkg = 'waitress' if sys.platform == 'win32' else 'gunicorn'
+    try:
+        __import__(production_pkg)
+        modes.append(('production', [os.path.join(PLUGIN_ROOT, 'server', 'production.py'),
+                                     '--workers', str(args.workers), '--threads', str(args.threads)]))
+    except ImportError:
+        print(f'{production_pkg} is not installed; benchmarking the dev server only.')
+
+    rows = []
+    for mode, cmd in modes:
+        # A fresh copy of the seeded database for each mode
+        data_dir = os.path.join(args.scratch, 'data')
+        shutil.rmtree(data_dir, ignore_errors=True)
+        shutil.copytree(os.path.join(args.scratch, 'seed'), data_dir)
+
+        env = dict(os.environ, CLAUDE_PLUGIN_ROOT=args.scratch, PYTHONPATH=PLUGIN_ROOT)
+        proc = subprocess.Popen([sys.executable] + cmd + ['--port', str(args.port)], env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_ready(args.port, proc):
+                print(f'{mode} server did not become ready; skipping.')
+                continue
+            print(f'Running {mode} server for {args.seconds:g}s...')
+            rows.append((mode, run_load(f'http://127.0.0.1:{args.port}', args.seconds,
+                                        args.clients, args.streams, args.write_rate)))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+    return rows
+
+
+def fmt(value, spec='.1f'):
+    return '-' if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard server under mixed REST + SSE load')
+    parser.add_argument('--url', help='Benchmark an already running server (read-only)')
+    parser.add_argument('--compare', action='store_true', help='Compare the dev and production servers')
+    parser.add_argument('--seconds', type=float, default=10, help='Load duration per server')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent REST clients')
+    parser.add_argument('--streams', type=int, default=50, help='Concurrent SSE clients')
+    parser.add_argument('--write-rate', type=float, default=20, help='Events inserted per second (--compare)')
+    parser.add_argument('--port', type=int, default=5199, help='Port for --compare servers')
+    parser.add_argument('--workers', type=int, default=2, help='Production workers (--compare)')
+    parser.add_argument('--threads', type=int, default=32, help='Production threads per worker (--compare)')
+    args = parser.parse_args()
+
+    if not args.url and not args.compare:
+        parser.error('give --url or --compare')
+
+    if args.url:
+        sys.path.insert(0, PLUGIN_ROOT)
+        rows = [(args.url, run_load(args.url, args.seconds, args.clients, args.streams))]
+    else:
+        args.scratch = tempfile.mkdtemp(prefix='team-monitor-bench-')
+        # core.* reads CLAUDE_PLUGIN_ROOT at import, so set it before the first import
+        os.environ['CLAUDE_PLUGIN_ROOT'] = args.scratch
+        sys.path.insert(0, PLUGIN_ROOT)
+        try:
+            seed(SEED_EVENTS)
+            os.rename(os.path.join(args.scratch, 'data'), os.path.join(args.scratch, 'seed'))
+            rows = compare(args)
+        finally:
+            shutil.rmtree(args.scratch, ignore_errors=True)
+
+    print()
+    print(f'{args.clients} REST clients, {args.streams} SSE clients, {args.seconds:g}s each')
+    header = (f'{"server":<12}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"errors":>8}'
+              f'{"streams":>9}{"deliv p50":>11}{"deliv p95":>11}')
+    print(header)
+    print('-' * len(header))
+    for name, r in rows:
+        print(f'{name:<12}{r["rps"]:>9.1f}{fmt(r["p50"]):>9}{fmt(r["p95"]):>9}{fmt(r["p99"]):>9}'
+              f'{r["errors"]:>8}{r["streams"]:>9}{fmt(r["delivery_p50"]):>11}{fmt(r["delivery_p95"]):>11}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Export Team Monitor event history for offline analysis.
+
+    python3 scripts/export_events.py --out exports/               # columnar, partitioned by day and team
+    python3 scripts/export_events.py --format ndjson > events.ndjson
+    python3 scripts/export_events.py --out exports/ --from 2025-01-31 --team my-team --payload
+
+Columnar output is Parquet when pyarrow is installed, otherwise gzipped CSV
+with dictionary files (see core/export.py). Rows are streamed from a single
+database cursor, so exports of any size run in constant memory.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PLUGIN_ROOT)
+
+from core.db import init_db, iter_events  # noqa: E402
+from core.export import columnar_format, ndjson_chunks, write_columnar  # noqa: E402
+from core.timeutil import to_epoch_us  # noqa: E402
+
+
+def _time(value):
+    if value is None:
+        return None
+    try:
+        us = to_epoch_us(float(value))
+    except ValueError:
+        us = to_epoch_us(value)
+    if us is None:
+        raise argparse.ArgumentTypeError(f'not an ISO-8601 timestamp or epoch seconds: {value}')
+    return us
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export Team Monitor events')
+    parser.add_argument('--format', choices=('auto', 'parquet', 'csv', 'ndjson'), default='auto',
+                        help='auto = parquet if pyarrow is installed, else csv')
+    parser.add_argument('--out', help='Output directory (columnar) or file (ndjson; default stdout)')
+    parser.add_argument('--from', dest='start', type=_time, help='Earliest event time (ISO-8601 or epoch seconds)')
+    parser.add_argument('--to', dest='end', type=_time, help='Latest event time')
+    parser.add_argument('--team', help='Only this team')
+    parser.add_argument('--agent', help='Only this agent')
+    parser.add_argument('--category', help='Only this event category')
+    parser.add_argument('--tool', help='Only this tool')
+    parser.add_argument('--payload', action='store_true', help='Include the stored hook payloads')
+    args = parser.parse_args()
+
+    init_db()
+    batches = iter_events(start_us=args.start, end_us=args.end, team=args.team, agent=args.agent,
+                          category=args.category, tool=args.tool, include_payload=args.payload)
+
+    if args.format == 'ndjson':
+        out = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+        try:
+            for chunk in ndjson_chunks(batches, include_payload=args.payload):
+                out.write(chunk)
+        finally:
+            if args.out:
+                out.close()
+        return
+
+    if not args.out:
+        parser.error('--out is required for columnar output')
+    try:
+        fmt = columnar_format(args.format)
+    except RuntimeError as exc:
+        parser.error(str(exc))
+
+    start = time.perf_counter()
+    manifest = write_columnar(batches, args.out, fmt=fmt, include_payload=args.payload)
+    seconds = time.perf_counter() - start
+    print(f'Exported {manifest["rows"]} events into {len(manifest["partitions"])} partition(s) '
+          f'as {manifest["format"]} in {seconds:.2f}s -> {args.out}')
+
+
+if __name__ == '__main__':
+    main()
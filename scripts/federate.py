@@ -0,0 +1,96 @@
+"""Ship events to, or collect them on, a federation aggregator.
+
+    python3 scripts/federate.py ship --to http://aggregator:5111 --token SECRET
+    python3 scripts/federate.py ship --to /mnt/shared/team-monitor --follow
+    python3 scripts/federate.py collect --dir /mnt/shared/team-monitor --follow
+    python3 scripts/federate.py status
+
+A running dashboard server does the same in the background when
+TEAM_MONITOR_SHIP_TO or TEAM_MONITOR_FEDERATION_DIR is set (see
+server/federation.py); this script is for one-off catch-up and for nodes
+that don't run a server. Set TEAM_MONITOR_NODE to override the node id
+(default: the hostname) and TEAM_MONITOR_DATA_DIR to pick the database.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PLUGIN_ROOT)
+
+from core import codec  # noqa: E402
+from core.db import get_import_sources, init_db  # noqa: E402
+from core.federation import NODE_ID, SOURCE_PREFIX, Collector, Shipper, make_target  # noqa: E402
+
+FOLLOW_INTERVAL = 2
+
+
+def ship(args):
+    shipper = Shipper(make_target(args.to, token=args.token), batch_size=args.batch_size)
+    while True:
+        start = time.perf_counter()
+        sent = shipper.ship_all()
+        if sent or not args.follow:
+            print(f'{NODE_ID}: shipped {sent} events to {args.to} in {time.perf_counter() - start:.2f}s '
+                  f'(watermark {shipper.position})')
+        if not args.follow:
+            return
+        time.sleep(FOLLOW_INTERVAL)
+
+
+def collect(args):
+    collector = Collector(args.dir)
+    while True:
+        results = collector.collect_once()
+        for node, inserted in results.items():
+            print(f'{node}: stored {inserted} new events')
+        if not args.follow:
+            if not results:
+                print(f'No new batch files in {args.dir}')
+            return
+        time.sleep(FOLLOW_INTERVAL)
+
+
+def status(args):
+    peers = get_import_sources(SOURCE_PREFIX)
+    print(codec.dumps({
+        'node': NODE_ID,
+        'peers': [{'node': p['path'][len(SOURCE_PREFIX):], 'last_id': p['byte_offset'],
+                   'event_count': p['event_count'], 'last_received': p['imported_at']} for p in peers],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Team Monitor federation')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('ship', help="Ship this node's events to an aggregator")
+    p.add_argument('--to', required=True, help='Aggregator URL or shared directory')
+    p.add_argument('--token', default=os.environ.get('TEAM_MONITOR_FEDERATION_TOKEN'),
+                   help='Aggregator token (default $TEAM_MONITOR_FEDERATION_TOKEN)')
+    p.add_argument('--batch-size', type=int, default=1000, help='Events per batch')
+    p.add_argument('--follow', action='store_true', help='Keep shipping new events')
+    p.set_defaults(func=ship)
+
+    p = sub.add_parser('collect', help='Store batch files shipped into a shared directory')
+    p.add_argument('--dir', required=True, help='Shared directory nodes ship into')
+    p.add_argument('--follow', action='store_true', help='Keep collecting new files')
+    p.set_defaults(func=collect)
+
+    p = sub.add_parser('status', help='Show the nodes that have shipped events here')
+    p.set_defaults(func=status)
+
+    args = parser.parse_args()
+    init_db()
+    try:
+        args.func(args)
+    except KeyboardInterrupt:
+        pass
+    except (OSError, RuntimeError) as exc:
+        parser.exit(1, f'federate: {exc}\n')
+
+
+if __name__ == '__main__':
+    main()
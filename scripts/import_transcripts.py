@@ -0,0 +1,127 @@
+"""Import existing Claude Code transcripts into the Team Monitor database.
+
+Discovers *.jsonl transcripts under one or more directories, parses them in
+parallel across a process pool and bulk-loads the extracted tool calls with
+their original timestamps. Each file's import watermark (byte offset) is
+stored alongside its events, so re-running only picks up new lines.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ['CLAUDE_PLUGIN_ROOT'] = PLUGIN_ROOT
+sys.path.insert(0, PLUGIN_ROOT)
+
+from core.db import init_db, insert_events, get_transcript_offsets  # noqa: E402
+from core.timeutil import format_timestamp  # noqa: E402
+from core.transcript_parser import parse_transcript_from  # noqa: E402
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser('~'), '.claude', 'projects')
+
+
+def discover_transcripts(roots):
+    """Yield (path, size) for every .jsonl file under the given directories."""
+    for root in roots:
+        if os.path.isfile(root):
+            yield os.path.abspath(root), os.path.getsize(root)
+            continue
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for name in filenames:
+                if name.endswith('.jsonl'):
+                    path = os.path.abspath(os.path.join(dirpath, name))
+                    try:
+                        yield path, os.path.getsize(path)
+                    except OSError:
+                        continue
+
+
+def _parse_file(path, offset, agent_name, team_name):
+    """Worker: parse one transcript from its watermark. Runs in a child process."""
+    result = parse_transcript_from(path, offset, agent_name=agent_name, team_name=team_name)
+
+    # Lines without their own timestamp fall back to the file's mtime
+    fallback_ts = None
+    for event in result['events']:
+        if not event.get('timestamp'):
+            if fallback_ts is None:
+                mtime = os.path.getmtime(path)
+                fallback_ts = format_timestamp(datetime.fromtimestamp(mtime, timezone.utc))
+            event['timestamp'] = fallback_ts
+
+    result['path'] = path
+    return result
+
+
+def import_transcripts(roots, workers=None, agent_name=None, team_name=None, verbose=False):
+    """Import all new transcript data under roots. Returns a stats dict."""
+    init_db()
+    offsets = get_transcript_offsets()
+
+    jobs = []
+    for path, size in discover_transcripts(roots):
+        offset = offsets.get(path, 0)
+        if size < offset:
+            # File was truncated or rewritten; start over
+            offset = 0
+        if size > offset:
+            jobs.append((path, offset))
+
+    stats = {'files': len(jobs), 'bytes': 0, 'events': 0, 'seconds': 0.0}
+    if not jobs:
+        return stats
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_parse_file, path, offset, agent_name, team_name)
+            for path, offset in jobs
+        ]
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                print(f'  failed: {exc}', file=sys.stderr)
+                continue
+            events = sorted(result['events'], key=lambda e: e['timestamp'])
+            inserted = insert_events(events, source_path=result['path'], source_offset=result['offset'],
+                                     usage_records=result['usage'])
+            stats['bytes'] += result['bytes_read']
+            stats['events'] += inserted
+            if verbose:
+                print(f'  {result["path"]}: {inserted} events')
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import existing Claude Code transcripts into Team Monitor')
+    parser.add_argument('roots', nargs='*', default=[DEFAULT_ROOT],
+                        help=f'Directories or files to scan (default: {DEFAULT_ROOT})')
+    parser.add_argument('--workers', type=int, default=None, help='Parser processes (default: CPU count)')
+    parser.add_argument('--agent', default=None, help='Attribute all events to this agent name')
+    parser.add_argument('--team', default=None, help='Attribute all events to this team name')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print per-file results')
+    args = parser.parse_args()
+
+    stats = import_transcripts(args.roots, workers=args.workers, agent_name=args.agent,
+                               team_name=args.team, verbose=args.verbose)
+
+    if not stats['files']:
+        print('No new transcript data found.')
+        return
+
+    seconds = stats['seconds'] or 1e-9
+    mb = stats['bytes'] / (1024 * 1024)
+    print(f'Imported {stats["events"]} events from {stats["files"]} file(s) '
+          f'({mb:.1f} MB) in {seconds:.2f}s')
+    print(f'Throughput: {mb / seconds:.1f} MB/s, {stats["events"] / seconds:.0f} events/s')
+
+
+if __name__ == '__main__':
+    main()
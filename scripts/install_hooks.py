@@ -15,6 +15,11 @@ SETTINGS_PATH = os.path.join(os.path.expanduser('~'), '.claude', 'settings.json'
 # Marker so uninstall can find our hooks
 MARKER = 'team-monitor-plugin'
 
+# Hook events team-monitor registers for
+HOOK_EVENTS = (
+    'PreToolUse', 'PostToolUse', 'PostToolUseFailure', 'SubagentStart', 'Stop', 'SubagentStop', 'Notification',
+)
+
 
 def get_python_cmd():
     """Return the platform-appropriate python command."""
@@ -23,73 +28,30 @@ def get_python_cmd():
     return 'python3'
 
 
-def build_hook_command(script_name):
+def build_hook_command(event_name):
     """Build a hook command string with the resolved plugin path."""
     py = get_python_cmd()
-    script_path = os.path.join(PLUGIN_ROOT, 'hooks', script_name)
+    script_path = os.path.join(PLUGIN_ROOT, 'hooks', 'dispatch.py')
     # Normalize path separators
     script_path = script_path.replace('\\', '/')
-    return f'{py} "{script_path}"'
+    return f'{py} "{script_path}" {event_name}'
 
 
 def build_hooks_config():
-    """Build the hooks dict for all team-monitor events."""
+    """Build the hooks dict for all team-monitor events, each routed by hooks/dispatch.py."""
     return {
-        'PostToolUse': [
-            {
-                '_plugin': MARKER,
-                'hooks': [
-                    {
-                        'type': 'command',
-                        'command': build_hook_command('posttooluse_hook.py'),
-                    }
-                ],
-            }
-        ],
-        'SubagentStart': [
-            {
-                '_plugin': MARKER,
-                'hooks': [
-                    {
-                        'type': 'command',
-                        'command': build_hook_command('subagentstart_hook.py'),
-                    }
-                ],
-            }
-        ],
-        'Stop': [
-            {
-                '_plugin': MARKER,
-                'hooks': [
-                    {
-                        'type': 'command',
-                        'command': build_hook_command('stop_hook.py'),
-                    }
-                ],
-            }
-        ],
-        'SubagentStop': [
-            {
-                '_plugin': MARKER,
-                'hooks': [
-                    {
-                        'type': 'command',
-                        'command': build_hook_command('stop_hook.py'),
-                    }
-                ],
-            }
-        ],
-        'Notification': [
+        event_name: [
             {
                 '_plugin': MARKER,
                 'hooks': [
                     {
                         'type': 'command',
-                        'command': build_hook_command('notification_hook.py'),
+                        'command': build_hook_command(event_name),
                     }
                 ],
             }
-        ],
+        ]
+        for event_name in HOOK_EVENTS
     }
 
 
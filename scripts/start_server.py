@@ -2,11 +2,15 @@
 
 import argparse
 import os
+import signal
 import subprocess
 import sys
 
 PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-PID_FILE = os.path.join(PLUGIN_ROOT, 'data', 'server.pid')
+DATA_DIR = os.environ.get('TEAM_MONITOR_DATA_DIR') or os.path.join(PLUGIN_ROOT, 'data')
+PID_FILE = os.path.join(DATA_DIR, 'server.pid')
+# 'production' while a production server started by us is running
+MODE_FILE = os.path.join(DATA_DIR, 'server.mode')
 
 
 def ensure_dependencies():
@@ -23,6 +27,20 @@ def ensure_dependencies():
         print('Flask installed successfully.')
 
 
+def ensure_production_server():
+    """Install the production WSGI server (gunicorn; waitress on Windows) if it's not available."""
+    package = 'waitress' if sys.platform == 'win32' else 'gunicorn'
+    try:
+        __import__(package)
+    except ImportError:
+        print(f'{package} not found. Installing...')
+        subprocess.check_call(
+            [sys.executable, '-m', 'pip', 'install', package],
+            stdout=subprocess.DEVNULL,
+        )
+        print(f'{package} installed successfully.')
+
+
 def ensure_hooks():
     """Register hooks in ~/.claude/settings.json if not already present."""
     import json
@@ -79,8 +97,39 @@ def show_status():
         os.remove(PID_FILE)
 
 
-def start_server(port):
-    """Launch the Flask server as a detached background process."""
+def reload_server():
+    """Gracefully reload a production server: new workers, new code, no dropped requests."""
+    if not os.path.exists(PID_FILE):
+        print('Team Monitor is not running.')
+        return
+    if sys.platform == 'win32':
+        print('Graceful reload is not supported on Windows; stop and start the server instead.')
+        return
+
+    mode = None
+    if os.path.exists(MODE_FILE):
+        with open(MODE_FILE, 'r') as f:
+            mode = f.read().strip()
+    if mode != 'production':
+        print('The running server is the development server; only --production servers can reload.')
+        return
+
+    with open(PID_FILE, 'r') as f:
+        pid = int(f.read().strip())
+    try:
+        os.kill(pid, signal.SIGHUP)
+        print(f'Team Monitor reloading (PID {pid}).')
+    except (OSError, ProcessLookupError):
+        print('Team Monitor is not running (stale PID file).')
+        os.remove(PID_FILE)
+
+
+def start_server(port, production=False, workers=None, threads=None, host=None):
+    """Launch the dashboard server as a detached background process.
+
+    By default this is Flask's development server; with production=True it
+    is server/production.py (gunicorn workers, or waitress on Windows).
+    """
     if os.path.exists(PID_FILE):
         with open(PID_FILE, 'r') as f:
             pid = int(f.read().strip())
@@ -88,14 +137,22 @@ def start_server(port):
             print(f'Team Monitor is already running (PID {pid}).')
             return
 
-    app_path = os.path.join(PLUGIN_ROOT, 'server', 'app.py')
+    script = 'production.py' if production else 'app.py'
+    app_path = os.path.join(PLUGIN_ROOT, 'server', script)
     if not os.path.exists(app_path):
-        print(f'Error: server/app.py not found at {app_path}')
+        print(f'Error: server/{script} not found at {app_path}')
         sys.exit(1)
 
     os.makedirs(os.path.dirname(PID_FILE), exist_ok=True)
 
     cmd = [sys.executable, app_path, '--port', str(port)]
+    if host:
+        cmd += ['--host', host]
+    if production:
+        if workers:
+            cmd += ['--workers', str(workers)]
+        if threads:
+            cmd += ['--threads', str(threads)]
 
     if sys.platform == 'win32':
         CREATE_NEW_PROCESS_GROUP = 0x00000200
@@ -118,22 +175,37 @@ def start_server(port):
 
     with open(PID_FILE, 'w') as f:
         f.write(str(proc.pid))
+    with open(MODE_FILE, 'w') as f:
+        f.write('production' if production else 'dev')
 
-    print(f'Team Monitor started on http://localhost:{port}')
+    mode = ' (production)' if production else ''
+    print(f'Team Monitor started on http://localhost:{port}{mode}')
 
 
 def main():
     parser = argparse.ArgumentParser(description='Start the Team Monitor dashboard server')
     parser.add_argument('--port', type=int, default=5111, help='Port to run the server on')
+    parser.add_argument('--host', default=None,
+                        help='Interface to listen on (default 127.0.0.1; 0.0.0.0 to accept federated nodes)')
     parser.add_argument('--status', action='store_true', help='Show server status instead of starting')
+    parser.add_argument('--production', action='store_true',
+                        help='Serve with gunicorn worker processes (waitress on Windows) instead of the dev server')
+    parser.add_argument('--workers', type=int, default=None, help='Production worker processes (default 2)')
+    parser.add_argument('--threads', type=int, default=None, help='Production threads per worker (default 32)')
+    parser.add_argument('--reload', action='store_true', help='Gracefully reload a running production server')
     args = parser.parse_args()
 
     if args.status:
         show_status()
+    elif args.reload:
+        reload_server()
     else:
         ensure_dependencies()
+        if args.production:
+            ensure_production_server()
         ensure_hooks()
-        start_server(args.port)
+        start_server(args.port, production=args.production, workers=args.workers, threads=args.threads,
+                     host=args.host)
 
 
 if __name__ == '__main__':
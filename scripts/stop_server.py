@@ -6,7 +6,9 @@ import subprocess
 import sys
 
 PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-PID_FILE = os.path.join(PLUGIN_ROOT, 'data', 'server.pid')
+DATA_DIR = os.environ.get('TEAM_MONITOR_DATA_DIR') or os.path.join(PLUGIN_ROOT, 'data')
+PID_FILE = os.path.join(DATA_DIR, 'server.pid')
+MODE_FILE = os.path.join(DATA_DIR, 'server.mode')
 
 
 def stop_server():
@@ -28,6 +30,8 @@ def stop_server():
         print('Team Monitor was not running (process already exited).')
 
     os.remove(PID_FILE)
+    if os.path.exists(MODE_FILE):
+        os.remove(MODE_FILE)
 
 
 if __name__ == '__main__':
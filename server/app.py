@@ -1,16 +1,37 @@
 """Flask web server for team-monitor dashboard."""
 
+import gzip
+import hmac
+import io
 import os
+import queue
 import sys
-import json
 import time
 
 PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PLUGIN_ROOT)
 
 from flask import Flask, Response, jsonify, render_template, request
-from core.db import init_db, get_events, get_event_by_id, get_agents, get_stats
-from core.sse_bridge import get_pending_events
+from flask.json.provider import JSONProvider
+from core import codec, metrics
+from core.db import (
+    init_db, get_events, get_events_since, get_event_by_id, get_agents, get_agent_tree, get_teams, get_sessions,
+    get_stats, get_latency,
+    get_bootstrap, get_graph, get_tasks, get_task_transitions, get_task_metrics,
+    get_files, get_alerts, get_alerts_since, get_usage, get_ingest_stats, get_schema_version,
+    get_state_at, get_events_between, iter_events, SCHEMA_VERSION,
+)
+from core.export import ndjson_chunks
+from core.federation import ingest_shipped, valid_node
+from core.timeutil import format_timestamp, now_epoch_us, parse_timestamp, to_epoch_us
+from server.backfill import backfill, get_status as get_backfill_status
+from server.cache import cached_json
+from server.compression import asset_url, build_assets, compress_response, gzip_stream, serve_asset
+from server.event_bus import event_bus
+from server.federation import TOKEN as FEDERATION_TOKEN, federation, get_status as get_federation_status
+from server.hot_store import hot_store
+from server.stream_filter import StreamFilter
+from server.maintenance import get_status as get_maintenance_status, maintenance
 
 app = Flask(
     __name__,
@@ -18,6 +39,25 @@ app = Flask(
     static_folder=os.path.join(os.path.dirname(__file__), 'static'),
 )
 
+
+class CodecJSONProvider(JSONProvider):
+    """Route jsonify() through core.codec so API responses use the fast backend."""
+
+    def dumps(self, obj, **kwargs):
+        return codec.dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return codec.loads(s)
+
+
+app.json = CodecJSONProvider(app)
+app.after_request(compress_response)
+app.add_template_global(asset_url)
+build_assets(app.static_folder)
+
+# Gzip every SSE stream when set to 1; otherwise clients opt in with ?compress=1
+SSE_COMPRESS = os.environ.get('TEAM_MONITOR_SSE_COMPRESS', '') == '1'
+
 _db_initialized = False
 
 
@@ -29,6 +69,21 @@ def _ensure_db():
         _db_initialized = True
 
 
+@app.before_request
+def _start_timer():
+    request._tm_start = time.perf_counter()
+
+
+@app.after_request
+def _record_timing(response):
+    start = getattr(request, '_tm_start', None)
+    # Streaming responses are timed per poll inside the generator instead
+    if start is not None and not response.is_streamed:
+        metrics.observe('team_monitor_http_request_seconds', time.perf_counter() - start,
+                        endpoint=request.endpoint or 'unknown')
+    return response
+
+
 @app.after_request
 def _add_cors(response):
     response.headers['Access-Control-Allow-Origin'] = '*'
@@ -44,20 +99,37 @@ def index():
     return render_template('dashboard.html')
 
 
+@app.route('/assets/<path:filename>')
+def assets(filename):
+    return serve_asset(filename)
+
+
 # ---- API ----
 
+def _scope_args():
+    """The (team, session) a request is scoped to; either may be None."""
+    return request.args.get('team') or None, request.args.get('session') or None
+
+
 @app.route('/api/events')
+@cached_json()
 def api_events():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
     category = request.args.get('category', None)
     agent = request.args.get('agent', None)
     tool = request.args.get('tool', None)
-    result = get_events(page=page, per_page=per_page, category=category, agent=agent, tool=tool)
+    team, session = _scope_args()
+    result = hot_store.page(page=page, per_page=per_page, category=category, agent=agent, tool=tool,
+                            team=team, session=session)
+    if result is None:
+        result = get_events(page=page, per_page=per_page, category=category, agent=agent, tool=tool,
+                            team=team, session=session)
     return jsonify(result)
 
 
 @app.route('/api/events/<int:event_id>')
+@cached_json()
 def api_event_detail(event_id):
     event = get_event_by_id(event_id)
     if event is None:
@@ -65,74 +137,417 @@ def api_event_detail(event_id):
     # Parse payload_json into a proper object for the response
     if event.get('payload_json'):
         try:
-            event['payload'] = json.loads(event['payload_json'])
-        except (json.JSONDecodeError, TypeError):
+            event['payload'] = codec.loads(event['payload_json'])
+        except (codec.JSONDecodeError, TypeError):
             event['payload'] = event['payload_json']
     return jsonify(event)
 
 
 @app.route('/api/agents')
+@cached_json()
 def api_agents():
-    agents = get_agents()
+    team, _ = _scope_args()
+    agents = get_agents(team=team)
     return jsonify({'agents': agents})
 
 
+@app.route('/api/agents/tree')
+@cached_json()
+def api_agent_tree():
+    team, session = _scope_args()
+    if not team:
+        return jsonify({'error': 'team is required'}), 400
+    return jsonify({'team': team, 'session': session, 'tree': get_agent_tree(team, session=session)})
+
+
+@app.route('/api/teams')
+@cached_json()
+def api_teams():
+    return jsonify({'teams': get_teams()})
+
+
+@app.route('/api/sessions')
+@cached_json()
+def api_sessions():
+    team, _ = _scope_args()
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    return jsonify({'sessions': get_sessions(team=team, limit=limit)})
+
+
 @app.route('/api/stats')
+@cached_json(ttl=5)
 def api_stats():
-    stats = get_stats()
+    team, session = _scope_args()
+    stats = get_stats(team=team, session=session)
     return jsonify(stats)
 
 
+@app.route('/api/bootstrap')
+@cached_json(ttl=5)
+def api_bootstrap():
+    per_page = request.args.get('per_page', 100, type=int)
+    category = request.args.get('category', None)
+    agent = request.args.get('agent', None)
+    tool = request.args.get('tool', None)
+    team, session = _scope_args()
+    result = get_bootstrap(per_page=per_page, category=category, agent=agent, tool=tool, include_events=False,
+                           team=team, session=session)
+    result['events'] = (
+        hot_store.page(per_page=per_page, category=category, agent=agent, tool=tool, as_of=result['cursor'],
+                       team=team, session=session)
+        or get_events(per_page=per_page, category=category, agent=agent, tool=tool, max_id=result['cursor'],
+                      team=team, session=session)
+    )
+    return jsonify(result)
+
+
+@app.route('/api/latency')
+@cached_json()
+def api_latency():
+    agent = request.args.get('agent', None)
+    tool = request.args.get('tool', None)
+    by_agent = request.args.get('by', '') == 'agent'
+    team, _ = _scope_args()
+    return jsonify({'latency': get_latency(agent=agent, tool=tool, by_agent=by_agent, team=team)})
+
+
+@app.route('/api/graph')
+@cached_json()
+def api_graph():
+    team = request.args.get('team', None)
+    agent = request.args.get('agent', None)
+    return jsonify(get_graph(team=team, agent=agent))
+
+
+@app.route('/api/tasks')
+@cached_json(ttl=60)
+def api_tasks():
+    team = request.args.get('team', None)
+    status = request.args.get('status', None)
+    owner = request.args.get('owner', None)
+    window = request.args.get('window', 24, type=int)
+    return jsonify({
+        'tasks': get_tasks(team=team, status=status, owner=owner),
+        'metrics': get_task_metrics(team=team, window_hours=max(1, window)),
+    })
+
+
+@app.route('/api/tasks/<task_id>/transitions')
+@cached_json()
+def api_task_transitions(task_id):
+    team = request.args.get('team', None)
+    return jsonify({'transitions': get_task_transitions(task_id, team=team)})
+
+
+@app.route('/api/files')
+@cached_json()
+def api_files():
+    path = request.args.get('path', None)
+    directory = request.args.get('dir', None)
+    agent = request.args.get('agent', None)
+    limit = min(request.args.get('limit', 200, type=int), 1000)
+    team, _ = _scope_args()
+    return jsonify(get_files(path=path, directory=directory, agent=agent, limit=limit, team=team))
+
+
+@app.route('/api/alerts')
+@cached_json()
+def api_alerts():
+    kind = request.args.get('kind', None)
+    agent = request.args.get('agent', None)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    team, _ = _scope_args()
+    return jsonify({'alerts': get_alerts(kind=kind, agent=agent, limit=limit, team=team)})
+
+
+@app.route('/api/usage')
+@cached_json()
+def api_usage():
+    by = request.args.get('by', 'agent')
+    if by not in ('agent', 'session', 'team'):
+        return jsonify({'error': "by must be 'agent', 'session' or 'team'"}), 400
+    key = request.args.get('key', None)
+    return jsonify({'by': by, 'usage': get_usage(by=by, key=key)})
+
+
+# Sampled-out events only bump counters, which the validator doesn't see
+@app.route('/api/ingest')
+@cached_json(ttl=5)
+def api_ingest():
+    return jsonify(get_ingest_stats())
+
+
+def _time_arg(name):
+    """Parse a query argument given as ISO-8601 or epoch seconds into epoch microseconds."""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return to_epoch_us(float(value))
+    except ValueError:
+        return to_epoch_us(value)
+
+
+@app.route('/api/state')
+@cached_json()
+def api_state():
+    if request.args.get('at') is None:
+        return jsonify({'error': 'at is required (ISO-8601 or epoch seconds)'}), 400
+    at_us = _time_arg('at')
+    if at_us is None:
+        return jsonify({'error': 'at must be an ISO-8601 timestamp or epoch seconds'}), 400
+    return jsonify(get_state_at(at_us))
+
+
+@app.route('/api/export')
+def api_export():
+    """Stream every matching event as NDJSON, oldest first, in constant memory."""
+    start_us = _time_arg('from')
+    end_us = _time_arg('to')
+    if (request.args.get('from') and start_us is None) or (request.args.get('to') and end_us is None):
+        return jsonify({'error': 'from/to must be ISO-8601 timestamps or epoch seconds'}), 400
+    include_payload = request.args.get('payload') == '1'
+    batches = iter_events(
+        start_us=start_us, end_us=end_us,
+        team=request.args.get('team'), agent=request.args.get('agent'),
+        category=request.args.get('category'), tool=request.args.get('tool'),
+        include_payload=include_payload,
+    )
+    stream = ndjson_chunks(batches, include_payload=include_payload)
+    headers = {'Content-Disposition': 'attachment; filename="team-monitor-events.ndjson"'}
+    if request.accept_encodings['gzip']:
+        stream = gzip_stream(stream)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    return Response(stream, mimetype='application/x-ndjson', headers=headers)
+
+
+@app.route('/api/hot')
+def api_hot():
+    return jsonify(hot_store.stats())
+
+
+@app.route('/api/backfill')
+def api_backfill():
+    status = request.args.get('status') or None
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify(get_backfill_status(status=status, limit=limit))
+
+
+@app.route('/api/maintenance')
+def api_maintenance():
+    return jsonify(get_maintenance_status())
+
+
+# Largest shipped batch accepted, compressed and decompressed
+FEDERATION_MAX_BYTES = 64 * 1024 * 1024
+
+
+@app.route('/api/federation/ingest', methods=['POST'])
+def api_federation_ingest():
+    """Store a batch of events shipped by another node (see core/federation.py)."""
+    if not FEDERATION_TOKEN:
+        return jsonify({'error': 'federation ingest is disabled (set TEAM_MONITOR_FEDERATION_TOKEN)'}), 403
+    auth = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(auth.encode('utf-8'), f'Bearer {FEDERATION_TOKEN}'.encode('utf-8')):
+        return jsonify({'error': 'invalid federation token'}), 401
+    if (request.content_length or 0) > FEDERATION_MAX_BYTES:
+        return jsonify({'error': 'batch too large'}), 413
+    body = request.get_data()
+    try:
+        if request.headers.get('Content-Encoding') == 'gzip':
+            with gzip.GzipFile(fileobj=io.BytesIO(body)) as f:
+                body = f.read(FEDERATION_MAX_BYTES + 1)
+            if len(body) > FEDERATION_MAX_BYTES:
+                return jsonify({'error': 'batch too large'}), 413
+        batch = codec.loads(body)
+    except (OSError, EOFError, ValueError):
+        return jsonify({'error': 'body must be (gzipped) JSON'}), 400
+    if not isinstance(batch, dict):
+        return jsonify({'error': 'body must be a JSON object'}), 400
+    node, last_id, events = batch.get('node'), batch.get('last_id'), batch.get('events')
+    if not valid_node(node) or not isinstance(last_id, int) or not isinstance(events, list):
+        return jsonify({'error': 'node, last_id and events are required'}), 400
+    inserted, watermark = ingest_shipped(node, events, last_id)
+    return jsonify({'node': node, 'inserted': inserted, 'last_id': watermark})
+
+
+@app.route('/api/federation/status')
+def api_federation_status():
+    status = get_federation_status()
+    node = request.args.get('node')
+    if node is not None:
+        peer = next((p for p in status['peers'] if p['node'] == node), None)
+        return jsonify({'node': node, 'last_id': peer['last_id'] if peer else 0})
+    return jsonify(status)
+
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: the database is migrated and this process's event bus is running."""
+    try:
+        schema_ok = get_schema_version() >= SCHEMA_VERSION
+    except Exception:
+        schema_ok = False
+    body = {
+        'ready': schema_ok and event_bus.running,
+        'schema': schema_ok,
+        'event_bus': event_bus.running,
+        'leader': event_bus.leader.held,
+        'pid': os.getpid(),
+    }
+    return jsonify(body), 200 if body['ready'] else 503
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    metrics.collect_hook_timings()
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+HEARTBEAT_INTERVAL = 15
+
+# In replay, quiet stretches longer than this (after speed-up) are cut short
+REPLAY_MAX_GAP_S = 5
+REPLAY_BATCH = 500
+
+
+def _batches(fetch, cursor, limit=500):
+    """Yield successive batches from a get_*_since(cursor, limit) function until exhausted."""
+    while True:
+        batch = fetch(cursor, limit=limit)
+        if not batch:
+            return
+        yield batch
+        if len(batch) < limit:
+            return
+        cursor = batch[-1]['id']
+
+
+def _format_messages(kind, items):
+    """Serialize events (default SSE message type) or alerts ('alert' type) into one chunk."""
+    if not items:
+        return ''
+    metrics.inc('team_monitor_sse_messages_total', len(items))
+    if kind == 'alert':
+        return ''.join(f"event: alert\ndata: {codec.dumps(item)}\n\n" for item in items)
+    return ''.join(f"data: {codec.dumps(item)}\n\n" for item in items)
+
+
+def _replay(start_us, end_us, speed):
+    """Play stored events from start_us to end_us at `speed` times real time.
+
+    Opens with an `event: state` message holding the dashboard state at
+    start_us and closes with `event: replay_end`.
+    """
+    yield f"event: state\ndata: {codec.dumps(get_state_at(start_us))}\n\n"
+    clock_us = start_us
+    after = None
+    while True:
+        batch = get_events_between(start_us, end_us, after=after, limit=REPLAY_BATCH)
+        for ev in batch:
+            gap = (ev['ts_us'] - clock_us) / 1e6 / speed
+            if gap > 0:
+                time.sleep(min(gap, REPLAY_MAX_GAP_S))
+            clock_us = ev['ts_us']
+            yield _format_messages('event', [ev])
+        if len(batch) < REPLAY_BATCH:
+            break
+        after = (batch[-1]['ts_us'], batch[-1]['id'])
+    end = format_timestamp(parse_timestamp(end_us / 1e6))
+    yield f"event: replay_end\ndata: {codec.dumps({'at': end})}\n\n"
+
+
 @app.route('/api/stream')
 def api_stream():
+    # ?replay_from=<time>[&replay_to=<time>][&speed=N] plays history instead of following live
+    if request.args.get('replay_from') is not None:
+        start_us = _time_arg('replay_from')
+        end_us = _time_arg('replay_to') or now_epoch_us()
+        speed = request.args.get('speed', 1.0, type=float)
+        if start_us is None or end_us is None or not speed or speed <= 0:
+            return jsonify({'error': 'replay_from/replay_to must be ISO-8601 or epoch seconds, speed > 0'}), 400
+        return Response(_replay(start_us, end_us, speed), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    # Resume cursors from /api/bootstrap (or the last ids seen before a reconnect);
+    # without them the client starts with whatever arrives next
+    since = request.args.get('since', 0, type=int)
+    alerts_since = request.args.get('alerts_since', None, type=int)
+    # ?team=, ?session=, ?agent=, ?category=, ?tool= and ?q= limit what is sent
+    stream_filter = StreamFilter.from_args(request.args)
+
     def generate():
-        last_id = 0
-        last_heartbeat = time.time()
-
-        while True:
-            # Poll SSE bridge files
-            pending = get_pending_events()
-            for ev in pending:
-                ev_id = ev.get('id', 0)
-                if ev_id > last_id:
-                    last_id = ev_id
-                yield f"data: {json.dumps(ev)}\n\n"
-
-            # Fallback: poll DB for events newer than last_id
-            if last_id > 0:
+        sub = event_bus.subscribe(stream_filter)
+        metrics.gauge_add('team_monitor_sse_clients', 1)
+        last_id = since
+        last_alert_id = alerts_since or 0
+
+        try:
+            # Catch up from the client's cursors; anything the bus publishes
+            # meanwhile is queued and de-duplicated by id below
+            if since:
+                for batch in _batches(get_events_since, since):
+                    last_id = batch[-1]['id']
+                    yield _format_messages('event', stream_filter.select('event', batch))
+            if alerts_since is not None:
+                for batch in _batches(get_alerts_since, alerts_since):
+                    last_alert_id = batch[-1]['id']
+                    yield _format_messages('alert', stream_filter.select('alert', batch))
+
+            while not sub.dropped:
                 try:
-                    result = get_events(page=1, per_page=20)
-                    for ev in reversed(result.get('events', [])):
-                        ev_id = ev.get('id', 0)
-                        if ev_id > last_id:
-                            last_id = ev_id
-                            yield f"data: {json.dumps(ev)}\n\n"
-                except Exception:
-                    pass
-
-            # Heartbeat every 15 seconds
-            now = time.time()
-            if now - last_heartbeat >= 15:
-                yield ": heartbeat\n\n"
-                last_heartbeat = now
-
-            time.sleep(0.5)
-
-    return Response(
-        generate(),
-        mimetype='text/event-stream',
-        headers={
-            'Cache-Control': 'no-cache',
-            'X-Accel-Buffering': 'no',
-            'Connection': 'keep-alive',
-        },
-    )
+                    batches = [sub.queue.get(timeout=HEARTBEAT_INTERVAL)]
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                while True:
+                    try:
+                        batches.append(sub.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                events = []
+                alerts = []
+                for kind, items in batches:
+                    for item in items:
+                        if kind == 'event' and item['id'] > last_id:
+                            last_id = item['id']
+                            events.append(item)
+                        elif kind == 'alert' and item['id'] > last_alert_id:
+                            last_alert_id = item['id']
+                            alerts.append(item)
+                if events or alerts:
+                    yield _format_messages('event', events) + _format_messages('alert', alerts)
+        finally:
+            event_bus.unsubscribe(sub)
+            metrics.gauge_add('team_monitor_sse_clients', -1)
+
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+        'Connection': 'keep-alive',
+    }
+    stream = generate()
+    wants_compression = SSE_COMPRESS or request.args.get('compress') == '1'
+    if wants_compression and request.accept_encodings['gzip']:
+        stream = gzip_stream(stream)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+
+    return Response(stream, mimetype='text/event-stream', headers=headers)
 
 
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--port', type=int, default=5111)
+    parser.add_argument('--host', default='127.0.0.1')
     args = parser.parse_args()
     init_db()
-    app.run(host='127.0.0.1', port=args.port, debug=False, threaded=True)
+    event_bus.start()
+    maintenance.start()
+    federation.start()
+    hot_store.start()
+    backfill.start()
+    app.run(host=args.host, port=args.port, debug=False, threaded=True)
@@ -0,0 +1,79 @@
+"""Background transcript backfill for the dashboard server.
+
+Every CHECK_INTERVAL seconds the thread claims due jobs from the queue the
+SubagentStop hook fills (see core/backfill.py) and runs them on a pool of
+TEAM_MONITOR_BACKFILL_WORKERS threads (default 2). The limit holds across
+processes: a job is claimed in the database only while fewer than that many
+are running, so a detached scripts/backfill.py runner sharing the queue
+doesn't add to it. Under a multi-worker server only the event bus leader
+claims jobs. Progress is kept on the jobs themselves, for /api/backfill.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import metrics
+from core.backfill import MAX_RUNNING, claim, run_and_finish, worker_id
+from core.db import get_backfill_jobs
+from core.timeutil import now_timestamp
+from server.event_bus import event_bus
+
+CHECK_INTERVAL = 1
+
+
+class BackfillWorker:
+    """Runs queued transcript backfill jobs in the background."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pool = None
+        self.last_error = None
+
+    def start(self):
+        """Start the backfill thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._pool = ThreadPoolExecutor(max_workers=MAX_RUNNING, thread_name_prefix='team-monitor-backfill')
+            self._thread = threading.Thread(target=self._run, name='team-monitor-backfill', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(CHECK_INTERVAL)
+            if not event_bus.leader.held:
+                continue
+            self.tick()
+
+    def tick(self):
+        """Claim due jobs and hand them to the pool."""
+        try:
+            jobs = claim(worker_id())
+        except Exception as exc:
+            self.last_error = {'timestamp': now_timestamp(), 'error': f'claim: {exc}'}
+            return
+        for job in jobs:
+            self._pool.submit(self._run_job, job)
+
+    def _run_job(self, job):
+        try:
+            outcome = run_and_finish(job)
+        except Exception as exc:
+            # Recording the outcome failed; the lease hands the job on
+            self.last_error = {'timestamp': now_timestamp(), 'error': f'job {job["id"]}: {exc}'}
+            outcome = 'error'
+        metrics.inc('team_monitor_backfill_jobs_total', outcome=outcome)
+
+
+def get_status(status=None, limit=50):
+    """Queue counts by status and recent jobs, with this process's worker state."""
+    result = get_backfill_jobs(status=status, limit=limit)
+    result['max_running'] = MAX_RUNNING
+    result['worker'] = {'running': backfill._thread is not None, 'leader': event_bus.leader.held,
+                        'last_error': backfill.last_error}
+    return result
+
+
+backfill = BackfillWorker()
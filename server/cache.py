@@ -0,0 +1,168 @@
+"""Conditional GET and response caching for the read APIs.
+
+Read endpoints are functions of the events ingested and the alerts raised
+so far, so the max event id, max alert id and max event revision id (a
+duration filled in on a stored event) together validate them. Alerts and
+revisions need their own marks: neither adds an event. Endpoints that also depend on the wall clock pass a ttl. Finding
+the marks is cheap: the database files' size/mtime only change when
+something is written, so Watermark.current() normally costs two stat()
+calls and only queries SQLite after a write.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request
+from werkzeug.http import http_date
+
+from core import metrics
+from core.db import get_db_path, get_write_marks
+from server.compression import MIN_SIZE, compress, negotiate_encoding
+
+# Number of distinct (endpoint, query) responses kept in memory
+CACHE_SIZE = 256
+
+
+class Watermark:
+    """Tracks the ingest watermark (max event id), alerts and event revisions with a stat-based fast path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self.generation = 0
+        self.alert_id = 0
+        self.revision_id = 0
+        self.last_modified = time.time()
+
+    def _file_signature(self):
+        db_path = get_db_path()
+        sig = []
+        for path in (db_path, db_path + '-wal'):
+            try:
+                st = os.stat(path)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def current(self):
+        """Return the current generation (max event id), querying the DB only if files changed."""
+        self._refresh()
+        return self.generation
+
+    def validator(self):
+        """Return a tag that changes whenever an event, alert or revision is written."""
+        self._refresh()
+        return f'g{self.generation}-a{self.alert_id}-r{self.revision_id}'
+
+    def revision(self):
+        """Return the max event revision id."""
+        self._refresh()
+        return self.revision_id
+
+    def _refresh(self):
+        signature = self._file_signature()
+        with self._lock:
+            if signature == self._signature:
+                return
+            marks = get_write_marks()
+            if marks != (self.generation, self.alert_id, self.revision_id):
+                self.generation, self.alert_id, self.revision_id = marks
+                self.last_modified = time.time()
+            self._signature = signature
+
+
+class ResponseCache:
+    """Small LRU of (content encoding, body) responses, each tagged with the generation it was built at."""
+
+    def __init__(self, size=CACHE_SIZE):
+        self._size = size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, generation, body):
+        with self._lock:
+            self._entries[key] = (generation, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+
+watermark = Watermark()
+response_cache = ResponseCache()
+
+
+def _not_modified(etag, last_modified, use_date):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if use_date and request.if_modified_since:
+        return int(last_modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def cached_json(ttl=None):
+    """Decorator for JSON read endpoints: ETag/Last-Modified validation plus LRU caching.
+
+    Responses are keyed on the request path, query string and content
+    encoding, and invalidated when an event, alert or revision is written.
+    The compressed body is cached too, so a hit isn't compressed again.
+    Endpoints whose output also depends on
+    the wall clock (e.g. "events in the last minute") pass a ttl in seconds
+    so the validator rolls over at least that often.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            tag = watermark.validator()
+            if ttl:
+                tag += f'-t{int(time.time() // ttl)}'
+            last_modified = watermark.last_modified
+
+            if _not_modified(tag, last_modified, use_date=not ttl):
+                metrics.inc('team_monitor_read_api_total', result='not_modified')
+                response = Response(status=304)
+            else:
+                key = request.full_path
+                encoding = negotiate_encoding()
+                entry = response_cache.get((key, encoding), tag)
+                if entry is None:
+                    entry = response_cache.get((key, None), tag)
+                    if entry is None:
+                        result = view(*args, **kwargs)
+                        if isinstance(result, tuple) or result.status_code != 200:
+                            return result
+                        entry = (None, result.get_data())
+                        response_cache.put((key, None), tag, entry)
+                        metrics.inc('team_monitor_read_api_total', result='miss')
+                    else:
+                        metrics.inc('team_monitor_read_api_total', result='cache_hit')
+                    if encoding is not None:
+                        # Small bodies aren't worth compressing; the cached entry says which it is
+                        if len(entry[1]) >= MIN_SIZE:
+                            entry = (encoding, compress(entry[1], encoding))
+                        response_cache.put((key, encoding), tag, entry)
+                else:
+                    metrics.inc('team_monitor_read_api_total', result='cache_hit')
+                content_encoding, body = entry
+                response = Response(body, mimetype='application/json')
+                if content_encoding is not None:
+                    # compress_response() leaves responses that already have an encoding alone
+                    response.headers['Content-Encoding'] = content_encoding
+
+            response.set_etag(tag, weak=True)
+            response.headers['Last-Modified'] = http_date(last_modified)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
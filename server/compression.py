@@ -0,0 +1,140 @@
+"""Response compression and fingerprinted static assets.
+
+JSON responses above MIN_SIZE are compressed with brotli (when the brotli
+package is installed and the client accepts it) or gzip. Static assets are
+fingerprinted with a content hash and precompressed once at startup, so
+they can be served with a year-long immutable cache lifetime. The SSE
+stream can optionally be gzip-compressed with a sync flush per message.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import zlib
+
+from flask import Response, abort, request
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Responses smaller than this aren't worth compressing
+MIN_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Only text-like assets are precompressed
+_COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.html', '.svg', '.json', '.txt')
+
+_assets = {}         # logical path -> fingerprinted path
+_asset_bodies = {}   # fingerprinted path -> {'identity': bytes, 'gzip': bytes, 'br': bytes}
+
+
+def negotiate_encoding(min_quality=0):
+    """Return the best content encoding the client accepts ('br', 'gzip' or None)."""
+    accept = request.accept_encodings
+    if brotli is not None and accept['br'] > min_quality:
+        return 'br'
+    if accept['gzip'] > min_quality:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    """Compress bytes with the given encoding."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response):
+    """after_request hook: compress large JSON responses when the client accepts it."""
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200
+            or response.is_streamed
+            or response.direct_passthrough
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_SIZE:
+        return response
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# ---- Fingerprinted static assets ----
+
+def build_assets(static_folder):
+    """Fingerprint and precompress every file under static_folder."""
+    _assets.clear()
+    _asset_bodies.clear()
+    for dirpath, _dirnames, filenames in os.walk(static_folder):
+        for name in filenames:
+            full = os.path.join(dirpath, name)
+            logical = os.path.relpath(full, static_folder).replace(os.sep, '/')
+            with open(full, 'rb') as f:
+                body = f.read()
+            digest = hashlib.sha256(body).hexdigest()[:12]
+            stem, ext = os.path.splitext(logical)
+            fingerprinted = f'{stem}.{digest}{ext}'
+
+            bodies = {'identity': body}
+            if ext in _COMPRESSIBLE_EXTENSIONS:
+                bodies['gzip'] = gzip.compress(body, compresslevel=9)
+                if brotli is not None:
+                    bodies['br'] = brotli.compress(body, quality=11)
+            _assets[logical] = fingerprinted
+            _asset_bodies[fingerprinted] = bodies
+
+
+def asset_url(logical_path):
+    """Template helper: URL of the fingerprinted copy of a static file."""
+    fingerprinted = _assets.get(logical_path)
+    if fingerprinted is None:
+        return '/static/' + logical_path
+    return '/assets/' + fingerprinted
+
+
+def serve_asset(fingerprinted_path):
+    """Serve a fingerprinted asset, precompressed if the client accepts it."""
+    bodies = _asset_bodies.get(fingerprinted_path)
+    if bodies is None:
+        abort(404)
+
+    encoding = negotiate_encoding()
+    if encoding not in bodies:
+        encoding = 'gzip' if 'gzip' in bodies and request.accept_encodings['gzip'] else None
+
+    mimetype = mimetypes.guess_type(fingerprinted_path)[0] or 'application/octet-stream'
+    response = Response(bodies[encoding or 'identity'], mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+# ---- Streams ----
+
+def gzip_stream(chunks):
+    """Gzip a generator of text chunks, flushing after each so messages arrive immediately.
+
+    Finite streams (exports, replays) end with the gzip trailer.
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
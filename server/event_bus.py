@@ -0,0 +1,242 @@
+"""In-process event bus for the dashboard server.
+
+A single background thread follows the ingest log by id, runs the anomaly
+detector over every new event, and fans events and alerts out to all
+connected SSE clients, each getting only what its stream filter selects
+(see server/stream_filter.py). The database is the source of truth; the hooks'
+bridge files are drained only as a wakeup signal, so concurrent clients no
+longer race each other for notifications and the detector runs whether or
+not anyone is watching.
+
+Under a multi-worker server every worker runs its own bus, and all of them
+follow the same database. One of them holds a lock file and is the leader:
+only it stores detector alerts and drains the bridge files. The others run
+the detector too, so their state is warm if the leader exits (e.g. during a
+graceful reload), but discard what it raises; alerts reach every worker's
+clients by being read back from the database.
+
+A failure is logged and counted in team_monitor_event_bus_errors_total
+without stopping the bus: a listener or detector error skips only that
+listener or event, and a batch once read is never read again.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from core import metrics
+from core.db import (
+    get_alerts_since, get_db_path, get_events_since, get_max_alert_id, get_max_event_id, insert_alerts,
+)
+from core.detector import AnomalyDetector
+from core.sse_bridge import get_pending_events
+from server.cache import watermark
+from server.stream_filter import ALL
+
+POLL_INTERVAL = 0.5
+STALL_CHECK_INTERVAL = 15
+BATCH_SIZE = 500
+
+# A client this many batches behind is disconnected; it resumes from its cursor on reconnect
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# How often a follower tries to take over leadership
+LEADER_RETRY_INTERVAL = 5
+
+log = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """An exclusive, non-blocking lock file held by at most one process.
+
+    The OS releases it when the holder exits, however it exits. Without
+    fcntl (Windows, where the server is single-process) it always succeeds.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def try_acquire(self):
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            self._fd = -1
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode('ascii'))
+        self._fd = fd
+        return True
+
+
+class Subscription:
+    """One client's queue of (kind, items) batches, kind being 'event' or 'alert'."""
+
+    def __init__(self, stream_filter=ALL):
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.filter = stream_filter
+        self.dropped = False
+
+
+class EventBus:
+    """Polls the database for new events/alerts and publishes them to subscribers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # filter key -> (StreamFilter, set of Subscriptions using it)
+        self._groups = {}
+        self._thread = None
+        self.leader = LeaderLock(os.path.join(os.path.dirname(get_db_path()), 'event_bus.lock'))
+        self.detector = AnomalyDetector()
+        self.event_cursor = 0
+        self.alert_cursor = 0
+        # Callables taking (after_id, events) for every batch of new events read
+        self.listeners = []
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the polling thread (idempotent). Only events after this point are published."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.event_cursor = get_max_event_id()
+            self.alert_cursor = get_max_alert_id()
+            self._thread = threading.Thread(target=self._run, name='team-monitor-event-bus', daemon=True)
+            self._thread.start()
+
+    def subscribe(self, stream_filter=ALL):
+        self.start()
+        sub = Subscription(stream_filter)
+        with self._lock:
+            self._groups.setdefault(stream_filter.key, (stream_filter, set()))[1].add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            group = self._groups.get(sub.filter.key)
+            if group is not None:
+                group[1].discard(sub)
+                if not group[1]:
+                    del self._groups[sub.filter.key]
+
+    def _publish(self, kind, items):
+        with self._lock:
+            groups = [(stream_filter, list(subscribers)) for stream_filter, subscribers in self._groups.values()]
+        for stream_filter, subscribers in groups:
+            selected = stream_filter.select(kind, items)
+            if len(selected) < len(items):
+                metrics.inc('team_monitor_sse_filtered_total', (len(items) - len(selected)) * len(subscribers),
+                            kind=kind)
+            if not selected:
+                continue
+            for sub in subscribers:
+                try:
+                    sub.queue.put_nowait((kind, selected))
+                except queue.Full:
+                    sub.dropped = True
+                    self.unsubscribe(sub)
+
+    def _run(self):
+        last_generation = None
+        last_stall_check = time.time()
+        last_leader_attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                if not self.leader.held and time.time() - last_leader_attempt >= LEADER_RETRY_INTERVAL:
+                    last_leader_attempt = time.time()
+                    self.leader.try_acquire()
+                # Followers notice writes (the leader's alerts too) through the watermark alone
+                woken = self.leader.held and bool(get_pending_events())
+                generation = watermark.validator()
+                if woken or generation != last_generation:
+                    self._pump_events()
+                    # Only once caught up, so a failed read is retried on the next poll
+                    last_generation = generation
+
+                now = time.time()
+                if now - last_stall_check >= STALL_CHECK_INTERVAL:
+                    last_stall_check = now
+                    self._raise(self.detector.check_stalls())
+            except Exception:
+                self._failed('poll')
+            metrics.observe('team_monitor_sse_poll_seconds', time.perf_counter() - start)
+            time.sleep(POLL_INTERVAL)
+
+    def _pump_events(self):
+        while True:
+            events = get_events_since(self.event_cursor, limit=BATCH_SIZE)
+            if not events:
+                break
+            after_id = self.event_cursor
+            # Move on first: whatever fails below, this batch is not read again
+            self.event_cursor = events[-1]['id']
+            alerts = []
+            for ev in events:
+                try:
+                    alerts.extend(self.detector.observe(ev))
+                except Exception:
+                    self._failed('detector', f'event {ev["id"]}')
+                # Only the detector needs the full command; the summary goes to clients
+                ev.pop('command', None)
+            for listener in self.listeners:
+                try:
+                    listener(after_id, events)
+                except Exception:
+                    self._failed('listener', getattr(listener, '__qualname__', repr(listener)))
+            self._publish('event', events)
+            self._store_alerts(alerts)
+            if len(events) < BATCH_SIZE:
+                break
+        self._pump_alerts()
+
+    def _failed(self, stage, context=''):
+        """Log and count the exception being handled."""
+        metrics.inc('team_monitor_event_bus_errors_total', stage=stage)
+        log.exception('event bus %s failed%s', stage, f' ({context})' if context else '')
+
+    def _raise(self, alerts):
+        if alerts:
+            self._store_alerts(alerts)
+            self._pump_alerts()
+
+    def _store_alerts(self, alerts):
+        if not alerts or not self.leader.held:
+            return
+        insert_alerts(alerts)
+        for alert in alerts:
+            metrics.inc('team_monitor_alerts_total', kind=alert['kind'])
+
+    def _pump_alerts(self):
+        while True:
+            alerts = get_alerts_since(self.alert_cursor, limit=BATCH_SIZE)
+            if not alerts:
+                break
+            self.alert_cursor = alerts[-1]['id']
+            self._publish('alert', alerts)
+            if len(alerts) < BATCH_SIZE:
+                break
+
+
+event_bus = EventBus()
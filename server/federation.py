@@ -0,0 +1,127 @@
+"""Background federation for the dashboard server.
+
+Configured through the environment:
+
+- TEAM_MONITOR_SHIP_TO: ship this node's events to an aggregator, given
+  as its URL (http://aggregator:5111) or a shared directory
+- TEAM_MONITOR_FEDERATION_TOKEN: shared secret for HTTP shipping; an
+  aggregator only accepts shipped events when it is set
+- TEAM_MONITOR_FEDERATION_DIR: on an aggregator, collect batch files that
+  nodes ship into this directory
+- TEAM_MONITOR_NODE: this node's id (default: the hostname)
+
+Every CHECK_INTERVAL seconds the thread ships until caught up and collects
+new batch files. Under a multi-worker server only the event bus leader
+does this. It writes its state to data/federation.json so any worker can
+serve /api/federation/status.
+"""
+
+import os
+import threading
+import time
+
+from core import codec
+from core.db import get_db_path, get_import_sources
+from core.federation import NODE_ID, SOURCE_PREFIX, Collector, Shipper, make_target
+from core.timeutil import now_timestamp
+from server.event_bus import event_bus
+
+CHECK_INTERVAL = 2
+
+# Batches shipped per tick, so a large backlog doesn't starve collecting
+MAX_BATCHES_PER_TICK = 20
+
+SHIP_TO = os.environ.get('TEAM_MONITOR_SHIP_TO') or None
+COLLECT_DIR = os.environ.get('TEAM_MONITOR_FEDERATION_DIR') or None
+TOKEN = os.environ.get('TEAM_MONITOR_FEDERATION_TOKEN') or None
+
+STATUS_FILE = os.path.join(os.path.dirname(get_db_path()), 'federation.json')
+
+
+class FederationWorker:
+    """Ships to and collects from other nodes in the background."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.shipper = Shipper(make_target(SHIP_TO, token=TOKEN)) if SHIP_TO else None
+        self.collector = Collector(COLLECT_DIR) if COLLECT_DIR else None
+        self.shipped = 0
+        self.collected = 0
+        self.last_error = None
+
+    @property
+    def enabled(self):
+        return self.shipper is not None or self.collector is not None
+
+    def start(self):
+        """Start the federation thread if shipping or collecting is configured (idempotent)."""
+        with self._lock:
+            if self._thread is not None or not self.enabled:
+                return
+            self._thread = threading.Thread(target=self._run, name='team-monitor-federation', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(CHECK_INTERVAL)
+            if not event_bus.leader.held:
+                continue
+            self.tick()
+
+    def tick(self):
+        """Ship and collect whatever is pending."""
+        error = None
+        if self.shipper is not None:
+            try:
+                self.shipped += self.shipper.ship_all(max_batches=MAX_BATCHES_PER_TICK)
+            except Exception as exc:
+                error = f'ship: {exc}'
+        if self.collector is not None:
+            try:
+                self.collected += sum(self.collector.collect_once().values())
+            except Exception as exc:
+                error = f'collect: {exc}'
+        if error:
+            self.last_error = {'timestamp': now_timestamp(), 'error': error}
+        self._write_status()
+
+    def _write_status(self):
+        status = {
+            'pid': os.getpid(),
+            'updated': now_timestamp(),
+            'ship_to': str(self.shipper.target) if self.shipper else None,
+            'shipped_position': self.shipper.position if self.shipper else None,
+            'shipped': self.shipped,
+            'collect_dir': COLLECT_DIR,
+            'collected': self.collected,
+            'last_error': self.last_error,
+        }
+        tmp = STATUS_FILE + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(codec.dumps(status))
+        os.replace(tmp, STATUS_FILE)
+
+
+def get_status():
+    """This node's id and shipping state, plus every node that has shipped events here."""
+    try:
+        with open(STATUS_FILE, 'rb') as f:
+            worker = codec.loads(f.read())
+    except (OSError, codec.JSONDecodeError):
+        worker = None
+    peers = [{
+        'node': source['path'][len(SOURCE_PREFIX):],
+        'last_id': source['byte_offset'],
+        'event_count': source['event_count'],
+        'last_received': source['imported_at'],
+    } for source in get_import_sources(SOURCE_PREFIX)]
+    return {
+        'node': NODE_ID,
+        'accepts_http': TOKEN is not None,
+        'worker': worker,
+        'peers': peers,
+    }
+
+
+federation = FederationWorker()
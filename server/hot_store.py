@@ -0,0 +1,687 @@
+"""In-memory hot tier of recent events for the dashboard server.
+
+Nearly every feed read is for the newest few pages, so the server keeps
+the most recent events in compact columnar form and answers /api/events
+(and the event page of /api/bootstrap) from memory:
+
+- one typed array per numeric column (id, ts_us, duration, error flag)
+- agent, team, tool, category, hook, session and node as integer codes
+  into one shared string dictionary
+- summaries as UTF-8 in a single bytearray, with an end-offset array
+- timestamps regenerated from ts_us (the few that aren't in the stored
+  format are kept as-is)
+- a posting list per agent, tool, category, team and session value: the
+  positions of its events in time order, so a filtered page only visits
+  matching rows
+
+Events are held in (ts_us, id) order, the feed's order. The store always
+holds every event at or after its floor, the oldest event it keeps;
+events arriving slightly out of order wait in a small pending list that
+is merged in once it fills. Totals come from per-team counts of each
+(session, category, agent, tool) over the held events, so a team's page
+only sums that team's counts, plus one SQLite count of the stored events
+the store doesn't hold (older than the floor, or untimed). That count is
+cached per filter until the floor moves or an event lands outside it. A
+query that reaches past the floor, or deeper than MAX_DEPTH rows, falls
+back to SQLite.
+
+The dictionary is reference-counted: once no held event uses a value it
+is dropped and its code reused, so memory follows the held events rather
+than every value ever seen. Sizes are tracked as events come and go.
+
+Holds up to TEAM_MONITOR_HOT_EVENTS events (default 1,000,000; 0
+disables it) and at most TEAM_MONITOR_HOT_MB of arrays (default 256),
+evicting the oldest in chunks. It loads in the background at startup and
+follows the event bus afterwards, catching up from the database itself
+when a request finds it behind. A duration filled in on an event after it
+was stored (a live copy arriving after its transcript copy), or a team
+assigned to events stored before their session's team was known, is
+picked up from the event_revisions log the same way. /api/hot reports its size and memory per event.
+"""
+
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate, islice
+from datetime import timedelta
+
+from core import metrics
+from core.db import (
+    count_events_outside, get_event_revisions, get_events_since, get_write_marks, iter_recent_events,
+)
+from core.timeutil import EPOCH, format_timestamp, to_epoch_us
+from server.cache import watermark
+from server.event_bus import event_bus
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, '') or default)
+    except ValueError:
+        return default
+
+
+CAPACITY = _env_int('TEAM_MONITOR_HOT_EVENTS', 1000000)
+MAX_BYTES = _env_int('TEAM_MONITOR_HOT_MB', 256) * 1024 * 1024
+
+# Deepest row (page * per_page) served from memory
+MAX_DEPTH = 10000
+
+# Out-of-order events held aside before being merged into the arrays
+PENDING_MAX = 4096
+
+# Fraction of the store evicted at once when it is full
+EVICT_FRACTION = 0.05
+
+SYNC_BATCH = 1000
+
+# String columns stored as dictionary codes, in record order
+DIMS = ('session_id', 'team_name', 'agent_name', 'hook_event', 'tool_name', 'event_category', 'node')
+# Dimensions with posting lists (the feed's filters)
+INDEXED = ('event_category', 'agent_name', 'tool_name', 'team_name', 'session_id')
+_DIM_INDEX = {dim: i for i, dim in enumerate(DIMS)}
+_NAN = float('nan')
+
+# Filter combinations whose count outside the store is kept between evictions
+OUTSIDE_CACHED = 256
+
+# Estimated bytes per odd timestamp, NULL summary, pending event and count key
+_ODD_TIMESTAMP_BYTES = 144
+_NULL_SUMMARY_BYTES = 64
+_PENDING_BYTES = 400
+_COUNT_KEY_BYTES = 200
+
+
+_second_cache = (None, None)
+
+
+def _canonical_timestamp(ts_us):
+    """format_timestamp() of an epoch-microsecond time (consecutive events mostly share a second)."""
+    global _second_cache
+    seconds, us = divmod(ts_us, 1000000)
+    cached_seconds, prefix = _second_cache
+    if cached_seconds != seconds:
+        prefix = format_timestamp(EPOCH + timedelta(seconds=seconds))[:-4]
+        _second_cache = (seconds, prefix)
+    return f'{prefix}{us // 1000:03d}Z'
+
+
+def _is_canonical(timestamp):
+    """Whether a stored timestamp is in the format _canonical_timestamp() regenerates."""
+    return (isinstance(timestamp, str) and len(timestamp) == 24 and timestamp[-1] == 'Z'
+            and timestamp[19] == '.' and timestamp[10] == 'T')
+
+
+class HotStore:
+    """Columnar store of the newest events, with posting lists for the feed filters."""
+
+    def __init__(self, capacity=CAPACITY, max_bytes=MAX_BYTES):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._thread = None
+        self.ready = False
+        self.last_id = 0
+        self.revision_id = 0
+        self.load_seconds = None
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._strings = [None]
+        self._codes = {None: 0}
+        self._refs = array('I', [0])  # code -> held events (and pending ones) using it
+        self._free = []  # codes of dropped values, reused first
+        self._unused = set()  # codes whose references fell to 0, dropped by _sweep()
+        self._string_bytes = 0
+        # team_name -> (session_id, event_category, agent_name, tool_name) -> count over the held events
+        self._counts = {}
+        self._count_keys = 0
+        # (team, session, category, agent, tool) -> stored events matching it that aren't held
+        self._outside = {}
+        self._clear()
+
+    def _clear(self):
+        self._base = 0  # absolute position of index 0
+        self._ids = array('q')
+        self._ts = array('q')
+        self._duration = array('d')
+        self._error = array('b')
+        self._dims = [array('I') for _ in DIMS]
+        self._summary = bytearray()
+        self._summary_end = array('Q')
+        self._summary_base = 0
+        self._odd_timestamps = {}  # absolute position -> stored timestamp not in the canonical format
+        self._null_summaries = set()  # absolute positions whose summary is NULL rather than ''
+        self._postings = {dim: {} for dim in INDEXED}  # dim -> code -> array of absolute positions
+        self._pending = []
+        self._floor = None  # (ts_us, id) of the oldest event held; None while everything is held
+
+    # ---- Lifecycle ----
+
+    def start(self):
+        """Load the newest events in the background and follow the event bus (idempotent)."""
+        with self._lock:
+            if self._thread is not None or self.capacity <= 0:
+                return
+            event_bus.listeners.append(self.absorb)
+            self._thread = threading.Thread(target=self._load, name='team-monitor-hot-store', daemon=True)
+            self._thread.start()
+
+    def _load(self):
+        # Built off to the side, so requests keep falling back to SQLite meanwhile rather than wait
+        start = time.perf_counter()
+        fresh = HotStore(self.capacity, self.max_bytes)
+        # Revisions from here on are applied by sync(); applying one twice is harmless
+        max_id, _, revision_id = get_write_marks()
+        for batch in iter_recent_events(max_id, self.capacity):
+            fresh._extend(batch)
+        if len(fresh._ids) >= self.capacity:
+            fresh._floor = (fresh._ts[0], fresh._ids[0])
+        fresh._evict_if_full()
+        with self._lock:
+            for name, value in vars(fresh).items():
+                if name not in ('_lock', '_thread', 'hits', 'misses'):
+                    setattr(self, name, value)
+            self.last_id = max_id
+            self.revision_id = revision_id
+            self.ready = True
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            self.sync()
+        self._report()
+
+    # ---- Ingest ----
+
+    def absorb(self, after_id, events):
+        """Event bus listener: take in events it read after after_id (ignored unless contiguous)."""
+        with self._lock:
+            if self.ready and after_id == self.last_id:
+                self._add_events(events)
+        self._report()
+
+    def sync(self, until_id=None):
+        """Catch up with the database (up to until_id). Returns the id the store is current to."""
+        with self._lock:
+            if not self.ready:
+                return None
+            target = watermark.current() if until_id is None else until_id
+            while self.last_id < target:
+                events = get_events_since(self.last_id, limit=SYNC_BATCH)
+                events = [ev for ev in events if ev['id'] <= target]
+                if not events:
+                    # Nothing else was committed up to target
+                    self.last_id = target
+                    break
+                self._add_events(events)
+            if watermark.revision() > self.revision_id:
+                self._apply_revisions()
+            return self.last_id
+
+    def _apply_revisions(self):
+        """Update held events changed after they were stored: a duration filled in, or a team assigned."""
+        team_dim = _DIM_INDEX['team_name']
+        while True:
+            revisions = get_event_revisions(self.revision_id, limit=SYNC_BATCH)
+            for rev in revisions:
+                self.revision_id = rev['revision']
+                moved = rev['team_from'] is not None and rev['team_from'] != rev['team_name']
+                held = False
+                if rev['ts_us'] is not None:
+                    duration = _NAN if rev['duration_ms'] is None else rev['duration_ms']
+                    i = self._index_of(rev['ts_us'], rev['id'])
+                    if i < len(self._ids) and self._ids[i] == rev['id']:
+                        held = True
+                        self._duration[i] = duration
+                        if moved:
+                            self._recode_team(self._base + i, rev['team_name'])
+                    for j, record in enumerate(() if held else self._pending):
+                        if record[1] == rev['id']:
+                            held = True
+                            codes = record[3]
+                            if moved and self._strings[codes[team_dim]] != rev['team_name']:
+                                self._move_count(codes, rev['team_name'])
+                                codes = codes[:team_dim] + (self._code(rev['team_name']),) + codes[team_dim + 1:]
+                                self._retain(codes[team_dim])
+                                self._release(record[3][team_dim])
+                            self._pending[j] = record[:3] + (codes, record[4], rev['duration_ms']) + record[6:]
+                if moved and not held and rev['id'] <= self.last_id:
+                    self._outside.clear()
+            if len(revisions) < SYNC_BATCH:
+                break
+        self._sweep()
+
+    def _count(self, team, key, n):
+        """Add n (possibly negative) held events to a team's (session, category, agent, tool) count."""
+        counts = self._counts.setdefault(team, {})
+        count = counts.get(key, 0) + n
+        if count > 0:
+            self._count_keys += key not in counts
+            counts[key] = count
+        else:
+            self._count_keys -= key in counts
+            counts.pop(key, None)
+            if not counts:
+                del self._counts[team]
+
+    def _count_codes(self, codes, n):
+        strings = self._strings
+        self._count(strings[codes[1]], (strings[codes[0]], strings[codes[5]], strings[codes[2]], strings[codes[4]]), n)
+
+    def _move_count(self, codes, team):
+        """Move a held event (by its codes) from its team's counts to another team's."""
+        self._count_codes(codes, -1)
+        strings = self._strings
+        self._count(team, (strings[codes[0]], strings[codes[5]], strings[codes[2]], strings[codes[4]]), 1)
+
+    def _recode_team(self, pos, team):
+        """Give the held event at an absolute position a new team, moving it between posting lists."""
+        column = self._dims[_DIM_INDEX['team_name']]
+        i = pos - self._base
+        old, new = column[i], self._code(team)
+        if old == new:
+            return
+        self._move_count(tuple(c[i] for c in self._dims), team)
+        self._retain(new)
+        self._release(old)
+        column[i] = new
+        postings = self._postings['team_name']
+        positions = postings.get(old)
+        if positions is not None:
+            k = bisect_left(positions, pos)
+            if k < len(positions) and positions[k] == pos:
+                del positions[k]
+            if not positions:
+                del postings[old]
+        positions = postings.get(new)
+        if positions is None:
+            positions = postings[new] = array('q')
+        positions.insert(bisect_left(positions, pos), pos)
+
+    def _add_events(self, events):
+        for ev in events:
+            ts_us = to_epoch_us(ev.get('timestamp'))
+            self.last_id = ev['id']
+            record_key = (ts_us, ev['id'])
+            if ts_us is None or (self._floor is not None and record_key < self._floor):
+                # Counted by SQLite with the rest of the events the store doesn't hold
+                self._outside.clear()
+                continue
+            self._count(ev.get('team_name'),
+                        (ev.get('session_id'), ev.get('event_category'), ev.get('agent_name'), ev.get('tool_name')), 1)
+            dims = tuple(ev.get(dim) for dim in DIMS)
+            duration = ev.get('duration_ms')
+            if not self._ids or record_key > (self._ts[-1], self._ids[-1]):
+                self._append(ev['id'], ts_us, ev.get('timestamp'), dims, ev.get('summary'), duration,
+                             ev.get('is_error'))
+            else:
+                codes = tuple(self._code(v) for v in dims)
+                for code in codes:
+                    self._retain(code)
+                self._pending.append((ts_us, ev['id'], ev.get('timestamp'), codes, ev.get('summary'), duration,
+                                      ev.get('is_error')))
+                if len(self._pending) > PENDING_MAX:
+                    self._merge_pending()
+        self._evict_if_full()
+
+    def _code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            if self._free:
+                code = self._free.pop()
+                self._strings[code] = value
+            else:
+                code = len(self._strings)
+                self._strings.append(value)
+                self._refs.append(0)
+            self._codes[value] = code
+            self._string_bytes += sys.getsizeof(value)
+        return code
+
+    def _retain(self, code, n=1):
+        self._refs[code] += n
+
+    def _release(self, code, n=1):
+        self._refs[code] -= n
+        if not self._refs[code] and code:
+            self._unused.add(code)
+
+    def _release_columns(self, start, stop):
+        """Release the codes of the held events in index range [start, stop)."""
+        for column in self._dims:
+            for code, n in Counter(column[start:stop]).items():
+                self._release(code, n)
+
+    def _sweep(self):
+        """Drop the values no held event uses any more, freeing their codes for reuse."""
+        for code in self._unused:
+            if not self._refs[code]:
+                value = self._strings[code]
+                del self._codes[value]
+                self._strings[code] = None
+                self._string_bytes -= sys.getsizeof(value)
+                self._free.append(code)
+        self._unused.clear()
+
+    def _append(self, event_id, ts_us, timestamp, dims, summary, duration, is_error, coded=False):
+        pos = self._base + len(self._ids)
+        self._ids.append(event_id)
+        self._ts.append(ts_us)
+        self._duration.append(_NAN if duration is None else duration)
+        self._error.append(1 if is_error else 0)
+        for i, value in enumerate(dims):
+            code = value if coded else self._code(value)
+            self._refs[code] += 1
+            self._dims[i].append(code)
+            if DIMS[i] in self._postings:
+                postings = self._postings[DIMS[i]]
+                positions = postings.get(code)
+                if positions is None:
+                    positions = postings[code] = array('q')
+                positions.append(pos)
+        if not _is_canonical(timestamp):
+            self._odd_timestamps[pos] = timestamp
+        self._summary += (summary or '').encode('utf-8')
+        self._summary_end.append(self._summary_base + len(self._summary))
+        if summary is None:
+            self._null_summaries.add(pos)
+
+    def _extend(self, rows):
+        """Bulk _append() for HOT_COLUMNS rows already in (ts_us, id) order."""
+        first = self._base + len(self._ids)
+        self._ids.extend(row[0] for row in rows)
+        self._ts.extend(row[1] for row in rows)
+        self._duration.extend(_NAN if row[10] is None else row[10] for row in rows)
+        self._error.extend(1 if row[11] else 0 for row in rows)
+        known = self._codes.get
+        for i, column in enumerate((3, 4, 5, 6, 7, 8, 12)):
+            codes = [known(row[column]) or self._code(row[column]) for row in rows]
+            for code, n in Counter(codes).items():
+                self._retain(code, n)
+            self._dims[i].extend(codes)
+            if DIMS[i] in self._postings:
+                postings = self._postings[DIMS[i]]
+                for pos, code in enumerate(codes, first):
+                    positions = postings.get(code)
+                    if positions is None:
+                        positions = postings[code] = array('q')
+                    positions.append(pos)
+        for pos, row in enumerate(rows, first):
+            if not _is_canonical(row[2]):
+                self._odd_timestamps[pos] = row[2]
+            if row[9] is None:
+                self._null_summaries.add(pos)
+        for (team, session, category, agent, tool), n in Counter((row[4], row[3], row[8], row[5], row[7])
+                                                                 for row in rows).items():
+            self._count(team, (session, category, agent, tool), n)
+        encoded = [(row[9] or '').encode('utf-8') for row in rows]
+        start = self._summary_base + len(self._summary)
+        self._summary += b''.join(encoded)
+        self._summary_end.extend(start + end for end in accumulate(len(b) for b in encoded))
+
+    def _merge_pending(self):
+        """Fold the pending events into the arrays by rebuilding the tail from the oldest one on."""
+        pending = sorted(self._pending)
+        self._pending = []
+        start = self._index_of(pending[0][0], pending[0][1])
+        tail = [self._record(self._base + i) for i in range(start, len(self._ids))]
+        self._truncate(start)
+        merged = sorted(tail + pending)
+        for ts_us, event_id, timestamp, codes, summary, duration, is_error in merged:
+            self._append(event_id, ts_us, timestamp, codes, summary, duration, is_error, coded=True)
+        for record in pending:
+            for code in record[3]:
+                self._release(code)
+
+    def _index_of(self, ts_us, event_id):
+        """Index of the first held event at or after (ts_us, event_id)."""
+        i = bisect_left(self._ts, ts_us)
+        while i < len(self._ids) and self._ts[i] == ts_us and self._ids[i] < event_id:
+            i += 1
+        return i
+
+    def _truncate(self, index):
+        """Drop the held events from index on."""
+        cut = self._base + index
+        self._release_columns(index, len(self._ids))
+        del self._ids[index:]
+        del self._ts[index:]
+        del self._duration[index:]
+        del self._error[index:]
+        for column in self._dims:
+            del column[index:]
+        summary_end = self._summary_end[index - 1] if index else self._summary_base
+        del self._summary[summary_end - self._summary_base:]
+        del self._summary_end[index:]
+        for postings in self._postings.values():
+            for code in list(postings):
+                positions = postings[code]
+                del positions[bisect_left(positions, cut):]
+                if not positions:
+                    del postings[code]
+        self._odd_timestamps = {pos: v for pos, v in self._odd_timestamps.items() if pos < cut}
+        self._null_summaries = {pos for pos in self._null_summaries if pos < cut}
+
+    def _evict_if_full(self):
+        excess = len(self._ids) - self.capacity
+        if excess > 0 or self.memory_bytes() > self.max_bytes:
+            count = min(len(self._ids), max(excess, int(len(self._ids) * EVICT_FRACTION), 1))
+            self._evict(count)
+        self._sweep()
+
+    def _evict(self, count):
+        """Drop the `count` oldest events; the floor moves up past them."""
+        cut = self._base + count
+        for codes, n in Counter(zip(*(column[:count] for column in self._dims))).items():
+            self._count_codes(codes, -n)
+        self._release_columns(0, count)
+        self._outside.clear()
+        del self._ids[:count]
+        del self._ts[:count]
+        del self._duration[:count]
+        del self._error[:count]
+        for column in self._dims:
+            del column[:count]
+        summary_start = self._summary_end[count - 1]
+        del self._summary[:summary_start - self._summary_base]
+        self._summary_base = summary_start
+        del self._summary_end[:count]
+        for postings in self._postings.values():
+            for code in list(postings):
+                positions = postings[code]
+                del positions[:bisect_left(positions, cut)]
+                if not positions:
+                    del postings[code]
+        self._odd_timestamps = {pos: v for pos, v in self._odd_timestamps.items() if pos >= cut}
+        self._null_summaries = {pos for pos in self._null_summaries if pos >= cut}
+        self._base = cut
+        self.evicted += count
+        if self._ids:
+            self._floor = (self._ts[0], self._ids[0])
+            kept = []
+            for record in self._pending:
+                if (record[0], record[1]) >= self._floor:
+                    kept.append(record)
+                    continue
+                self._count_codes(record[3], -1)
+                for code in record[3]:
+                    self._release(code)
+            self._pending = kept
+        elif self._pending:
+            self._floor = min((rec[0], rec[1]) for rec in self._pending)
+
+    # ---- Reads ----
+
+    def _record(self, pos):
+        """(ts_us, id, timestamp, codes, summary, duration, is_error) for an absolute position."""
+        i = pos - self._base
+        start = self._summary_end[i - 1] if i else self._summary_base
+        if pos in self._null_summaries:
+            summary = None
+        else:
+            summary = self._summary[start - self._summary_base:self._summary_end[i] - self._summary_base].decode('utf-8')
+        ts_us = self._ts[i]
+        timestamp = self._odd_timestamps.get(pos) or _canonical_timestamp(ts_us)
+        duration = self._duration[i]
+        return (ts_us, self._ids[i], timestamp, tuple(column[i] for column in self._dims), summary,
+                None if duration != duration else duration, self._error[i])
+
+    def _row(self, record):
+        ts_us, event_id, timestamp, codes, summary, duration, is_error = record
+        strings = self._strings
+        return {
+            'id': event_id,
+            'timestamp': timestamp,
+            'session_id': strings[codes[0]],
+            'team_name': strings[codes[1]],
+            'agent_name': strings[codes[2]],
+            'hook_event': strings[codes[3]],
+            'tool_name': strings[codes[4]],
+            'event_category': strings[codes[5]],
+            'summary': summary,
+            'duration_ms': duration,
+            'is_error': is_error,
+            'node': strings[codes[6]],
+        }
+
+    def _total(self, team, session, category, agent, tool):
+        teams = [self._counts.get(team, {})] if team is not None else self._counts.values()
+        held = sum(n for counts in teams for (s, c, a, t), n in counts.items()
+                   if (session is None or s == session) and (category is None or c == category)
+                   and (agent is None or a == agent) and (tool is None or t == tool))
+        key = (team, session, category, agent, tool)
+        outside = self._outside.get(key)
+        if outside is None:
+            if len(self._outside) >= OUTSIDE_CACHED:
+                self._outside.clear()
+            outside = self._outside[key] = count_events_outside(
+                self.last_id, self._floor, team=team, session=session, category=category, agent=agent, tool=tool)
+        return held + outside
+
+    def _matches(self, filters, need):
+        """Absolute positions of the newest `need` held events matching filters, newest first.
+
+        Fewer than `need` means every held match was found.
+        """
+        base = self._base
+        if not filters:
+            stop = max(len(self._ids) - need, 0)
+            return list(range(base + len(self._ids) - 1, base + stop - 1, -1))
+        lists = []
+        for dim, value in filters:
+            code = self._codes.get(value)
+            positions = self._postings[dim].get(code) if code is not None else None
+            if not positions:
+                return []
+            lists.append((len(positions), _DIM_INDEX[dim], code, positions))
+        lists.sort(key=lambda entry: entry[0])
+        driver = reversed(lists[0][3])
+        checks = [(self._dims[i], code) for _, i, code, _ in lists[1:]]
+        if not checks:
+            matches = driver
+        elif len(checks) == 1:
+            (c1, k1), = checks
+            matches = (p for p in driver if c1[p - base] == k1)
+        elif len(checks) == 2:
+            (c1, k1), (c2, k2) = checks
+            matches = (p for p in driver if c1[p - base] == k1 and c2[p - base] == k2)
+        else:
+            matches = (p for p in driver if all(column[p - base] == k for column, k in checks))
+        return list(islice(matches, need))
+
+    def page(self, page=1, per_page=50, category=None, agent=None, tool=None, as_of=None, team=None,
+             session=None):
+        """The /api/events response for a page of the feed, or None if SQLite must answer it.
+
+        With as_of (a bootstrap cursor), the page is as of that event id; the
+        store answers only if it can be brought to exactly that id.
+        """
+        need = page * per_page
+        if page < 1 or per_page < 1 or need > MAX_DEPTH:
+            return self._miss()
+        with self._lock:
+            if not self.ready or (as_of is not None and self.last_id > as_of):
+                return self._miss()
+            self.sync(as_of)
+            if as_of is not None and self.last_id != as_of:
+                return self._miss()
+            total = self._total(team, session, category, agent, tool)
+            filters = [(dim, value) for dim, value in
+                       (('event_category', category), ('agent_name', agent), ('tool_name', tool),
+                        ('team_name', team), ('session_id', session))
+                       if value is not None]
+            # Stop early once every stored match is found
+            positions = self._matches(filters, min(need, total))
+            base, ts, ids = self._base, self._ts, self._ids
+            keys = [(ts[pos - base], ids[pos - base], pos) for pos in positions]
+            codes = [(_DIM_INDEX[dim], self._codes.get(value, -1)) for dim, value in filters]
+            keys += [(rec[0], rec[1], -1 - k) for k, rec in enumerate(self._pending)
+                     if all(rec[3][i] == code for i, code in codes)]
+            if len(keys) < need and total > len(keys):
+                # The page reaches past the floor
+                return self._miss()
+            keys.sort(reverse=True)
+            rows = [self._row(self._record(pos) if pos >= 0 else self._pending[-1 - pos])
+                    for _, _, pos in keys[need - per_page:need]]
+        self.hits += 1
+        metrics.inc('team_monitor_hot_store_queries_total', outcome='hit')
+        return {
+            'events': rows,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page,
+        }
+
+    def _miss(self):
+        self.misses += 1
+        metrics.inc('team_monitor_hot_store_queries_total', outcome='miss')
+        return None
+
+    # ---- Reporting ----
+
+    def memory_bytes(self):
+        """Approximate bytes held: arrays, summaries, posting lists, counts and the string dictionary."""
+        size = sum(a.itemsize * len(a) for a in (self._ids, self._ts, self._duration, self._error,
+                                                  self._summary_end, self._refs))
+        size += sum(column.itemsize * len(column) for column in self._dims)
+        size += len(self._summary)
+        # Every held event is in exactly one posting list per indexed dimension
+        size += len(self._ids) * len(INDEXED) * array('q').itemsize
+        size += self._string_bytes
+        size += len(self._odd_timestamps) * _ODD_TIMESTAMP_BYTES
+        size += len(self._null_summaries) * _NULL_SUMMARY_BYTES
+        size += len(self._pending) * _PENDING_BYTES
+        size += self._count_keys * _COUNT_KEY_BYTES
+        return size
+
+    def _report(self):
+        metrics.gauge_set('team_monitor_hot_store_events', len(self._ids) + len(self._pending))
+        metrics.gauge_set('team_monitor_hot_store_bytes', self.memory_bytes())
+
+    def stats(self):
+        with self._lock:
+            events = len(self._ids) + len(self._pending)
+            size = self.memory_bytes()
+            return {
+                'enabled': self.capacity > 0,
+                'ready': self.ready,
+                'events': events,
+                'pending': len(self._pending),
+                'capacity': self.capacity,
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+                'bytes_per_event': round(size / events, 1) if events else None,
+                'strings': len(self._codes) - 1,
+                'floor': _canonical_timestamp(self._floor[0]) if self._floor else None,
+                'last_id': self.last_id,
+                'evicted': self.evicted,
+                'load_seconds': self.load_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+hot_store = HotStore()
@@ -0,0 +1,196 @@
+"""Background database maintenance for the dashboard server.
+
+Hooks write continuously and SQLite's own auto-checkpoint only runs
+PASSIVE checkpoints at commit time, so the WAL file never shrinks and
+grows without bound while readers keep it pinned. Every CHECK_INTERVAL
+seconds this thread looks at the WAL and:
+
+- runs a PASSIVE checkpoint (never blocks anyone) once it passes
+  TEAM_MONITOR_WAL_PASSIVE_MB (default 4)
+- runs a TRUNCATE checkpoint, which resets the file to zero bytes, when
+  nothing has been written for IDLE_S seconds and no query is running in
+  this process, or unconditionally past TEAM_MONITOR_WAL_MAX_MB (default 64)
+- refreshes planner statistics (bounded ANALYZE + PRAGMA optimize) every
+  ANALYZE_INTERVAL seconds
+- snapshots the dashboard state every TEAM_MONITOR_SNAPSHOT_S seconds of
+  event time (default 300), for /api/state time travel; snapshots trail
+  the present by SNAPSHOT_LAG_S so most backfill lands before them
+
+Blocking checkpoints give up after BUSY_TIMEOUT_MS, so a hook is never
+held up for long; a checkpoint that couldn't finish is reported as busy,
+with the frames readers were still using as pinned_frames.
+
+Under a multi-worker server only the event bus leader runs maintenance. It
+writes its state to data/maintenance.json so any worker can serve
+/api/maintenance.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from core import codec, metrics
+from core.db import analyze_db, checkpoint_wal, get_db_path, take_snapshots
+from core.timeutil import now_epoch_us, now_timestamp
+from server.event_bus import event_bus
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, '') or default)
+    except ValueError:
+        return float(default)
+
+
+def _env_mb(name, default):
+    return int(_env_float(name, default) * 1024 * 1024)
+
+
+CHECK_INTERVAL = 5
+PASSIVE_BYTES = _env_mb('TEAM_MONITOR_WAL_PASSIVE_MB', 4)
+TRUNCATE_BYTES = _env_mb('TEAM_MONITOR_WAL_MAX_MB', 64)
+IDLE_S = 10
+BUSY_TIMEOUT_MS = 100
+ANALYZE_INTERVAL = 3600
+HISTORY_SIZE = 20
+SNAPSHOT_INTERVAL_S = _env_float('TEAM_MONITOR_SNAPSHOT_S', 300)
+SNAPSHOT_LAG_S = 120
+
+STATUS_FILE = os.path.join(os.path.dirname(get_db_path()), 'maintenance.json')
+
+
+def _file_state(path):
+    """(size, mtime) of a file, or (0, None) if it doesn't exist."""
+    try:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime
+    except OSError:
+        return 0, None
+
+
+class Maintenance:
+    """Checkpoints the WAL, refreshes planner statistics and snapshots state in the background."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.totals = {}
+        self.last_analyze = None
+        self._last_analyze_at = 0
+        self.snapshots_written = 0
+        # WAL (size, mtime) an idle TRUNCATE last gave up on; don't retry until it changes
+        self._idle_skip = None
+
+    def start(self):
+        """Start the maintenance thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='team-monitor-maintenance', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(CHECK_INTERVAL)
+            if not event_bus.leader.held:
+                continue
+            try:
+                self.tick()
+            except Exception:
+                pass
+
+    def tick(self, now=None):
+        """Run whatever maintenance is due."""
+        now = now or time.time()
+        wal_path = get_db_path() + '-wal'
+        wal_bytes, wal_mtime = _file_state(wal_path)
+        metrics.gauge_set('team_monitor_wal_bytes', wal_bytes)
+        readers = metrics.gauge_value('team_monitor_db_calls_in_flight')
+        idle = wal_mtime is not None and now - wal_mtime >= IDLE_S
+
+        if wal_bytes >= TRUNCATE_BYTES:
+            self._checkpoint('TRUNCATE', 'wal_limit', wal_bytes, readers)
+        elif idle and wal_bytes and readers == 0 and self._idle_skip != (wal_bytes, wal_mtime):
+            record = self._checkpoint('TRUNCATE', 'idle', wal_bytes, readers)
+            self._idle_skip = (wal_bytes, wal_mtime) if record['busy'] else None
+        elif wal_bytes >= PASSIVE_BYTES:
+            self._checkpoint('PASSIVE', 'wal_size', wal_bytes, readers)
+
+        if now - self._last_analyze_at >= ANALYZE_INTERVAL:
+            self._last_analyze_at = now
+            start = time.perf_counter()
+            analyze_db()
+            self.last_analyze = {'timestamp': now_timestamp(),
+                                 'duration_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+        written = take_snapshots(SNAPSHOT_INTERVAL_S, now_epoch_us() - int(SNAPSHOT_LAG_S * 1000000))
+        self.snapshots_written += written
+
+        self._write_status()
+
+    def _checkpoint(self, mode, reason, wal_bytes, readers):
+        start = time.perf_counter()
+        busy, wal_frames, checkpointed = checkpoint_wal(mode, busy_timeout_ms=BUSY_TIMEOUT_MS)
+        elapsed = time.perf_counter() - start
+
+        metrics.observe('team_monitor_checkpoint_seconds', elapsed, mode=mode)
+        metrics.inc('team_monitor_checkpoints_total', mode=mode, outcome='busy' if busy else 'ok')
+        record = {
+            'timestamp': now_timestamp(),
+            'mode': mode,
+            'reason': reason,
+            'duration_ms': round(elapsed * 1000, 2),
+            'busy': bool(busy),
+            'wal_frames': wal_frames,
+            'checkpointed_frames': checkpointed,
+            'pinned_frames': max(0, wal_frames - checkpointed),
+            'wal_bytes_before': wal_bytes,
+            'wal_bytes_after': _file_state(get_db_path() + '-wal')[0],
+            'readers_in_flight': readers,
+        }
+        self.history.append(record)
+        total = self.totals.setdefault(mode, {'count': 0, 'busy': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        total['count'] += 1
+        total['busy'] += int(bool(busy))
+        total['total_ms'] = round(total['total_ms'] + record['duration_ms'], 2)
+        total['max_ms'] = max(total['max_ms'], record['duration_ms'])
+        return record
+
+    def _write_status(self):
+        status = {
+            'pid': os.getpid(),
+            'updated': now_timestamp(),
+            'checkpoints': self.totals,
+            'recent': list(self.history),
+            'last_analyze': self.last_analyze,
+            'snapshots_written': self.snapshots_written,
+        }
+        tmp = STATUS_FILE + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(codec.dumps(status))
+        os.replace(tmp, STATUS_FILE)
+
+
+def get_status():
+    """Current WAL/database sizes plus the leader's checkpoint and ANALYZE history."""
+    db_path = get_db_path()
+    wal_bytes, wal_mtime = _file_state(db_path + '-wal')
+    try:
+        with open(STATUS_FILE, 'rb') as f:
+            status = codec.loads(f.read())
+    except (OSError, codec.JSONDecodeError):
+        status = {'pid': None, 'updated': None, 'checkpoints': {}, 'recent': [], 'last_analyze': None,
+                  'snapshots_written': 0}
+    status.update({
+        'db_bytes': _file_state(db_path)[0],
+        'wal_bytes': wal_bytes,
+        'last_write_s_ago': None if wal_mtime is None else round(time.time() - wal_mtime, 1),
+        'db_calls_in_flight': metrics.gauge_value('team_monitor_db_calls_in_flight'),
+        'thresholds': {'passive_bytes': PASSIVE_BYTES, 'truncate_bytes': TRUNCATE_BYTES, 'idle_s': IDLE_S},
+    })
+    return status
+
+
+maintenance = Maintenance()
@@ -0,0 +1,101 @@
+"""Production server for the team-monitor dashboard.
+
+Runs server.app under gunicorn: several worker processes, each serving
+requests from a thread pool (gthread), so long-lived SSE connections and
+heavy stats queries no longer share one GIL. Every worker runs its own
+event bus over the shared database; one of them leads (see
+server/event_bus.py).
+
+    python3 server/production.py --port 5111 --workers 2 --threads 32
+
+Signals go to the master process (the PID start_server.py records):
+SIGHUP reloads gracefully (new workers start with freshly imported code,
+old ones get GRACEFUL_TIMEOUT seconds to finish; dropped SSE clients
+reconnect and resume from their cursors), SIGTERM stops.
+
+gunicorn doesn't run on Windows; there waitress serves the app from a
+single process instead.
+"""
+
+import argparse
+import os
+import sys
+
+PLUGIN_ROOT = os.environ.get('CLAUDE_PLUGIN_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PLUGIN_ROOT)
+
+DEFAULT_WORKERS = 2
+# Each open dashboard holds one thread for its SSE stream
+DEFAULT_THREADS = 32
+GRACEFUL_TIMEOUT = 10
+
+
+def _post_worker_init(worker):
+    # Imported here, not in the master, so a SIGHUP reload picks up new code
+    from core.db import init_db
+    from server.app import backfill, event_bus, federation, hot_store, maintenance
+    init_db()
+    event_bus.start()
+    maintenance.start()
+    federation.start()
+    hot_store.start()
+    backfill.start()
+
+
+def serve_gunicorn(host, port, workers, threads):
+    from gunicorn.app.base import BaseApplication
+
+    class DashboardApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from server.app import app
+            return app
+
+    DashboardApplication({
+        'bind': f'{host}:{port}',
+        'workers': workers,
+        'worker_class': 'gthread',
+        'threads': threads,
+        'graceful_timeout': GRACEFUL_TIMEOUT,
+        'keepalive': 5,
+        'proc_name': 'team-monitor',
+        'post_worker_init': _post_worker_init,
+    }).run()
+
+
+def serve_waitress(host, port, threads):
+    from waitress import serve
+    from core.db import init_db
+    from server.app import app, backfill, event_bus, federation, hot_store, maintenance
+    init_db()
+    event_bus.start()
+    maintenance.start()
+    federation.start()
+    hot_store.start()
+    backfill.start()
+    serve(app, host=host, port=port, threads=threads, ident='team-monitor')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the Team Monitor dashboard with a production server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5111)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Worker processes (gunicorn only)')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help='Request threads per worker')
+    args = parser.parse_args()
+
+    if sys.platform == 'win32':
+        serve_waitress(args.host, args.port, args.threads)
+    else:
+        serve_gunicorn(args.host, args.port, max(1, args.workers), max(1, args.threads))
+
+
+if __name__ == '__main__':
+    main()
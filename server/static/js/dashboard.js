@@ -5,18 +5,21 @@
   // --- State ---
   let eventSource = null;
   let lastEventId = 0;
+  let lastAlertId = 0;
+  let recentAlerts = [];
   let totalEvents = 0;
   let newEventCount = 0;
   let recentTimestamps = []; // timestamps of events in last 60s for rate calc
-  let currentFilters = { category: "", agent: "", tool: "" };
+  let currentFilters = { team: "", category: "", agent: "", tool: "" };
   let feedScrolledToTop = true;
   const AGENT_COLORS = ["#58a6ff","#3fb950","#d29922","#f85149","#bc8cff","#79c0ff"];
 
   // --- DOM refs (set on DOMContentLoaded) ---
   let elStatusDot, elStatusText, elHeaderCount;
   let elAgentsRow, elEventFeed, elNewIndicator;
-  let elFilterCategory, elFilterAgent, elFilterTool, elBtnClear;
-  let elStatTotal, elStatRate, elStatMostActive, elCategoryBars;
+  let elFilterTeam, elFilterCategory, elFilterAgent, elFilterTool, elBtnClear;
+  let elStatTotal, elStatRate, elStatMostActive, elCategoryBars, elLatencyTable;
+  let elAlertList;
 
   // --- Utility ---
 
@@ -31,6 +34,21 @@
     return d.toLocaleDateString() + " " + d.toLocaleTimeString();
   }
 
+  function formatDuration(ms) {
+    if (ms === null || ms === undefined) return "";
+    if (ms < 1) return ms.toFixed(2) + "ms";
+    if (ms < 1000) return Math.round(ms) + "ms";
+    if (ms < 60000) return (ms / 1000).toFixed(1) + "s";
+    return (ms / 60000).toFixed(1) + "m";
+  }
+
+  function formatTokens(n) {
+    if (!n) return "0";
+    if (n >= 1e6) return (n / 1e6).toFixed(1) + "M";
+    if (n >= 1e3) return (n / 1e3).toFixed(1) + "k";
+    return String(n);
+  }
+
   function getCategoryColor(cat) {
     var map = {
       communication: "#1f6feb",
@@ -95,21 +113,41 @@
     });
   }
 
-  function fetchEvents() {
+  // Query string scoping a request to the selected team ("" when all teams are shown)
+  function scopeQuery() {
+    return currentFilters.team ? "?team=" + encodeURIComponent(currentFilters.team) : "";
+  }
+
+  // The current filters as query parameters (shared by the bootstrap and the stream)
+  function filterParams() {
     var params = new URLSearchParams();
+    if (currentFilters.team) params.set("team", currentFilters.team);
     if (currentFilters.category) params.set("category", currentFilters.category);
     if (currentFilters.agent) params.set("agent", currentFilters.agent);
     if (currentFilters.tool) params.set("tool", currentFilters.tool);
-    params.set("per_page", "100");
-    return apiFetch("/api/events?" + params.toString());
+    return params;
   }
 
   function fetchAgents() {
-    return apiFetch("/api/agents");
+    return apiFetch("/api/agents" + scopeQuery());
   }
 
   function fetchStats() {
-    return apiFetch("/api/stats");
+    return apiFetch("/api/stats" + scopeQuery());
+  }
+
+  function fetchLatency() {
+    return apiFetch("/api/latency" + scopeQuery());
+  }
+
+  function fetchTeams() {
+    return apiFetch("/api/teams");
+  }
+
+  function fetchBootstrap() {
+    var params = filterParams();
+    params.set("per_page", "100");
+    return apiFetch("/api/bootstrap?" + params.toString());
   }
 
   // --- Rendering ---
@@ -130,7 +168,12 @@
         '<div class="agent-meta">' +
           '<span>' + formatTimestamp(agent.last_seen || agent.last_activity) + "</span>" +
           '<span class="agent-count">' + (agent.event_count || 0) + "</span>" +
-        "</div>";
+        "</div>" +
+        (agent.total_tokens
+          ? '<div class="agent-usage">' + formatTokens(agent.total_tokens) + " tokens" +
+            (agent.cost_usd !== null && agent.cost_usd !== undefined ? " · ~$" + agent.cost_usd.toFixed(2) : "") +
+            "</div>"
+          : "");
       elAgentsRow.appendChild(card);
     });
   }
@@ -158,8 +201,13 @@
         '<span class="event-agent-badge" style="border-color:' + agentColor + ";color:" + agentColor + '">' +
           escapeHTML(ev.agent_name || "system") +
         "</span>" +
+        (ev.node ? '<span class="event-node-badge" title="Shipped from node ' + escapeHTML(ev.node) + '">' +
+          escapeHTML(ev.node) + "</span>" : "") +
         '<span class="event-category-badge ' + escapeHTML(cat) + '">' + escapeHTML(cat) + "</span>" +
         '<span class="event-summary">' + escapeHTML(truncateText(ev.summary || ev.event_type || "", 120)) + "</span>" +
+        (ev.duration_ms !== null && ev.duration_ms !== undefined
+          ? '<span class="event-duration">' + formatDuration(ev.duration_ms) + "</span>"
+          : "") +
       "</div>" +
       '<div class="event-detail"><pre></pre></div>';
 
@@ -227,6 +275,7 @@
   }
 
   function matchesFilters(ev) {
+    if (currentFilters.team && (ev.team_name || "unknown") !== currentFilters.team) return false;
     if (currentFilters.category && (ev.category || ev.event_category || "") !== currentFilters.category) return false;
     if (currentFilters.agent && (ev.agent_name || "") !== currentFilters.agent) return false;
     if (currentFilters.tool && (ev.tool_name || "") !== currentFilters.tool) return false;
@@ -268,6 +317,62 @@
     });
   }
 
+  function renderLatency(rows) {
+    if (!rows || rows.length === 0) {
+      elLatencyTable.innerHTML = '<div class="latency-empty">No timed tool calls yet</div>';
+      return;
+    }
+    elLatencyTable.innerHTML = "";
+    rows.slice(0, 10).forEach(function (r) {
+      var item = document.createElement("div");
+      item.className = "latency-row";
+      item.title = r.count + " calls, mean " + formatDuration(r.mean_ms) + ", max " + formatDuration(r.max_ms);
+      item.innerHTML =
+        '<span class="latency-tool">' + escapeHTML(r.tool_name) + "</span>" +
+        '<span class="latency-values">' +
+          formatDuration(r.p50_ms) + " / " + formatDuration(r.p95_ms) + " / " + formatDuration(r.p99_ms) +
+        "</span>" +
+        '<span class="latency-count">' + r.count + "</span>";
+      elLatencyTable.appendChild(item);
+    });
+  }
+
+  function renderAlerts() {
+    if (recentAlerts.length === 0) {
+      elAlertList.innerHTML = '<div class="alert-empty">No alerts</div>';
+      return;
+    }
+    elAlertList.innerHTML = "";
+    recentAlerts.forEach(function (a) {
+      var item = document.createElement("div");
+      item.className = "alert-row alert-" + (a.severity || "warning");
+      item.title = a.kind;
+      item.innerHTML =
+        '<span class="alert-time">' + formatTimestamp(a.timestamp) + "</span>" +
+        '<span class="alert-summary">' + escapeHTML(a.summary || a.kind) + "</span>";
+      elAlertList.appendChild(item);
+    });
+  }
+
+  function addAlert(alert) {
+    if (alert.id <= lastAlertId) return;
+    lastAlertId = alert.id;
+    recentAlerts.unshift(alert);
+    recentAlerts = recentAlerts.slice(0, 20);
+    renderAlerts();
+  }
+
+  function addTeamOption(name) {
+    if (!name) return;
+    for (var i = 0; i < elFilterTeam.options.length; i++) {
+      if (elFilterTeam.options[i].value === name) return;
+    }
+    var opt = document.createElement("option");
+    opt.value = name;
+    opt.textContent = name;
+    elFilterTeam.appendChild(opt);
+  }
+
   function populateFilterDropdowns(agents) {
     // Populate agent dropdown
     if (elFilterAgent.options.length <= 1 && agents && agents.length > 0) {
@@ -289,7 +394,12 @@
     if (eventSource) {
       eventSource.close();
     }
-    eventSource = new EventSource("/api/stream");
+    // Resume after the newest event we already have (bootstrap cursor or last seen);
+    // the server only sends events that match the current filters
+    var params = filterParams();
+    params.set("since", lastEventId);
+    params.set("alerts_since", lastAlertId);
+    eventSource = new EventSource("/api/stream?" + params.toString());
 
     eventSource.onopen = function () {
       elStatusDot.classList.add("connected");
@@ -302,6 +412,8 @@
       try { ev = JSON.parse(e.data); } catch (err) { return; }
       if (!ev || !ev.id) return;
 
+      addTeamOption(ev.team_name);
+
       // Only add if matches filter
       if (matchesFilters(ev)) {
         addEventToFeed(ev);
@@ -316,8 +428,20 @@
       fetchStats().then(function (data) {
         renderStats(data);
       }).catch(function () {});
+
+      if (ev.duration_ms !== null && ev.duration_ms !== undefined) {
+        fetchLatency().then(function (data) {
+          renderLatency(data.latency);
+        }).catch(function () {});
+      }
     };
 
+    eventSource.addEventListener("alert", function (e) {
+      var alert;
+      try { alert = JSON.parse(e.data); } catch (err) { return; }
+      if (alert && alert.id) addAlert(alert);
+    });
+
     eventSource.onerror = function () {
       elStatusDot.classList.remove("connected");
       elStatusText.textContent = "Disconnected";
@@ -329,23 +453,58 @@
 
   // --- Filter handlers ---
 
+  function renderBootstrap(data) {
+    renderEventFeed((data.events && data.events.events) || []);
+    renderAgentCards(data.agents || []);
+    populateFilterDropdowns(data.agents || []);
+    renderStats(data.stats);
+    renderLatency(data.latency);
+    recentAlerts = data.alerts || [];
+    renderAlerts();
+    if (data.cursor > lastEventId) lastEventId = data.cursor;
+    if (data.alert_cursor > lastAlertId) lastAlertId = data.alert_cursor;
+  }
+
+  function onTeamChange() {
+    currentFilters.team = elFilterTeam.value;
+    // Keep the selected team in the URL so a reload or shared link opens the same view
+    var url = new URL(window.location.href);
+    if (currentFilters.team) url.searchParams.set("team", currentFilters.team);
+    else url.searchParams.delete("team");
+    window.history.replaceState(null, "", url.toString());
+    elFilterAgent.length = 1;
+    elFilterAgent.value = "";
+    currentFilters.agent = "";
+    refreshFeed();
+  }
+
+  // Re-read the dashboard for the current filters and restart the stream with
+  // them from the snapshot's cursor, so the new feed has no gap or repeats
+  function refreshFeed() {
+    fetchBootstrap().then(renderBootstrap).catch(function () {}).then(connectSSE);
+  }
+
   function onFilterChange() {
     currentFilters.category = elFilterCategory.value;
     currentFilters.agent = elFilterAgent.value;
     currentFilters.tool = elFilterTool.value;
-    fetchEvents().then(function (data) {
-      renderEventFeed(data.events || []);
-    }).catch(function () {});
+    refreshFeed();
   }
 
   function onClearFilters() {
+    if (currentFilters.team) {
+      elFilterTeam.value = "";
+      elFilterCategory.value = "";
+      elFilterTool.value = "";
+      currentFilters.category = currentFilters.tool = "";
+      onTeamChange();
+      return;
+    }
     elFilterCategory.value = "";
     elFilterAgent.value = "";
     elFilterTool.value = "";
-    currentFilters = { category: "", agent: "", tool: "" };
-    fetchEvents().then(function (data) {
-      renderEventFeed(data.events || []);
-    }).catch(function () {});
+    currentFilters = { team: "", category: "", agent: "", tool: "" };
+    refreshFeed();
   }
 
   // --- Init ---
@@ -358,6 +517,7 @@
     elAgentsRow = document.getElementById("agents-row");
     elEventFeed = document.getElementById("event-feed");
     elNewIndicator = document.getElementById("new-events-indicator");
+    elFilterTeam = document.getElementById("filter-team");
     elFilterCategory = document.getElementById("filter-category");
     elFilterAgent = document.getElementById("filter-agent");
     elFilterTool = document.getElementById("filter-tool");
@@ -366,6 +526,8 @@
     elStatRate = document.getElementById("stat-rate");
     elStatMostActive = document.getElementById("stat-most-active");
     elCategoryBars = document.getElementById("category-bars");
+    elLatencyTable = document.getElementById("latency-table");
+    elAlertList = document.getElementById("alert-list");
 
     // Scroll detection for event feed
     elEventFeed.addEventListener("scroll", function () {
@@ -384,28 +546,23 @@
     });
 
     // Filter listeners
+    elFilterTeam.addEventListener("change", onTeamChange);
     elFilterCategory.addEventListener("change", onFilterChange);
     elFilterAgent.addEventListener("change", onFilterChange);
     elFilterTool.addEventListener("change", onFilterChange);
     elBtnClear.addEventListener("click", onClearFilters);
 
-    // Initial data load - fetch all in parallel
-    Promise.all([
-      fetchEvents().catch(function () { return { events: [] }; }),
-      fetchAgents().catch(function () { return { agents: [] }; }),
-      fetchStats().catch(function () { return {}; })
-    ]).then(function (results) {
-      var eventsData = results[0];
-      var agentsData = results[1];
-      var statsData = results[2];
-
-      renderEventFeed(eventsData.events || []);
-      renderAgentCards(agentsData.agents || agentsData || []);
-      populateFilterDropdowns(agentsData.agents || agentsData || []);
-      renderStats(statsData);
-    });
+    // Team from the URL (?team=...), if the page was opened scoped to one
+    currentFilters.team = new URLSearchParams(window.location.search).get("team") || "";
+    addTeamOption(currentFilters.team);
+    elFilterTeam.value = currentFilters.team;
+    fetchTeams().then(function (data) {
+      (data.teams || []).forEach(function (t) { addTeamOption(t.team_name); });
+    }).catch(function () {});
 
-    // Connect SSE
-    connectSSE();
+    // Initial data load - one consistent snapshot, then stream from its cursor
+    fetchBootstrap().then(renderBootstrap).catch(function () {}).then(function () {
+      connectSSE();
+    });
   });
 })();
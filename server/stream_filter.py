@@ -0,0 +1,69 @@
+"""Server-side filters for the live event stream.
+
+A client opens /api/stream with any of ?team=, ?session=, ?agent=,
+?category=, ?tool= and ?q= (a case-insensitive substring of the event
+summary) and is sent only the matching events, rather than everything for
+the dashboard to discard. Alerts are filtered by team and agent only.
+
+A filter is compiled once per connection into a tuple of column checks.
+The event bus groups subscribers by filter, so a batch is filtered once
+per distinct filter however many clients share it.
+"""
+
+# (query argument, event column) pairs filtered on by equality
+FIELDS = (
+    ('team', 'team_name'),
+    ('session', 'session_id'),
+    ('agent', 'agent_name'),
+    ('category', 'event_category'),
+    ('tool', 'tool_name'),
+)
+
+# Event columns that alerts carry too
+ALERT_COLUMNS = ('team_name', 'agent_name')
+
+# Longest accepted ?q= text
+MAX_TEXT = 200
+
+
+class StreamFilter:
+    """A compiled event predicate. Equal filters have equal keys."""
+
+    __slots__ = ('key', '_checks', '_alert_checks', '_text')
+
+    def __init__(self, team=None, session=None, agent=None, category=None, tool=None, text=None):
+        values = dict(team=team, session=session, agent=agent, category=category, tool=tool)
+        self._checks = tuple((column, values[arg]) for arg, column in FIELDS if values[arg])
+        self._alert_checks = tuple((column, value) for column, value in self._checks if column in ALERT_COLUMNS)
+        self._text = text[:MAX_TEXT].casefold() if text else None
+        self.key = (self._checks, self._text)
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a filter from request query arguments."""
+        return cls(text=args.get('q'), **{arg: args.get(arg) for arg, _ in FIELDS})
+
+    @property
+    def empty(self):
+        return not self._checks and self._text is None
+
+    def matches(self, event):
+        for column, value in self._checks:
+            if event.get(column) != value:
+                return False
+        return self._text is None or self._text in (event.get('summary') or '').casefold()
+
+    def select(self, kind, items):
+        """The items of a batch (kind 'event' or 'alert') that pass the filter."""
+        if kind == 'alert':
+            checks = self._alert_checks
+            if not checks:
+                return items
+            return [item for item in items if all(item.get(column) == value for column, value in checks)]
+        if self.empty:
+            return items
+        return [item for item in items if self.matches(item)]
+
+
+# The filter of a plain /api/stream connection: everything
+ALL = StreamFilter()
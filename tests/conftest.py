@@ -0,0 +1,11 @@
+"""Point the plugin at a scratch data directory before any core module is imported."""
+
+import os
+import sys
+import tempfile
+
+PLUGIN_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PLUGIN_ROOT)
+
+os.environ['CLAUDE_PLUGIN_ROOT'] = PLUGIN_ROOT
+os.environ['TEAM_MONITOR_DATA_DIR'] = tempfile.mkdtemp(prefix='team-monitor-tests-')
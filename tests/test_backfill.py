@@ -0,0 +1,83 @@
+"""Transcript backfill queue: leases, the concurrency limit and retries."""
+
+import pytest
+
+from core import backfill, db
+from core.timeutil import now_epoch_us
+
+
+@pytest.fixture(autouse=True)
+def queue(tmp_path, monkeypatch):
+    """A database of its own, so other tests' jobs don't count against the limit."""
+    monkeypatch.setattr(db, 'DATA_DIR', str(tmp_path))
+    db.init_db()
+
+
+def _job(job_id):
+    return next(job for job in db.get_backfill_jobs()['jobs'] if job['id'] == job_id)
+
+
+def _age(job_id, seconds):
+    conn = db._get_connection()
+    try:
+        conn.execute("UPDATE backfill_jobs SET updated_us = ? WHERE id = ?",
+                     (now_epoch_us() - int(seconds * 1e6), job_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_a_running_job_is_only_reclaimed_once_its_lease_expires(tmp_path):
+    path = str(tmp_path / 'agent.jsonl')
+    job_id = db.enqueue_backfill(path, agent_name='worker')
+    assert db.enqueue_backfill(path, agent_name='worker') == job_id
+
+    assert [job['id'] for job in db.claim_backfill_jobs('a', 2, lease_s=300)] == [job_id]
+    # Queued again while running: the new job waits for the transcript to be free
+    second = db.enqueue_backfill(path)
+    assert second != job_id
+    assert db.claim_backfill_jobs('b', 2, lease_s=300) == []
+
+    # Progress renews the lease
+    _age(job_id, 400)
+    db.update_backfill_progress(job_id, 10, 100, 1)
+    assert db.claim_backfill_jobs('b', 2, lease_s=300) == []
+
+    # A worker that stops reporting loses the job
+    _age(job_id, 400)
+    jobs = db.claim_backfill_jobs('b', 2, lease_s=300)
+    assert [(job['id'], job['worker'], job['attempts']) for job in jobs] == [(job_id, 'b', 2)]
+    assert _job(second)['status'] == 'pending'
+
+
+def test_no_more_than_max_running_jobs_run_at_once(tmp_path):
+    for n in range(3):
+        db.enqueue_backfill(str(tmp_path / f'agent-{n}.jsonl'))
+    assert len(db.claim_backfill_jobs('a', 2)) == 2
+    assert db.claim_backfill_jobs('b', 2) == []
+    assert db.get_backfill_jobs()['counts'] == {'running': 2, 'pending': 1}
+
+
+def test_failed_jobs_back_off_then_give_up(tmp_path):
+    path = str(tmp_path / 'missing.jsonl')
+    job_id = db.enqueue_backfill(path)
+
+    job, = backfill.claim('a')
+    assert backfill.run_and_finish(job) == 'retry'
+    failed = _job(job_id)
+    assert failed['status'] == 'pending' and failed['error'].startswith('FileNotFoundError')
+    assert failed['run_after_us'] > now_epoch_us()
+    # Not due until the backoff has passed
+    assert backfill.claim('a') == []
+
+    job['attempts'] = backfill.MAX_ATTEMPTS
+    assert backfill.run_and_finish(job) == 'failed'
+    assert _job(job_id)['status'] == 'failed'
+
+    assert db.retry_failed_backfills() == 1
+    retried = _job(job_id)
+    assert (retried['status'], retried['attempts'], retried['run_after_us']) == ('pending', 0, 0)
+    open(path, 'w').close()
+    job, = backfill.claim('a')
+    assert backfill.run_and_finish(job) == 'done'
+    assert _job(job_id)['status'] == 'done'
@@ -0,0 +1,84 @@
+"""Read API validators and response caching."""
+
+import gzip
+
+from flask import Flask, jsonify
+
+from core.db import init_db, insert_alerts, insert_event
+from core.timeutil import now_epoch_us, now_timestamp
+from server import cache, compression
+from server.cache import ResponseCache, Watermark, cached_json
+from server.compression import compress_response
+
+
+def test_alert_without_events_changes_validator():
+    init_db()
+    watermark = Watermark()
+    before = watermark.validator()
+    generation = watermark.current()
+
+    insert_alerts([{'kind': 'stall', 'timestamp': now_timestamp(), 'ts_us': now_epoch_us(),
+                    'team_name': 'cache-test', 'agent_name': 'worker', 'subject': 'worker'}])
+
+    assert watermark.current() == generation
+    assert watermark.validator() != before
+
+
+def _app(calls):
+    app = Flask(__name__)
+    app.after_request(compress_response)
+
+    @app.route('/big')
+    @cached_json()
+    def big():
+        calls.append(1)
+        return jsonify({'rows': ['cached body'] * 500})
+
+    return app
+
+
+def test_compressed_body_is_cached_per_encoding(monkeypatch):
+    init_db()
+    monkeypatch.setattr(cache, 'response_cache', ResponseCache())
+    calls, compressed = [], []
+    real_compress = compression.compress
+    monkeypatch.setattr(cache, 'compress', lambda body, encoding: compressed.append(encoding) or
+                        real_compress(body, encoding))
+    monkeypatch.setattr(compression, 'compress', lambda body, encoding: compressed.append(encoding) or
+                        real_compress(body, encoding))
+    client = _app(calls).test_client()
+
+    first = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    second = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    plain = client.get('/big', headers={'Accept-Encoding': 'identity'})
+
+    assert first.headers['Content-Encoding'] == second.headers['Content-Encoding'] == 'gzip'
+    assert second.data == first.data
+    assert gzip.decompress(second.data) == plain.data
+    assert 'Content-Encoding' not in plain.headers
+    assert calls == [1] and compressed == ['gzip']
+
+
+def test_unchanged_data_answers_304_until_an_event_is_written(monkeypatch):
+    init_db()
+    monkeypatch.setattr(cache, 'response_cache', ResponseCache())
+    calls = []
+    client = _app(calls).test_client()
+
+    first = client.get('/big')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/')
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    again = client.get('/big', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b''
+    assert again.headers['ETag'] == etag
+    dated = client.get('/big', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert dated.status_code == 304
+
+    insert_event({'timestamp': now_timestamp(), 'session_id': 'cache-session', 'team_name': 'cache-test',
+                  'agent_name': 'worker', 'hook_event': 'PostToolUse', 'tool_name': 'Read',
+                  'event_category': 'tool_use', 'summary': 'Read', 'payload_json': '{}'})
+    changed = client.get('/big', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert calls == [1, 1]
@@ -0,0 +1,11 @@
+"""JSON codec backends agree on output."""
+
+from core import codec
+
+
+def test_non_finite_floats_encode_as_null_on_every_backend():
+    value = {'nan': float('nan'), 'inf': [float('inf'), -float('inf')], 'ok': 1.5, float('nan'): 'key'}
+    expected = '{"nan":null,"inf":[null,null],"ok":1.5,"null":"key"}'
+    for name in codec.available_backends():
+        dumps, _ = codec.load_backend(name)
+        assert dumps(value) == expected, name
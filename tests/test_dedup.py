@@ -0,0 +1,46 @@
+"""One stored event per tool call, however many copies of it arrive."""
+
+from core.db import _get_connection, get_agents, init_db, insert_event, insert_events
+from core.event_parser import event_key
+
+
+def _call(tool_use_id, n=0, **fields):
+    event = {
+        'timestamp': f'2026-03-01T00:00:{n:02d}.000Z', 'session_id': 'dedup-session', 'team_name': 'dedup-team',
+        'agent_name': 'dedup-agent', 'hook_event': 'PostToolUse', 'tool_name': 'Bash',
+        'event_category': 'tool_use', 'summary': f'Bash {n}', 'payload_json': '{}',
+        'event_key': event_key(tool_use_id, 'dedup-agent', 'Bash', {'command': 'ls'}, '2026-03-01T00:00:00.000Z'),
+    }
+    event.update(fields)
+    return event
+
+
+def _stored(key):
+    conn = _get_connection()
+    try:
+        return conn.execute("SELECT id, duration_ms FROM events WHERE event_key = ?", (key,)).fetchall()
+    finally:
+        conn.close()
+
+
+def test_live_and_transcript_copies_are_stored_once():
+    init_db()
+    live = _call('toolu_dedup_1')
+    event_id = insert_event(live)
+
+    # The transcript copy, repeated within its batch, brings the duration the live copy lacked
+    assert insert_events([_call('toolu_dedup_1', duration_ms=7.5), _call('toolu_dedup_1', n=1)]) == 0
+    assert insert_event(_call('toolu_dedup_1', duration_ms=7.5)) == event_id
+    assert [tuple(row) for row in _stored(live['event_key'])] == [(event_id, 7.5)]
+    assert [a['event_count'] for a in get_agents(team='dedup-team')] == [1]
+
+
+def test_calls_without_a_tool_use_id_match_on_their_content():
+    init_db()
+    first = _call(None)
+    second = _call(None, n=3)
+    assert first['event_key'] == second['event_key'] and first['event_key'].startswith('h:')
+    assert insert_events([first, second, _call('toolu_dedup_2', n=4)]) == 2
+    assert len(_stored(first['event_key'])) == 1
+    # Non-tool events have no key and are all kept
+    assert event_key(None, 'dedup-agent', None, None, first['timestamp']) is None
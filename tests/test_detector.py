@@ -0,0 +1,65 @@
+"""Anomaly detector behaviour over events as the event bus reads them."""
+
+from datetime import datetime, timedelta, timezone
+
+from core.db import get_events_since, get_max_event_id, init_db, insert_event, insert_events
+from core.detector import REPEAT_THRESHOLD, STALL_AFTER_S, AnomalyDetector
+from core.event_parser import parse_event
+from core.timeutil import format_timestamp, now_epoch_us
+
+
+def _ts(seconds_ago):
+    return format_timestamp(datetime.now(timezone.utc) - timedelta(seconds=seconds_ago))
+
+
+def test_subagent_stop_then_backfill_does_not_stall():
+    init_db()
+    after = get_max_event_id()
+    detector = AnomalyDetector()
+
+    start = parse_event({'hook_event_name': 'SubagentStart', 'session_id': 'parent01-session',
+                         'team_name': 'stall-test', 'agent_id': 'abcdef1234', 'agent_type': 'Explore'})
+    insert_event(start)
+    stop = parse_event({'hook_event_name': 'SubagentStop', 'session_id': 'parent01-session',
+                        'team_name': 'stall-test', 'agent_id': 'abcdef1234', 'agent_type': 'Explore'})
+    insert_event(stop)
+    # The transcript backfill that follows, attributed to the subagent itself
+    insert_events([{
+        'timestamp': _ts(30 - i), 'session_id': 'sub-session', 'team_name': 'stall-test',
+        'agent_name': 'Explore-abcdef12', 'hook_event': 'PostToolUse', 'tool_name': 'Read',
+        'event_category': 'tool_use', 'summary': f'Read: /src/{i}.py', 'payload_json': '{}',
+    } for i in range(3)])
+
+    events = get_events_since(after)
+    assert [ev.get('subagent_name') for ev in events[:2]] == ['Explore-abcdef12', 'Explore-abcdef12']
+    for ev in events:
+        assert detector.observe(ev) == []
+
+    assert ('stall-test', 'Explore-abcdef12') not in detector.agents
+    # The parent was active, not stopped, when its subagent finished
+    assert ('stall-test', stop['agent_name']) in detector.agents
+
+    alerts = detector.check_stalls(now_epoch_us() + int((STALL_AFTER_S + 1) * 1e6))
+    assert [a['agent_name'] for a in alerts] == [stop['agent_name']]
+
+
+def _bash(command, n):
+    return parse_event({'hook_event_name': 'PostToolUse', 'session_id': 'repeat-session', 'team_name': 'repeat-test',
+                        'tool_use_id': f'toolu_repeat_{n}', 'tool_name': 'Bash', 'tool_input': {'command': command}})
+
+
+def test_repeat_compares_full_commands():
+    init_db()
+    after = get_max_event_id()
+    # Longer than the summary keeps, so every summary is the same
+    prefix = 'python3 -m pytest tests/integration/test_scheduler_end_to_end.py::'
+    for n in range(REPEAT_THRESHOLD):
+        insert_event(_bash(f'{prefix}test_case_{n}', n))
+    detector = AnomalyDetector()
+    assert [alert for ev in get_events_since(after) for alert in detector.observe(ev)] == []
+
+    after = get_max_event_id()
+    for n in range(REPEAT_THRESHOLD):
+        insert_event(_bash(f'{prefix}test_case_same', REPEAT_THRESHOLD + n))
+    alerts = [alert for ev in get_events_since(after) for alert in detector.observe(ev)]
+    assert [alert['kind'] for alert in alerts] == ['retry_loop']
@@ -0,0 +1,31 @@
+"""hooks/dispatch.py, run as Claude Code runs it: a fresh interpreter per hook."""
+
+import os
+import subprocess
+import sys
+
+from conftest import PLUGIN_ROOT
+
+DISPATCH = os.path.join(PLUGIN_ROOT, 'hooks', 'dispatch.py')
+
+
+def _dispatch(tmp_path, event, stdin):
+    env = dict(os.environ, CLAUDE_PLUGIN_ROOT=PLUGIN_ROOT, TEAM_MONITOR_DATA_DIR=str(tmp_path))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', DISPATCH, event], input=stdin, env=env,
+                          capture_output=True, timeout=30)
+    assert proc.returncode == 0
+    assert proc.stdout.strip() == b'{}'
+    return proc.stderr.decode('utf-8', 'replace')
+
+
+def test_payload_without_an_object_stores_nothing(tmp_path):
+    for stdin in (b'', b'  \n', b'[1, 2]', b'{}', b'"Stop"'):
+        imports = _dispatch(tmp_path, 'Stop', stdin)
+        assert ' core.db\n' not in imports
+    assert not os.path.exists(tmp_path / 'team_monitor.db')
+    assert not os.path.exists(tmp_path / 'hook_errors.log')
+
+
+def test_event_is_stored(tmp_path):
+    _dispatch(tmp_path, 'Stop', b'{"hook_event_name": "Stop", "session_id": "dispatch-session"}')
+    assert os.path.exists(tmp_path / 'team_monitor.db')
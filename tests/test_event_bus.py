@@ -0,0 +1,27 @@
+"""Event bus resilience."""
+
+from core.db import get_max_event_id, init_db, insert_event
+from core.event_parser import parse_event
+from server.event_bus import EventBus
+
+
+def test_failing_listener_does_not_stall_the_bus(caplog):
+    init_db()
+    bus = EventBus()
+    bus.event_cursor = get_max_event_id()
+    event_id = insert_event(parse_event({'hook_event_name': 'Notification', 'session_id': 'bus-session',
+                                         'team_name': 'bus-test', 'message': 'hello'}))
+
+    def broken(after_id, events):
+        raise RuntimeError('listener bug')
+
+    seen = []
+    bus.listeners.extend([broken, lambda after_id, events: seen.extend(ev['id'] for ev in events)])
+    bus._pump_events()
+
+    assert seen == [event_id]
+    assert bus.event_cursor == event_id
+    assert 'listener bug' in caplog.text
+
+    bus._pump_events()
+    assert seen == [event_id]
@@ -0,0 +1,61 @@
+"""Federation ingest: only nodes holding the shared token can ship events in."""
+
+import gzip
+
+import pytest
+
+from core import codec
+from core.db import get_stats, init_db
+from server import app as server_app
+
+
+def _batch(node='fed-node', last_id=1):
+    return {'node': node, 'last_id': last_id, 'events': [{
+        'id': 1, 'timestamp': '2026-05-01T00:00:00.000Z', 'session_id': 'fed-session', 'team_name': 'fed-team',
+        'agent_name': 'fed-agent', 'hook_event': 'PostToolUse', 'tool_name': 'Read', 'event_category': 'tool_use',
+        'summary': 'Read', 'payload_json': '{}', 'event_key': 'tu:fed-1', 'node': None,
+    }]}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    init_db()
+    monkeypatch.setattr(server_app, 'FEDERATION_TOKEN', 'fed-secret')
+    return server_app.app.test_client()
+
+
+def _ship(client, batch, token='fed-secret', **headers):
+    if token is not None:
+        headers['Authorization'] = f'Bearer {token}'
+    body = gzip.compress(codec.dumps(batch).encode('utf-8'))
+    return client.post('/api/federation/ingest', data=body,
+                       headers=dict(headers, **{'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}))
+
+
+def test_ingest_is_refused_without_a_configured_token(client, monkeypatch):
+    monkeypatch.setattr(server_app, 'FEDERATION_TOKEN', None)
+    assert _ship(client, _batch()).status_code == 403
+
+
+def test_ingest_needs_the_exact_token(client):
+    assert _ship(client, _batch(), token=None).status_code == 401
+    assert _ship(client, _batch(), token='wrong').status_code == 401
+    assert _ship(client, _batch(), token='fed-secret ').status_code == 401
+    assert get_stats(team='fed-team')['total_events'] == 0
+
+    response = _ship(client, _batch())
+    assert response.status_code == 200
+    assert response.get_json() == {'node': 'fed-node', 'inserted': 1, 'last_id': 1}
+    assert get_stats(team='fed-team')['total_events'] == 1
+    # The same batch again is below the node's watermark
+    assert _ship(client, _batch()).get_json()['inserted'] == 0
+
+
+def test_malformed_batches_are_rejected(client, monkeypatch):
+    assert _ship(client, _batch(node='../etc')).status_code == 400
+    assert _ship(client, ['not', 'an', 'object']).status_code == 400
+    bad = client.post('/api/federation/ingest', data=b'not gzip',
+                      headers={'Authorization': 'Bearer fed-secret', 'Content-Encoding': 'gzip'})
+    assert bad.status_code == 400
+    monkeypatch.setattr(server_app, 'FEDERATION_MAX_BYTES', 64)
+    assert _ship(client, _batch(last_id=2)).status_code == 413
@@ -0,0 +1,21 @@
+"""Hook startup stays within the budgets scripts/bench_hooks.py enforces."""
+
+import os
+import sys
+
+from conftest import PLUGIN_ROOT
+
+sys.path.insert(0, os.path.join(PLUGIN_ROOT, 'scripts'))
+
+import bench_hooks  # noqa: E402
+
+
+def test_every_hook_event_is_within_budget():
+    bare_ms, results, errors = bench_hooks.measure(runs=5)
+    assert errors is None
+    assert results
+    for result in results:
+        slowest = sorted(result['imports'].items(), key=lambda item: -item[1])[:3]
+        assert result['import_ms'] <= bench_hooks.DEFAULT_IMPORT_BUDGET_MS, (result['event'], slowest)
+        # The median moves with whatever else the machine is doing; the quickest start doesn't
+        assert result['quickest_overhead_ms'] <= bench_hooks.DEFAULT_BUDGET_MS, (result['event'], bare_ms)
@@ -0,0 +1,64 @@
+"""Hot store consistency with the database."""
+
+import sys
+
+from core.db import init_db, insert_event
+from core.event_parser import parse_event
+from server.cache import watermark
+from server.hot_store import HotStore
+
+
+def _read(duration_ms=None):
+    event = parse_event({'hook_event_name': 'PostToolUse', 'session_id': 'hot-session', 'team_name': 'hot-test',
+                         'tool_use_id': 'toolu_hot_merge', 'tool_name': 'Read',
+                         'tool_input': {'file_path': '/src/hot.py'}})
+    if duration_ms is not None:
+        event['duration_ms'] = duration_ms
+    return event
+
+
+def test_duration_merged_after_load_reaches_the_store():
+    init_db()
+    event_id = insert_event(_read())
+    store = HotStore(capacity=1000)
+    store._load()
+    before = watermark.validator()
+
+    # The live copy arrives after the transcript copy, with the call's duration
+    assert insert_event(_read(duration_ms=42.0)) == event_id
+    assert watermark.validator() != before
+
+    rows = store.page(per_page=50, team='hot-test')['events']
+    assert [(row['id'], row['duration_ms']) for row in rows] == [(event_id, 42.0)]
+
+
+def _evict_event(n, timestamp=None):
+    return {
+        'timestamp': timestamp or f'2027-02-01T00:{n // 60:02d}:{n % 60:02d}.000Z', 'session_id': f'evict-{n}',
+        'team_name': 'hot-evict', 'agent_name': f'evict-agent-{n}', 'hook_event': 'PostToolUse',
+        'tool_name': 'Read', 'event_category': 'tool_use', 'summary': f'read {n}', 'payload_json': '{}',
+    }
+
+
+def test_eviction_drops_values_no_held_event_uses():
+    init_db()
+    store = HotStore(capacity=20)
+    store._load()
+    ids = [insert_event(_evict_event(n)) for n in range(120)]
+    untimed = insert_event(_evict_event(120, timestamp='not a time'))
+
+    result = store.page(per_page=10, team='hot-evict')
+    assert result['total'] == 121
+    assert [row['id'] for row in result['events']] == ids[::-1][:10]
+    assert store.page(per_page=10, team='hot-evict', session='evict-3') is None
+    assert store.page(per_page=10, team='hot-evict', session='evict-115')['total'] == 1
+    assert store.page(per_page=10, team='hot-evict', session='evict-120') is None
+    assert untimed not in ids
+
+    # Only the held events' sessions and agents are left in the dictionary
+    live = {s for s in store._strings if s is not None}
+    held = {store._strings[code] for column in store._dims for code in column} - {None}
+    assert live == held
+    assert store.stats()['strings'] == len(held) <= 2 * 20 + 5
+    assert store._string_bytes == sum(sys.getsizeof(s) for s in live)
+    assert store._count_keys == sum(len(counts) for counts in store._counts.values()) <= 20
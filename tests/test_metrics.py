@@ -0,0 +1,40 @@
+"""Hook stage log folding across server workers."""
+
+import os
+
+from core import metrics
+
+
+def _stage_count(hook):
+    prefix = f'team_monitor_hook_stage_seconds_count{{hook="{hook}",stage="total"}} '
+    for line in metrics.render_prometheus().splitlines():
+        if line.startswith(prefix):
+            return int(float(line[len(prefix):]))
+    return 0
+
+
+def _append(path, hook, runs):
+    with open(path, 'a', encoding='utf-8') as f:
+        for _ in range(runs):
+            f.write(f'{{"hook": "{hook}", "stages": {{"total": 1.5}}}}\n')
+
+
+def test_each_worker_folds_every_line_across_rotation(tmp_path, monkeypatch):
+    log = str(tmp_path / 'hook_stages.log')
+    monkeypatch.setattr(metrics, 'HOOK_LOG', log)
+    monkeypatch.setattr(metrics, 'HOOK_LOG_ROTATED', log + '.1')
+    monkeypatch.setattr(metrics, 'HOOK_LOG_ROTATE_BYTES', 100)
+
+    _append(log, 'worker-a', 3)
+    inode = os.stat(log).st_ino
+    # Worker A folds the log and rotates it; worker B had seen none of it yet
+    monkeypatch.setattr(metrics, '_hook_log_position', (None, 0))
+    metrics.collect_hook_timings()
+    assert _stage_count('worker-a') == 3
+    assert not os.path.exists(log) and os.path.exists(log + '.1')
+
+    _append(log, 'worker-b', 2)
+    monkeypatch.setattr(metrics, '_hook_log_position', (inode, 0))
+    metrics.collect_hook_timings()
+    assert _stage_count('worker-a') == 6
+    assert _stage_count('worker-b') == 2
@@ -0,0 +1,100 @@
+"""Schema migrations: a fresh database and an upgraded one end up the same."""
+
+import sqlite3
+
+import pytest
+
+from core import db
+
+# The schema before the first migration, as the plugin originally created it
+_BASELINE = """
+    CREATE TABLE events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, session_id TEXT, team_name TEXT,
+        agent_name TEXT, hook_event TEXT, tool_name TEXT, event_category TEXT, summary TEXT, payload_json TEXT
+    );
+    CREATE INDEX idx_events_timestamp ON events(timestamp DESC);
+    CREATE INDEX idx_events_session_id ON events(session_id);
+    CREATE INDEX idx_events_agent_name ON events(agent_name);
+    CREATE INDEX idx_events_event_category ON events(event_category);
+    CREATE INDEX idx_events_tool_name ON events(tool_name);
+    CREATE TABLE agents (
+        agent_name TEXT UNIQUE NOT NULL, team_name TEXT, first_seen TEXT, last_seen TEXT, event_count INTEGER DEFAULT 0
+    );
+    CREATE TABLE sessions (
+        session_id TEXT UNIQUE NOT NULL, team_name TEXT, started_at TEXT, ended_at TEXT, event_count INTEGER DEFAULT 0
+    );
+    CREATE TABLE transcript_imports (
+        path TEXT PRIMARY KEY, byte_offset INTEGER NOT NULL DEFAULT 0, event_count INTEGER DEFAULT 0, imported_at TEXT
+    );
+"""
+
+
+def _schema(path):
+    conn = sqlite3.connect(path)
+    try:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        columns = {table: sorted((row[1], row[2], row[5]) for row in conn.execute(f"PRAGMA table_info({table})"))
+                   for table in tables}
+        indexes = sorted(row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_%'"))
+        return columns, indexes, conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    def use(name):
+        (tmp_path / name).mkdir()
+        monkeypatch.setattr(db, 'DATA_DIR', str(tmp_path / name))
+        return db.get_db_path()
+    return use
+
+
+def test_upgraded_database_matches_a_fresh_one(data_dir):
+    fresh = data_dir('fresh')
+    db.init_db()
+
+    old = data_dir('old')
+    conn = sqlite3.connect(old)
+    conn.executescript(_BASELINE + """
+        INSERT INTO sessions VALUES ('mig-session', 'mig-team', '2025-01-01T00:00:00.000Z', NULL, 2);
+        INSERT INTO agents VALUES ('mig-agent', 'mig-team', '2025-01-01T00:00:00.000Z', '2025-01-01T00:00:01.000Z', 2);
+        INSERT INTO events (timestamp, session_id, team_name, agent_name, hook_event, tool_name, event_category,
+                            summary, payload_json)
+        VALUES ('2025-01-01T00:00:00.000Z', 'mig-session', 'mig-team', 'mig-agent', 'PostToolUse', 'SendMessage',
+                'communication', 'SendMessage', '{"tool_input": {"recipient": "lead", "content": "hi"}}'),
+               ('2025-01-01T00:00:01.000Z', 'mig-session', 'unknown', 'mig-agent', 'PostToolUse', 'Bash',
+                'tool_use', 'Bash: ls', '{"tool_input": {"command": "ls"}}');
+    """)
+    conn.close()
+    db.init_db()
+
+    assert _schema(old) == _schema(fresh)
+    assert _schema(old)[2] == db.SCHEMA_VERSION
+    events = db.get_events(per_page=10)
+    assert events['total'] == 2
+    assert [(e['team_name'], e['summary']) for e in events['events']] == [
+        ('mig-team', 'Bash: ls'), ('mig-team', 'SendMessage')]
+    assert [(a['team_name'], a['agent_name'], a['event_count']) for a in db.get_agents()] == [
+        ('mig-team', 'mig-agent', 2)]
+    assert db.get_stats(team='mig-team')['total_events'] == 2
+
+
+def test_migrations_can_run_again(data_dir):
+    path = data_dir('again')
+    db.init_db()
+    db.insert_event({'timestamp': '2025-02-01T00:00:00.000Z', 'session_id': 'again-session',
+                     'team_name': 'again-team', 'agent_name': 'again-agent', 'hook_event': 'PostToolUse',
+                     'tool_name': 'Read', 'event_category': 'tool_use', 'summary': 'Read', 'payload_json': '{}'})
+    before = _schema(path)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+    db.init_db()
+
+    assert _schema(path) == before
+    assert db.get_stats(team='again-team')['total_events'] == 1
+    assert [a['event_count'] for a in db.get_agents(team='again-team')] == [1]
@@ -0,0 +1,98 @@
+"""Ingest policy loading, sampling and session budgets."""
+
+import logging
+
+from core import codec, db, policy
+from core.policy import DEFAULT_CONFIG, IngestPolicy, load_policy
+
+
+def test_invalid_fields_fall_back_to_defaults(caplog):
+    with caplog.at_level(logging.WARNING, logger=policy.__name__):
+        p = IngestPolicy({
+            'default_level': 'everything',
+            'categories': ['tool_use'],
+            'tools': {'Read': 'inputs', 'Grep': {'sample': 'half'}, 'Bash': 3},
+            'max_result_bytes': 'big',
+            'session_budget_bytes': -1,
+        })
+    assert p.default_level == 'full'
+    assert p.categories == {}
+    assert p.tools == {'Read': 'inputs'}
+    assert p.sample_rates == {}
+    assert p.max_result_bytes == DEFAULT_CONFIG['max_result_bytes']
+    assert p.session_budget_bytes == DEFAULT_CONFIG['session_budget_bytes']
+    assert len(caplog.records) == 6
+
+
+def test_valid_policy_is_kept():
+    p = IngestPolicy({'tools': {'Grep': {'level': 'summary', 'sample': 0.25}},
+                      'max_result_bytes': 1024, 'session_budget_bytes': 0})
+    assert p.tools == {'Grep': 'summary'}
+    assert p.sample_rates == {'Grep': 0.25}
+    assert p.max_result_bytes == 1024
+    assert p.session_budget_bytes == 0
+
+
+def test_unreadable_file_uses_defaults(tmp_path, caplog):
+    path = tmp_path / 'ingest_policy.json'
+    path.write_text('[1, 2]')
+    with caplog.at_level(logging.WARNING, logger=policy.__name__):
+        p = load_policy(str(path))
+    assert p.tools == {}
+    assert p.session_budget_bytes == 0
+    assert caplog.records
+    assert load_policy(str(tmp_path / 'missing.json')).default_level == 'full'
+
+
+def test_categories_apply_to_non_tool_events():
+    p = IngestPolicy({'default_level': 'inputs', 'categories': {'lifecycle': 'summary'}, 'tools': {}})
+    assert p.level_for(None, 'lifecycle') == 'summary'
+    assert p.level_for(None, 'communication') == 'full'
+    assert p.level_for('Bash', 'tool_use') == 'inputs'
+
+
+def _call(n, tool_name='Grep', session_id='policy-session', result='x' * 100):
+    payload = {'tool_name': tool_name, 'hook_event_name': 'PostToolUse', 'session_id': session_id,
+               'tool_input': {'pattern': f'p{n}'}, 'tool_response': result}
+    return {
+        'timestamp': f'2026-04-01T00:{n // 60 % 60:02d}:{n % 60:02d}.000Z', 'session_id': session_id,
+        'team_name': 'policy-team', 'agent_name': 'policy-agent', 'hook_event': 'PostToolUse',
+        'tool_name': tool_name, 'event_category': 'tool_use', 'summary': f'{tool_name} {n}',
+        'payload_json': codec.dumps(payload), 'event_key': f'tu:policy-{session_id}-{n}',
+    }
+
+
+def test_sampling_keeps_the_same_calls_at_the_configured_rate():
+    p = IngestPolicy({'tools': {'Grep': {'level': 'inputs', 'sample': 0.25}, 'Glob': {'sample': 0}}})
+    calls = [_call(n) for n in range(4000)]
+    kept = [p.keep(call) for call in calls]
+    assert 0.22 < sum(kept) / len(kept) < 0.28
+    assert [p.keep(call) for call in calls] == kept
+    assert all(p.keep(_call(n, tool_name='Read')) for n in range(50))
+    assert not any(p.keep(_call(n, tool_name='Glob')) for n in range(50))
+    assert p.keep(dict(_call(0, tool_name='Glob'), event_category='communication'))
+
+
+def test_sessions_over_budget_store_less(monkeypatch):
+    monkeypatch.setattr(db, 'POLICY', IngestPolicy({'session_budget_bytes': 200}))
+    db.init_db()
+    calls = [_call(n, tool_name='Bash', session_id='policy-budget') for n in range(6)]
+    size = len(calls[0]['payload_json'])
+    assert 200 < size < 400
+    before = db.get_ingest_stats()['by_tool'].get('Bash', {})
+    db.insert_events(calls[:4])
+    db.insert_events(calls[4:])
+
+    conn = db._get_connection()
+    try:
+        stored = [codec.loads(row[0]) for row in conn.execute(
+            "SELECT payload_json FROM events WHERE session_id = 'policy-budget' ORDER BY id")]
+    finally:
+        conn.close()
+    # Full until the budget is reached, inputs past it and only the classification past twice it
+    assert ['tool_response' in payload for payload in stored] == [True, False, False, False, False, False]
+    assert ['tool_input' in payload for payload in stored] == [True, True, True, False, False, False]
+    assert stored[-1] == {'tool_name': 'Bash', 'hook_event_name': 'PostToolUse', 'session_id': 'policy-budget'}
+    after = db.get_ingest_stats()['by_tool']['Bash']
+    added = {outcome: after[outcome]['count'] - before.get(outcome, {}).get('count', 0) for outcome in after}
+    assert added == {'full': 1, 'inputs': 2, 'summary': 3, 'degraded': 5}
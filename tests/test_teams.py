@@ -0,0 +1,98 @@
+"""Team attribution of events that name no team."""
+
+from core.db import (
+    _get_connection, get_agents, get_latency, get_stats, get_usage, init_db, insert_event, insert_events,
+)
+from server.hot_store import HotStore
+
+
+def _event(session_id, agent_name, tool_name, team_name=None, n=0, duration_ms=None):
+    return {
+        'timestamp': f'2026-01-01T00:00:{n:02d}.000Z', 'session_id': session_id, 'team_name': team_name,
+        'agent_name': agent_name, 'hook_event': 'PostToolUse', 'tool_name': tool_name,
+        'event_category': 'task_management' if tool_name == 'TaskCreate' else 'tool_use',
+        'summary': f'{tool_name} {n}', 'payload_json': '{}', 'duration_ms': duration_ms,
+    }
+
+
+def _cards(agent_name):
+    return sorted(a['team_name'] for a in get_agents() if a['agent_name'] == agent_name)
+
+
+def test_calls_after_the_team_is_known_join_it():
+    init_db()
+    insert_event(_event('team-known-session', 'known-1', 'TaskCreate', team_name='team-known'))
+    insert_event(_event('team-known-session', 'known-1', 'Bash', n=1))
+    insert_events([_event('team-known-session', 'known-1', 'Write', n=2)])
+    # Another session of the same agent falls back to the agent's team
+    insert_event(_event('team-known-other', 'known-1', 'Read', n=3))
+
+    assert _cards('known-1') == ['team-known']
+    assert get_stats(team='team-known')['total_events'] == 4
+
+
+def test_calls_before_the_team_is_known_are_moved_to_it():
+    init_db()
+    insert_event(_event('team-late-session', 'late-1', 'Bash', duration_ms=12.0))
+    insert_events([_event('team-late-session', 'late-1', 'Write', n=1)])
+    store = HotStore(capacity=1000)
+    store._load()
+    assert _cards('late-1') == ['unknown']
+
+    insert_event(_event('team-late-session', 'late-1', 'TaskCreate', team_name='team-late', n=2))
+
+    assert _cards('late-1') == ['team-late']
+    assert [a['event_count'] for a in get_agents(team='team-late')] == [3]
+    assert get_stats(team='team-late')['total_events'] == 3
+    assert [row['count'] for row in get_latency(team='team-late')] == [1]
+    assert get_latency(agent='late-1', team='unknown') == []
+    conn = _get_connection()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM events WHERE session_id = 'team-late-session' "
+                            "AND team_name = 'unknown'").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+    page = store.page(per_page=50, team='team-late')
+    assert page['total'] == 3
+    assert [row['summary'] for row in page['events']] == ['TaskCreate 2', 'Write 1', 'Bash 0']
+    assert store.page(per_page=50, team='unknown', session='team-late-session')['total'] == 0
+
+
+def _usage(message_id, session_id, agent_name, team_name=None, output_tokens=100):
+    return {'message_id': message_id, 'agent_name': agent_name, 'session_id': session_id,
+            'team_name': team_name or 'unknown', 'model': 'usage-test-model', 'timestamp': '2026-01-01T00:01:00.000Z',
+            'input_tokens': 10, 'output_tokens': output_tokens, 'cache_creation_tokens': 0, 'cache_read_tokens': 0}
+
+
+def _tokens(team, agent_name):
+    return [a['total_tokens'] for a in get_agents(team=team) if a['agent_name'] == agent_name]
+
+
+def test_same_named_agents_of_two_teams_keep_their_own_usage():
+    init_db()
+    insert_events([_event('usage-a-session', 'usage-worker', 'TaskCreate', team_name='usage-a')],
+                  usage_records=[_usage('usage-a-1', 'usage-a-session', 'usage-worker', 'usage-a')])
+    insert_events([_event('usage-b-session', 'usage-worker', 'TaskCreate', team_name='usage-b')],
+                  usage_records=[_usage('usage-b-1', 'usage-b-session', 'usage-worker', 'usage-b', 1000)])
+
+    assert _tokens('usage-a', 'usage-worker') == [110]
+    assert _tokens('usage-b', 'usage-worker') == [1010]
+    assert sorted(a['total_tokens'] for a in get_agents() if a['agent_name'] == 'usage-worker') == [110, 1010]
+    assert [u['total_tokens'] for u in get_usage(by='agent', key='usage-worker')] == [1120]
+
+
+def test_usage_before_the_team_is_known_is_moved_to_it():
+    init_db()
+    insert_events([_event('usage-late-session', 'usage-late', 'Bash')],
+                  usage_records=[_usage('usage-late-1', 'usage-late-session', 'usage-late')])
+    assert _tokens('unknown', 'usage-late') == [110]
+
+    insert_event(_event('usage-late-session', 'usage-late', 'TaskCreate', team_name='usage-late-team', n=1))
+    insert_events([_event('usage-late-session', 'usage-late', 'Write', n=2)],
+                  usage_records=[_usage('usage-late-2', 'usage-late-session', 'usage-late')])
+
+    assert _tokens('usage-late-team', 'usage-late') == [220]
+    assert _tokens('unknown', 'usage-late') == []
+    assert [u['total_tokens'] for u in get_usage(by='team', key='usage-late-team')] == [220]
+    assert all(m['model'] != 'usage-test-model' for u in get_usage(by='team', key='unknown') for m in u['models'])